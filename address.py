@@ -0,0 +1,4 @@
+def parse_address(text: str, default_port: int) -> tuple[str, int]:
+    """'host:port', ':port' or 'host', defaulting to 127.0.0.1 and `default_port`"""
+    host, _, port = text.rpartition(':') if ':' in text else (text, '', '')
+    return host or '127.0.0.1', int(port) if port else default_port
@@ -0,0 +1,431 @@
+from collections import OrderedDict, deque
+from typing import NamedTuple
+import time
+
+from board import pack_mask
+from engine import DOWN, HARD_DROP, LEFT, RIGHT, ROTATE, ROTATE_180, ROTATE_CCW, TetrisEngine
+from features import COLUMN_SPANS, TranspositionCache, Zobrist, zobrist
+from tetromino import ROTATION_KICKS, SHAPE_TABLES, spawn_column
+
+# A step of a move path: the action and the piece row expected after it
+PathStep = tuple[int, int]
+# A piece state in the search: (rotation, x, y)
+State = tuple[int, int, int]
+# How the search reached a state: the state before it and the action taken, or None for the spawn
+Parents = dict[State, tuple[State, int] | None]
+
+
+class Placement(NamedTuple):
+    """A final resting position of a piece and the inputs that reach it from the spawn"""
+    rotation: int
+    x: int
+    y: int
+    path: tuple[PathStep, ...]
+
+
+class Weights(NamedTuple):
+    height: float = -0.510066  # sum of column heights
+    lines: float = 0.760666  # rows cleared
+    holes: float = -0.35663  # empty cells with a filled cell above them
+    bumpiness: float = -0.184483  # sum of height differences between neighbouring columns
+
+
+class ColumnFeatures(NamedTuple):
+    heights: tuple[int, ...]
+    holes: int  # empty cells with a filled cell above them
+    aggregate: int  # sum of heights
+    bumpiness: int  # sum of height differences between neighbouring columns
+
+
+class MoveGenerator:
+    """Enumerates every placement reachable under the engine's movement and rotation rules
+
+    Boards are packed integers (row y at bit y * columns, as in BitBoard.packed),
+    so candidates are tested and placed with shifts instead of copying a grid.
+    Results are cached per (board, piece) and shared by every search node that
+    reaches the same position.
+    """
+    columns: int
+    rows: int
+    full_row: int
+    spawn_x: int
+    masks: list[list[int]]
+    cache: OrderedDict[tuple[int, int], tuple[Placement, ...]]
+    cache_size: int
+
+    def __init__(self, columns: int = 10, rows: int = 20, cache_size: int = 4096) -> None:
+        self.columns = columns
+        self.rows = rows
+        self.full_row = (1 << columns) - 1
+        self.spawn_x = spawn_column(columns)
+        self.masks = [[pack_mask(table, columns) for table in tables] for tables in SHAPE_TABLES]
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+
+    def fits(self, packed: int, kind: int, rotation: int, x: int, y: int) -> bool:
+        table = SHAPE_TABLES[kind][rotation]
+        left = x + table.left
+        top = y + table.top
+        if left < 0 or top < 0 or left + table.width > self.columns or top + table.height > self.rows:
+            return False
+        return not packed & (self.masks[kind][rotation] << (top * self.columns + left))
+
+    def rotate(self, packed: int, kind: int, rotation: int, x: int, y: int, turns: int = 1) -> State:
+        """TetrisEngine.rotate_piece: take the first wall kick that fits, or stay put if none does"""
+        for new_rotation, dx, dy in ROTATION_KICKS[kind][rotation][turns]:
+            if self.fits(packed, kind, new_rotation, x + dx, y + dy):
+                return new_rotation, x + dx, y + dy
+        return rotation, x, y
+
+    def top_filled_row(self, packed: int) -> int:
+        # Row 0 is the top of the board and sits in the lowest bits
+        return ((packed & -packed).bit_length() - 1) // self.columns
+
+    def heights(self, packed: int) -> list[int]:
+        """Skyline of a packed board, as BitBoard.heights: rows from the floor up to each column's top filled cell"""
+        columns = self.columns
+        heights = [0] * columns
+        seen = 0
+        for y in range(self.top_filled_row(packed) if packed else self.rows, self.rows):
+            new = (packed >> (y * columns)) & self.full_row & ~seen
+            if new:
+                seen |= new
+                while new:
+                    bit = new & -new
+                    heights[bit.bit_length() - 1] = self.rows - y
+                    new ^= bit
+                if seen == self.full_row:
+                    break
+        return heights
+
+    def placements(self, packed: int, kind: int) -> tuple[Placement, ...]:
+        key = (packed, kind)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache.move_to_end(key)
+            return cached
+
+        result = self.search(packed, kind)
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    def search(self, packed: int, kind: int) -> tuple[Placement, ...]:
+        spawn: State = (0, self.spawn_x, 0)
+        if not self.fits(packed, kind, *spawn):
+            return ()
+
+        # Everything above the stack is empty, so which (rotation, x) pairs are reachable
+        # only depends on the walls there: explore them once on the spawn row. Kicks that
+        # leave the row are skipped here; the surface search below still finds their results.
+        parents: Parents = {spawn: None}
+        queue: deque[State] = deque([spawn])
+        hover: list[State] = []
+        while queue:
+            state = queue.popleft()
+            rotation, x, _ = state
+            hover.append(state)
+            for action, next_state in (
+                (LEFT, (rotation, x - 1, 0)),
+                (RIGHT, (rotation, x + 1, 0)),
+                (ROTATE, self.rotate(packed, kind, rotation, x, 0)),
+                (ROTATE_CCW, self.rotate(packed, kind, rotation, x, 0, 3)),
+                (ROTATE_180, self.rotate(packed, kind, rotation, x, 0, 2)),
+            ):
+                if next_state[2] == 0 and next_state not in parents and self.fits(packed, kind, *next_state):
+                    parents[next_state] = (state, action)
+                    queue.append(next_state)
+
+        # Drop each hover state straight down to just above the skyline under its own
+        # columns, so a tall column elsewhere does not deepen its drop.
+        kicks = ROTATION_KICKS[kind]
+        heights = self.heights(packed)
+        depths: dict[tuple[int, int], int] = {}
+        for rotation, x, _ in hover:
+            table = SHAPE_TABLES[kind][rotation]
+            left = x + table.left
+            surface = self.rows - max(heights[left:left + table.width])
+            depths[rotation, x] = max(0, surface - table.top - table.height)
+
+        # A state on a drop whose sideways and in-place turn neighbours are all on their own
+        # drops has nothing new to find. The rest are searched with every move: states below
+        # a neighbouring drop's end can tuck under overhangs from mid-height, and the end of
+        # each drop is where the piece lands or starts its tucks and spins.
+        for state in hover:
+            rotation, x, _ = state
+            depth = depths[rotation, x]
+            neighbours = [(rotation, x - 1), (rotation, x + 1)]
+            neighbours += [(kicks[rotation][turns][0][0], x) for turns in (1, 2, 3)]
+            expand_from = min(depth, *(depths.get(neighbour, -1) + 1 for neighbour in neighbours))
+            if expand_from == 0:
+                queue.append(state)
+            previous = state
+            for y in range(1, depth + 1):
+                next_state = (rotation, x, y)
+                parents[next_state] = (previous, DOWN)
+                if y >= expand_from:
+                    queue.append(next_state)
+                previous = next_state
+
+        results: dict[int, Placement] = {}
+        while queue:
+            state = queue.popleft()
+            rotation, x, y = state
+            below = (rotation, x, y + 1)
+            # A state already found below fits, so most states on a drop skip this test
+            if below not in parents and not self.fits(packed, kind, *below):
+                # Landed; different rotations covering the same cells count once
+                table = SHAPE_TABLES[kind][rotation]
+                cells = self.masks[kind][rotation] << ((y + table.top) * self.columns + x + table.left)
+                if cells not in results:
+                    results[cells] = Placement(rotation, x, y, self.path(parents, state))
+            for action, next_state in (
+                (LEFT, (rotation, x - 1, y)),
+                (RIGHT, (rotation, x + 1, y)),
+                (DOWN, below),
+            ):
+                if next_state not in parents and self.fits(packed, kind, *next_state):
+                    parents[next_state] = (state, action)
+                    queue.append(next_state)
+            for action, turns in ((ROTATE, 1), (ROTATE_CCW, 3), (ROTATE_180, 2)):
+                # The first kick is always in place; a state already found there fits, so the turn ends on it
+                if (kicks[rotation][turns][0][0], x, y) in parents:
+                    continue
+                next_state = self.rotate(packed, kind, rotation, x, y, turns)
+                if next_state not in parents:
+                    parents[next_state] = (state, action)
+                    queue.append(next_state)
+
+        return tuple(results.values())
+
+    def path(self, parents: Parents, state: State) -> tuple[PathStep, ...]:
+        steps = []
+        link = parents[state]
+        while link is not None:
+            previous, action = link
+            steps.append((action, state[2]))
+            state = previous
+            link = parents[state]
+        steps.reverse()
+
+        # A hard drop covers any trailing soft drops
+        while steps and steps[-1][0] == DOWN:
+            steps.pop()
+        return tuple(steps)
+
+    def place(self, packed: int, kind: int, placement: Placement) -> tuple[int, int]:
+        """Lock a piece into a packed board and clear full rows; returns (new board, rows cleared)"""
+        table = SHAPE_TABLES[kind][placement.rotation]
+        columns = self.columns
+        top = placement.y + table.top
+        packed |= self.masks[kind][placement.rotation] << (top * columns + placement.x + table.left)
+
+        cleared = 0
+        for row in range(top, top + table.height):
+            shift = row * columns
+            if (packed >> shift) & self.full_row == self.full_row:
+                # Rows above move down by one; rows below stay
+                above = packed & ((1 << shift) - 1)
+                below = packed >> (shift + columns) << (shift + columns)
+                packed = (above << columns) | below
+                cleared += 1
+        return packed, cleared
+
+    def features(self, packed: int) -> ColumnFeatures:
+        """Column heights, holes, aggregate height and bumpiness of a packed board"""
+        columns = self.columns
+        full_row = self.full_row
+        heights = [0] * columns
+        seen = 0
+        holes = 0
+        # Rows above the stack are empty and add nothing
+        for y in range(self.top_filled_row(packed) if packed else self.rows, self.rows):
+            row = (packed >> (y * columns)) & full_row
+            new = row & ~seen
+            if new:
+                seen |= new
+                height = self.rows - y
+                while new:
+                    bit = new & -new
+                    heights[bit.bit_length() - 1] = height
+                    new ^= bit
+            holes += (seen & ~row).bit_count()
+
+        bumpiness = 0
+        for left, right in zip(heights, heights[1:]):
+            bumpiness += abs(left - right)
+        return ColumnFeatures(tuple(heights), holes, sum(heights), bumpiness)
+
+    def placed_features(self, before: ColumnFeatures, kind: int, placement: Placement) -> ColumnFeatures:
+        """features() after adding a piece that cleared no rows, from the board's features before it"""
+        old_heights = before.heights
+        heights = list(old_heights)
+        holes = before.holes
+        spans = COLUMN_SPANS[kind][placement.rotation]
+        x = placement.x
+        for column, top, cells in spans:
+            column += x
+            old = old_heights[column]
+            height = max(old, self.rows - placement.y - top)
+            # A column's holes are its height minus its filled cells
+            holes += height - old - cells
+            heights[column] = height
+
+        # Only neighbour pairs touching the piece's columns change
+        left = max(0, x + spans[0][0] - 1)
+        right = min(self.columns - 1, x + spans[-1][0] + 1)
+        bumpiness = before.bumpiness
+        for column in range(left, right):
+            bumpiness += abs(heights[column] - heights[column + 1]) - abs(old_heights[column] - old_heights[column + 1])
+        aggregate = before.aggregate + sum(heights[left:right + 1]) - sum(old_heights[left:right + 1])
+        return ColumnFeatures(tuple(heights), holes, aggregate, bumpiness)
+
+
+class Evaluation(NamedTuple):
+    value: float  # weighted features, without the lines term
+    features: ColumnFeatures
+
+
+class SearchNode(NamedTuple):
+    value: float
+    packed: int
+    hash: int  # Zobrist hash of packed
+    evaluation: Evaluation
+    lines: int
+    first: Placement | None
+
+
+class Bot:
+    """Beam search over the current and upcoming pieces, scored with weighted board features
+
+    A child board's features are derived from its parent's and the placed piece,
+    and every evaluation is cached by the board's Zobrist hash, since different
+    move orders keep reaching the same boards.
+    """
+    weights: Weights
+    lookahead: int
+    beam_width: int
+    generator: MoveGenerator
+    zobrist: Zobrist
+    evaluations: TranspositionCache[int, Evaluation]
+    last_plan_time: float = 0.0  # seconds spent in the last plan() call
+
+    def __init__(
+        self,
+        weights: Weights = Weights(),
+        lookahead: int = 2,
+        beam_width: int = 4,
+        columns: int = 10,
+        rows: int = 20,
+        cache_size: int = 65536,
+    ) -> None:
+        self.weights = weights
+        self.lookahead = lookahead
+        self.beam_width = beam_width
+        self.generator = MoveGenerator(columns, rows)
+        self.zobrist = zobrist(columns, rows)
+        self.evaluations = TranspositionCache(cache_size)
+
+    def score(self, features: ColumnFeatures) -> float:
+        weights = self.weights
+        return weights.height * features.aggregate + weights.holes * features.holes + weights.bumpiness * features.bumpiness
+
+    def evaluate(
+        self,
+        packed: int,
+        board_hash: int,
+        parent: Evaluation | None = None,
+        kind: int = 0,
+        placement: Placement | None = None,
+    ) -> Evaluation:
+        """Score a board, from its parent's features when it is the parent plus `placement` with no clear"""
+        evaluation = self.evaluations.get(board_hash)
+        if evaluation is None:
+            if parent is None or placement is None:
+                features = self.generator.features(packed)
+            else:
+                features = self.generator.placed_features(parent.features, kind, placement)
+            evaluation = Evaluation(self.score(features), features)
+            self.evaluations.put(board_hash, evaluation)
+        return evaluation
+
+    def best_placement(self, packed: int, kinds: list[int], board_hash: int | None = None) -> Placement | None:
+        generator = self.generator
+        hashes = self.zobrist
+        lines_weight = self.weights.lines
+        if board_hash is None:
+            board_hash = hashes.board_hash(packed)
+        beam = [SearchNode(0.0, packed, board_hash, self.evaluate(packed, board_hash), 0, None)]
+        for kind in kinds:
+            candidates = []
+            for node in beam:
+                for placement in generator.placements(node.packed, kind):
+                    next_packed, cleared = generator.place(node.packed, kind, placement)
+                    if cleared:
+                        next_hash = hashes.board_hash(next_packed)
+                        evaluation = self.evaluate(next_packed, next_hash)
+                    else:
+                        # The new cells are exactly the piece's, so only they change the hash and features
+                        next_hash = node.hash ^ hashes.cells_hash(next_packed ^ node.packed)
+                        evaluation = self.evaluate(next_packed, next_hash, node.evaluation, kind, placement)
+                    lines = node.lines + cleared
+                    candidates.append(SearchNode(
+                        evaluation.value + lines_weight * lines,
+                        next_packed,
+                        next_hash,
+                        evaluation,
+                        lines,
+                        node.first or placement,
+                    ))
+            if not candidates:
+                break
+            candidates.sort(key=lambda node: node.value, reverse=True)
+            beam = candidates[:self.beam_width]
+        return beam[0].first
+
+    def plan(self, engine: TetrisEngine) -> Placement | None:
+        """Choose where the engine's current piece should go"""
+        piece = engine.current_piece
+        if piece is None:
+            return None
+        started = time.perf_counter()
+        kinds = [piece.kind, *engine.preview()[:self.lookahead - 1]]
+        placement = self.best_placement(engine.board.packed, kinds, engine.board_hash)
+        self.last_plan_time = time.perf_counter() - started
+        return placement
+
+
+class BotController:
+    """Feeds a bot's chosen path to an engine, one action per tick"""
+    bot: Bot
+    engine: TetrisEngine
+    steps: deque[PathStep]
+    planned_piece: object = None
+
+    def __init__(self, bot: Bot, engine: TetrisEngine) -> None:
+        self.bot = bot
+        self.engine = engine
+        self.steps = deque()
+
+    def drive(self) -> None:
+        """Queue the next action for the coming engine tick"""
+        engine = self.engine
+        piece = engine.current_piece
+        if piece is None:
+            return
+
+        if piece is not self.planned_piece:
+            self.planned_piece = piece
+            placement = self.bot.plan(engine)
+            self.steps = deque(placement.path if placement is not None else ())
+            self.steps.append((HARD_DROP, 0))
+
+        while self.steps:
+            action, y = self.steps.popleft()
+            # Gravity may already have done a soft drop's work
+            if action == DOWN and piece.position[1] >= y:
+                continue
+            engine.press(action)
+            engine.release(action)
+            return
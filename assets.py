@@ -0,0 +1,82 @@
+from pathlib import Path
+import pygame
+
+SOUNDS_DIR = Path(__file__).parent / 'assets' / 'sounds'
+Color = tuple[int, int, int]
+
+
+class AssetCache:
+    """Sounds, fonts and rendered text, loaded once instead of on every event or frame"""
+    font_name: str = 'Arial'
+    sounds: dict[str, pygame.mixer.Sound]
+    fonts: dict[int, pygame.font.Font]
+    texts: dict[str, tuple[str, int, Color, pygame.Surface]]
+    music: str | None = None  # file name of the loaded background music
+
+    def __init__(self, sounds_dir: Path = SOUNDS_DIR) -> None:
+        self.sounds_dir = sounds_dir
+        self.sounds = {}
+        self.fonts = {}
+        self.texts = {}
+
+    def start_audio(self) -> None:
+        """Open the mixer and preload the sound effects; slow on some devices, so meant for a background thread"""
+        if not pygame.mixer.get_init():
+            try:
+                pygame.mixer.init()
+            except pygame.error as e:
+                print(f"Error opening audio: {e}")
+                return
+        self.load_sounds()
+
+    def load_sounds(self) -> None:
+        """Preload every sound effect in the sounds directory, keyed by file name without extension"""
+        if not pygame.mixer.get_init():
+            return
+        for path in sorted(self.sounds_dir.glob('*.wav')):
+            self.sounds[path.stem] = pygame.mixer.Sound(str(path))
+
+    def play(self, name: str) -> None:
+        sound = self.sounds.get(name)
+        if sound is not None:
+            sound.play()
+
+    def music_path(self, name: str) -> str:
+        return str(self.sounds_dir / name)
+
+    def play_music(self, name: str, loops: int = -1) -> None:
+        """Start a music file from the beginning, decoding it only the first time"""
+        if not pygame.mixer.get_init():
+            return
+        if self.music != name:
+            pygame.mixer.music.load(self.music_path(name))
+            self.music = name
+        pygame.mixer.music.play(loops)
+
+    def control_music(self, command: str, *args: int) -> None:
+        """Call pygame.mixer.music.<command>(*args), e.g. 'pause' or 'fadeout', when audio is available"""
+        if pygame.mixer.get_init():
+            getattr(pygame.mixer.music, command)(*args)
+
+    def font(self, size: int) -> pygame.font.Font:
+        font = self.fonts.get(size)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = pygame.font.SysFont(self.font_name, size)
+            self.fonts[size] = font
+        return font
+
+    def text(self, slot: str, text: str, size: int, color: Color = (255, 255, 255)) -> pygame.Surface:
+        """Render text for a named slot, reusing the last surface while the text, size and colour are unchanged"""
+        cached = self.texts.get(slot)
+        if cached is not None and cached[:3] == (text, size, color):
+            return cached[3]
+        surface = self.font(size).render(text, True, color)
+        self.texts[slot] = (text, size, color, surface)
+        return surface
+
+    def invalidate_fonts(self) -> None:
+        """Drop cached fonts and text, e.g. after a resize changed the font sizes"""
+        self.fonts.clear()
+        self.texts.clear()
@@ -0,0 +1,213 @@
+import numpy as np
+
+from tetromino import MAX_KICKS, ROTATION_KICKS, SHAPE_TABLES, spawn_column
+
+# Actions accepted by BatchTetris.step(), one per board
+NOOP, MOVE_LEFT, MOVE_RIGHT, ROTATE, SOFT_DROP, HARD_DROP, ROTATE_CCW, ROTATE_180 = range(8)
+NUM_ACTIONS = 8
+
+PIECE_KINDS = len(SHAPE_TABLES)
+MAX_ROTATIONS = 4
+
+# CELLS[kind, rotation] -> (4, 2) array of (x, y) cell offsets; rotations are padded by cycling
+CELLS = np.array(
+    [[tables[r % len(tables)].cells for r in range(MAX_ROTATIONS)] for tables in SHAPE_TABLES],
+    dtype=np.int64,
+)
+# KICK_ROTATION[kind, rotation, turns] -> rotation after the turn; KICK_OFFSETS[kind, rotation, turns]
+# -> (MAX_KICKS, 2) array of (dx, dy) kicks to try in order, padded by repeating the last one
+KICK_ROTATION = np.array(
+    [[[kicks[r % len(kicks)][turns][0][0] for turns in range(4)] for r in range(MAX_ROTATIONS)] for kicks in ROTATION_KICKS],
+    dtype=np.int64,
+)
+KICK_OFFSETS = np.array(
+    [
+        [
+            [[kick[1:] for kick in tries] + [tries[-1][1:]] * (MAX_KICKS - len(tries)) for tries in kicks[r % len(kicks)]]
+            for r in range(MAX_ROTATIONS)
+        ]
+        for kicks in ROTATION_KICKS
+    ],
+    dtype=np.int64,
+)
+
+
+class BatchTetris:
+    """Many games stepped in lockstep with NumPy, following the TetrisEngine rules
+
+    One step applies one action per board, then moves every piece down one row
+    (locking pieces that cannot fall). Locking, line clears, scoring, level-ups
+    and game over match TetrisEngine; board cells hold the piece kind + 1.
+    """
+    num_boards: int
+    columns: int
+    rows: int
+    spawn_x: int
+    boards: np.ndarray  # (N, rows, columns) uint8
+    kind: np.ndarray  # (N,) current piece kind
+    next_kind: np.ndarray  # (N,)
+    rotation: np.ndarray
+    x: np.ndarray
+    y: np.ndarray
+    score: np.ndarray
+    lines_cleared: np.ndarray
+    level: np.ndarray
+    done: np.ndarray  # (N,) bool, finished boards ignore actions until reset
+
+    def __init__(self, num_boards: int, seed: int | None = None, columns: int = 10, rows: int = 20) -> None:
+        self.num_boards = num_boards
+        self.columns = columns
+        self.rows = rows
+        self.spawn_x = spawn_column(columns)
+        self.rng = np.random.default_rng(seed)
+        self.boards = np.zeros((num_boards, rows, columns), dtype=np.uint8)
+        self.kind = np.zeros(num_boards, dtype=np.int64)
+        self.next_kind = np.zeros(num_boards, dtype=np.int64)
+        self.rotation = np.zeros(num_boards, dtype=np.int64)
+        self.x = np.zeros(num_boards, dtype=np.int64)
+        self.y = np.zeros(num_boards, dtype=np.int64)
+        self.score = np.zeros(num_boards, dtype=np.int64)
+        self.lines_cleared = np.zeros(num_boards, dtype=np.int64)
+        self.level = np.ones(num_boards, dtype=np.int64)
+        self.done = np.zeros(num_boards, dtype=bool)
+        self.reset()
+
+    def reset(self, indices: np.ndarray | None = None) -> np.ndarray:
+        """Start new games on the given boards (all by default) and return the observations"""
+        if indices is None:
+            indices = np.arange(self.num_boards)
+        self.boards[indices] = 0
+        self.next_kind[indices] = self.rng.integers(PIECE_KINDS, size=len(indices))
+        self.kind[indices] = self.rng.integers(PIECE_KINDS, size=len(indices))
+        self.rotation[indices] = 0
+        self.x[indices] = self.spawn_x
+        self.y[indices] = 0
+        self.score[indices] = 0
+        self.lines_cleared[indices] = 0
+        self.level[indices] = 1
+        self.done[indices] = False
+        return self.observe()
+
+    def fits(self, indices: np.ndarray, rotation: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Vectorised TetrisEngine.valid_move for the current piece of each listed board"""
+        cells = CELLS[self.kind[indices], rotation]
+        cx = x[:, None] + cells[:, :, 0]
+        cy = y[:, None] + cells[:, :, 1]
+        inside = (cx >= 0) & (cx < self.columns) & (cy >= 0) & (cy < self.rows)
+        occupied = self.boards[
+            indices[:, None],
+            np.clip(cy, 0, self.rows - 1),
+            np.clip(cx, 0, self.columns - 1),
+        ] != 0
+        return np.all(inside & ~occupied, axis=1)
+
+    def shift(self, indices: np.ndarray, dx: int, dy: int) -> np.ndarray:
+        """Move the listed pieces by (dx, dy) where possible and return which ones moved"""
+        ok = self.fits(indices, self.rotation[indices], self.x[indices] + dx, self.y[indices] + dy)
+        moved = indices[ok]
+        self.x[moved] += dx
+        self.y[moved] += dy
+        return ok
+
+    def rotate(self, indices: np.ndarray, turns: int = 1) -> None:
+        """TetrisEngine.rotate_piece: take the first wall kick that fits, or stay put if none does"""
+        kind = self.kind[indices]
+        rotation = KICK_ROTATION[kind, self.rotation[indices], turns]
+        offsets = KICK_OFFSETS[kind, self.rotation[indices], turns]
+        # Every board tries its next kick together, dropping out once one fits
+        pending = np.arange(len(indices))
+        for k in range(MAX_KICKS):
+            if len(pending) == 0:
+                break
+            boards = indices[pending]
+            x = self.x[boards] + offsets[pending, k, 0]
+            y = self.y[boards] + offsets[pending, k, 1]
+            ok = self.fits(boards, rotation[pending], x, y)
+            turned = boards[ok]
+            self.rotation[turned] = rotation[pending[ok]]
+            self.x[turned] = x[ok]
+            self.y[turned] = y[ok]
+            pending = pending[~ok]
+
+    def lock(self, indices: np.ndarray) -> None:
+        """Write the listed pieces into their boards, spawn the next pieces and clear full rows"""
+        if len(indices) == 0:
+            return
+        cells = CELLS[self.kind[indices], self.rotation[indices]]
+        cx = self.x[indices, None] + cells[:, :, 0]
+        cy = self.y[indices, None] + cells[:, :, 1]
+        self.boards[indices[:, None], cy, cx] = (self.kind[indices] + 1)[:, None].astype(np.uint8)
+
+        # Spawn; as in TetrisEngine.update the spawn is checked before full rows are cleared
+        self.kind[indices] = self.next_kind[indices]
+        self.next_kind[indices] = self.rng.integers(PIECE_KINDS, size=len(indices))
+        self.rotation[indices] = 0
+        self.x[indices] = self.spawn_x
+        self.y[indices] = 0
+        blocked = ~self.fits(indices, self.rotation[indices], self.x[indices], self.y[indices])
+        self.done[indices[blocked]] = True
+        self.clear_lines(indices[~blocked])
+
+    def clear_lines(self, indices: np.ndarray) -> None:
+        if len(indices) == 0:
+            return
+        boards = self.boards[indices]
+        full = np.all(boards != 0, axis=2)
+        count = full.sum(axis=1)
+        if count.any():
+            cleared = count > 0
+            indices = indices[cleared]
+            boards = boards[cleared]
+            full = full[cleared]
+            count = count[cleared]
+
+            # Stable sort puts the full rows on top, in front of the kept rows in their original order
+            order = np.argsort(~full, axis=1, kind='stable')
+            boards = np.take_along_axis(boards, order[:, :, None], axis=1)
+            boards[np.arange(self.rows)[None, :] < count[:, None]] = 0
+            self.boards[indices] = boards
+
+            # 100 points for the first line, 200 for the second, and so on
+            self.score[indices] += 50 * count * (count + 1)
+            self.lines_cleared[indices] += count
+
+        levelled = indices[self.lines_cleared[indices] >= 10 * self.level[indices]]
+        self.level[levelled] += 1
+        self.score[levelled] += 1000
+
+    def step(self, actions: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Apply one action per board, then one row of gravity; returns (observations, rewards, done)"""
+        actions = np.asarray(actions)
+        previous_score = self.score.copy()
+        live = ~self.done
+
+        self.shift(np.flatnonzero(live & (actions == MOVE_LEFT)), -1, 0)
+        self.shift(np.flatnonzero(live & (actions == MOVE_RIGHT)), 1, 0)
+        self.rotate(np.flatnonzero(live & (actions == ROTATE)))
+        self.rotate(np.flatnonzero(live & (actions == ROTATE_CCW)), 3)
+        self.rotate(np.flatnonzero(live & (actions == ROTATE_180)), 2)
+        self.shift(np.flatnonzero(live & (actions == SOFT_DROP)), 0, 1)
+
+        # Hard drop: keep falling until nothing in the batch can move
+        dropping = np.flatnonzero(live & (actions == HARD_DROP))
+        falling = dropping
+        while len(falling):
+            falling = falling[self.shift(falling, 0, 1)]
+
+        # Gravity for everything else; pieces that cannot fall lock
+        gravity = np.flatnonzero(live & (actions != HARD_DROP))
+        landed = gravity[~self.shift(gravity, 0, 1)]
+        self.lock(np.concatenate([dropping, landed]))
+
+        return self.observe(), self.score - previous_score, self.done.copy()
+
+    def observe(self) -> np.ndarray:
+        """(N, rows, columns) uint8: 0 empty, 1 locked cell, 2 current piece"""
+        observation = (self.boards != 0).astype(np.uint8)
+        live = np.flatnonzero(~self.done)
+        cells = CELLS[self.kind[live], self.rotation[live]]
+        cx = self.x[live, None] + cells[:, :, 0]
+        cy = self.y[live, None] + cells[:, :, 1]
+        inside = (cx >= 0) & (cx < self.columns) & (cy >= 0) & (cy < self.rows)
+        observation[np.broadcast_to(live[:, None], cx.shape)[inside], cy[inside], cx[inside]] = 2
+        return observation
@@ -0,0 +1,166 @@
+from pathlib import Path
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+# Run from anywhere without installing: the game modules live one directory up
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+from board import BitBoard
+from engine import TetrisEngine
+from tetromino import COLORS, SHAPE_TABLES
+
+DEFAULT_SIZES = ('10x20', '40x200', '100x1000')
+
+
+def parse_size(text: str) -> tuple[int, int]:
+    columns, rows = text.lower().split('x')
+    return int(columns), int(rows)
+
+
+def fill_board(board: BitBoard, rng: random.Random, start_row: int, density: float = 0.6) -> None:
+    """Scatter locked cells over rows [start_row, height), leaving every row with at least one gap"""
+    for y in range(start_row, board.height):
+        bits = 0
+        for x in range(board.columns):
+            if rng.random() < density:
+                bits |= 1 << x
+        bits &= ~(1 << rng.randrange(board.columns))
+        board.rows[y] = bits
+        board.colors[y] = tuple(COLORS[y % len(COLORS)] if bits >> x & 1 else 0 for x in range(board.columns))
+    board.repack()
+
+
+def per_call(function, repeat: int) -> float:
+    """Average seconds per call"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat
+
+
+def bench_engine(columns: int, rows: int, repeat: int) -> dict[str, float]:
+    rng = random.Random(0)
+    engine = TetrisEngine(0, columns=columns, rows=rows)
+    fill_board(engine.board, rng, rows // 2)
+    board = engine.board
+
+    # Collision: random pieces at random in-bounds positions over a half-filled board
+    kinds = [rng.randrange(len(SHAPE_TABLES)) for _ in range(1024)]
+    probes = [
+        (kind, rng.randrange(len(SHAPE_TABLES[kind])), rng.randrange(columns - 4), rng.randrange(rows - 4))
+        for kind in kinds
+    ]
+
+    def collide() -> None:
+        for kind, rotation, x, y in probes:
+            board.collides(kind, rotation, x, y)
+
+    collision = per_call(collide, max(1, repeat // 100)) / len(probes)
+
+    # Locking: hard drop pieces from random columns onto the stack, restarting when the stack gets high
+    start = engine.snapshot()
+
+    def lock() -> None:
+        if engine.is_game_over or max(engine.board.heights) > rows - 6:
+            engine.restore(start)
+        current = engine.current_piece
+        if current is not None:
+            current.position = (rng.randrange(columns - 4), 0)
+        engine.hard_drop()
+        engine.update()
+
+    locking = per_call(lock, repeat)
+
+    # Line clearing: four full rows at the bottom under a half-filled stack
+    engine.restore(start)
+    full = board.full_row
+    for y in range(rows - 4, rows):
+        board.rows[y] = full
+        board.colors[y] = (COLORS[0],) * columns
+    board.repack()
+    dense = board.snapshot()
+    lines = list(range(rows - 4, rows))
+    elapsed = 0.0
+    for _ in range(repeat):
+        board.restore(dense)
+        started = time.perf_counter()
+        board.remove_rows(lines)
+        elapsed += time.perf_counter() - started
+    clearing = elapsed / repeat
+
+    return {'collision_us': collision * 1e6, 'lock_us': locking * 1e6, 'clear_us': clearing * 1e6}
+
+
+def bench_render(columns: int, rows: int, repeat: int) -> dict[str, float]:
+    from main import Tetris
+
+    tetris = Tetris(seed=0, columns=columns, rows=rows)
+    engine = tetris.engine
+    fill_board(engine.board, random.Random(0), rows // 2)
+    tetris.board_dirty = True
+    tetris.draw_full()
+    full = per_call(tetris.draw_full, max(1, repeat // 10))
+
+    # A piece sliding back and forth: only its old and new areas change
+    def slide() -> None:
+        piece = engine.current_piece
+        assert piece is not None
+        x, y = piece.position
+        piece.position = (x + 1 if x % 2 == 0 else x - 1, y)
+        tetris.draw_dirty()
+
+    tetris.draw_full()
+    moving = per_call(slide, repeat)
+
+    # A lock: the rows under the piece are redrawn on the board surface
+    start = engine.snapshot()
+
+    def lock() -> None:
+        if engine.is_game_over or max(engine.board.heights) > rows - 6:
+            engine.restore(start)
+            tetris.board_dirty = True
+            tetris.draw_dirty()
+        engine.hard_drop()
+        engine.update()
+        tetris.draw_dirty()
+
+    locking = per_call(lock, max(1, repeat // 10))
+
+    return {'full_frame_ms': full * 1e3, 'move_frame_ms': moving * 1e3, 'lock_frame_ms': locking * 1e3}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure how engine and drawing costs grow with the board size")
+    parser.add_argument('sizes', nargs='*', default=DEFAULT_SIZES, help="board sizes as COLUMNSxROWS")
+    parser.add_argument('--repeat', type=int, default=2000, help="iterations per measurement")
+    parser.add_argument('--no-render', action='store_true', help="skip the pygame drawing measurements")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    for text in args.sizes:
+        columns, rows = parse_size(text)
+        result: dict[str, float | str] = {'size': f'{columns}x{rows}', 'cells': columns * rows}
+        result.update(bench_engine(columns, rows, args.repeat))
+        if not args.no_render:
+            result.update(bench_render(columns, rows, args.repeat))
+        results.append(result)
+
+    if args.json:
+        print(json.dumps(results))
+        return
+
+    fields = [name for name in results[0] if name != 'size']
+    print(f"{'size':>10}" + ''.join(f"{name:>15}" for name in fields))
+    for result in results:
+        print(f"{result['size']:>10}" + ''.join(f"{result[name]:>15.2f}" for name in fields))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+from datetime import datetime
+from pathlib import Path
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Run from anywhere without installing: the game modules live one directory up
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+from board_scaling import fill_board, per_call
+from engine import TetrisEngine
+from farm import random_policy
+from tetromino import COLORS, SHAPE_TABLES
+
+WINDOW_SIZES = ('400x500', '600x800', '1200x1600')
+FILLS = {'empty': 0.0, 'half': 0.5, 'full': 1.0}  # share of the rows, from the floor up, holding locked cells
+
+# Metrics where larger is better; every other metric is a cost
+THROUGHPUT = ('pieces_per_s', 'ticks_per_s', 'valid_move_per_s')
+
+
+def bench_engine(games: int, repeat: int) -> dict[str, float]:
+    results = {}
+
+    # Whole games: seeded random play, as in the simulation farm
+    pieces = 0
+    ticks = 0
+    elapsed = 0.0
+
+    def count_pieces(event: str, value: int) -> None:
+        nonlocal pieces
+        if event == 'lock':
+            pieces += 1
+
+    for seed in range(games):
+        engine = TetrisEngine(seed)
+        engine.add_listener(count_pieces)
+        rng = random.Random(seed)
+        started = time.perf_counter()
+        while not engine.is_game_over:
+            random_policy(engine, rng)
+        elapsed += time.perf_counter() - started
+        ticks += engine.tick_count
+    results['pieces_per_s'] = pieces / elapsed
+    results['ticks_per_s'] = ticks / elapsed
+
+    # valid_move: random pieces and offsets over a half-filled board
+    rng = random.Random(0)
+    engine = TetrisEngine(0)
+    fill_board(engine.board, rng, engine.grid_rows // 2)
+    piece = engine.current_piece
+    assert piece is not None
+    probes = []
+    for _ in range(1024):
+        kind = rng.randrange(len(SHAPE_TABLES))
+        position = (rng.randrange(-2, engine.grid_columns), rng.randrange(engine.grid_rows))
+        probes.append((kind, rng.randrange(len(SHAPE_TABLES[kind])), position, rng.randrange(-1, 2), rng.randrange(2)))
+
+    def valid_moves() -> None:
+        for kind, rotation, position, dx, dy in probes:
+            piece.kind = kind
+            piece.rotation = rotation
+            piece.position = position
+            engine.valid_move(dx, dy)
+
+    results['valid_move_per_s'] = len(probes) / per_call(valid_moves, max(1, repeat // 100))
+
+    # clear_lines: four full rows under a dense stack, the most a single piece can clear
+    board = engine.board
+    fill_board(board, rng, 2, density=0.9)
+    for y in range(engine.grid_rows - 4, engine.grid_rows):
+        board.rows[y] = board.full_row
+        board.colors[y] = (COLORS[1],) * engine.grid_columns
+    board.repack()
+    dense = engine.snapshot()
+    lines = list(range(engine.grid_rows - 4, engine.grid_rows))
+    elapsed = 0.0
+    for _ in range(repeat):
+        engine.restore(dense)
+        engine.full_lines = list(lines)
+        started = time.perf_counter()
+        engine.clear_lines()
+        elapsed += time.perf_counter() - started
+    results['clear_lines_us'] = elapsed / repeat * 1e6
+    return results
+
+
+def bench_render(window_sizes: list[str], repeat: int) -> dict[str, float]:
+    import pygame
+    from main import Tetris
+
+    results = {}
+    tetris = Tetris(seed=0)
+    engine = tetris.engine
+    start = engine.snapshot()
+    for size in window_sizes:
+        width, height = (int(n) for n in size.split('x'))
+        tetris.screen = pygame.display.set_mode((width, height))
+        tetris.update_display_size()
+        for fill, share in FILLS.items():
+            engine.restore(start)
+            rows = round(engine.grid_rows * share)
+            if rows:
+                fill_board(engine.board, random.Random(0), engine.grid_rows - rows, density=0.95)
+            key = f'{size}_{fill}'
+
+            def full_frame() -> None:
+                tetris.draw_full()
+                pygame.display.flip()
+
+            def rebuild() -> None:
+                tetris.build_board_surface()
+
+            def move_frame() -> None:
+                piece = engine.current_piece
+                assert piece is not None
+                x, y = piece.position
+                piece.position = (x + 1 if x % 2 == 0 else x - 1, y)
+                pygame.display.update(tetris.draw_dirty())
+
+            tetris.board_dirty = True
+            tetris.draw_full()
+            results[f'{key}_full_frame_ms'] = per_call(full_frame, max(1, repeat // 10)) * 1e3
+            results[f'{key}_board_rebuild_ms'] = per_call(rebuild, max(1, repeat // 10)) * 1e3
+            results[f'{key}_move_frame_ms'] = per_call(move_frame, repeat) * 1e3
+    pygame.quit()
+    return results
+
+
+def bench_startup(runs: int) -> dict[str, float]:
+    """Median time from launching main.py to its first frame on screen, in fresh processes"""
+    main_py = Path(__file__).resolve().parent.parent / 'main.py'
+    times = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for _ in range(runs):
+            command = [sys.executable, str(main_py), '--startup-time', '--no-audio', '--scores', str(Path(scratch) / 'scores.db')]
+            output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+            line = next(line for line in output.splitlines() if line.startswith('Time to first frame:'))
+            times.append(float(line.split()[-2]))
+    return {'startup_first_frame_ms': statistics.median(times)}
+
+
+def compare(results: dict[str, float], baseline: dict[str, float]) -> None:
+    """Print how each metric moved against a previous run; positive means slower"""
+    print(f"{'metric':40}{'baseline':>12}{'now':>12}{'change':>10}")
+    for name, value in results.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        if name in THROUGHPUT:
+            change = old / value - 1 if value else float('inf')
+        else:
+            change = value / old - 1
+        print(f"{name:40}{old:>12.3f}{value:>12.3f}{change:>+10.1%}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Headless engine and renderer benchmarks with machine-readable results")
+    parser.add_argument('--games', type=int, default=20, help="seeded games played for throughput")
+    parser.add_argument('--repeat', type=int, default=1000, help="iterations per timed measurement")
+    parser.add_argument('--windows', nargs='+', default=WINDOW_SIZES, metavar='WxH', help="window sizes to render at")
+    parser.add_argument('--no-render', action='store_true', help="skip the pygame measurements")
+    parser.add_argument('--startup-runs', type=int, default=5, help="launches timed for time-to-first-frame")
+    parser.add_argument('--output', type=Path, default=None, help="write the results to this JSON file")
+    parser.add_argument('--compare', type=Path, default=None, metavar='JSON', help="print changes against an earlier --output")
+    args = parser.parse_args()
+
+    results = bench_engine(args.games, args.repeat)
+    if not args.no_render:
+        results.update(bench_render(args.windows, args.repeat))
+        results.update(bench_startup(args.startup_runs))
+
+    report = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'games': args.games,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.compare is not None:
+        compare(results, json.loads(args.compare.read_text())['results'])
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
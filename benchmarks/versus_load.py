@@ -0,0 +1,79 @@
+from pathlib import Path
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+# Run from anywhere without installing: the game modules live one directory up
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from address import parse_address
+from relay import Relay
+from versus import DEFAULT_PORT, DESYNC, FINISHED, TICK_MS, TURN_TICKS, LockstepClient, MatchResult
+
+
+async def run_load(host: str, port: int | None, matches: int, max_turns: int, realtime: bool) -> tuple[list[MatchResult | BaseException], Relay | None, float]:
+    """Play `matches` concurrent matches; with no port an in-process relay is started on a free one"""
+    relay = None
+    server = None
+    if port is None:
+        relay = Relay(seed=0)
+        server = await relay.serve(host, 0)
+        port = server.sockets[0].getsockname()[1]
+    assert port is not None
+
+    async def player(index: int) -> MatchResult:
+        client = await LockstepClient.connect(host, port)
+        return await client.play(rng=random.Random(index), max_turns=max_turns, realtime=realtime)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(player(index) for index in range(matches * 2)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    if server is not None:
+        server.close()
+        await server.wait_closed()
+    return results, relay, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the versus relay with many concurrent headless matches")
+    parser.add_argument('--matches', type=int, default=200)
+    parser.add_argument('--max-turns', type=int, default=400, help=f"stop each match after this many {TURN_TICKS}-tick turns")
+    parser.add_argument('--relay', help="host:port of a running relay; by default one is started in this process")
+    parser.add_argument('--fast', action='store_true', help="do not pace turns to real time")
+    args = parser.parse_args()
+
+    host, port = parse_address(args.relay, DEFAULT_PORT) if args.relay else ('127.0.0.1', None)
+    results, relay, elapsed = asyncio.run(run_load(host, port, args.matches, args.max_turns, not args.fast))
+
+    errors = [result for result in results if isinstance(result, BaseException)]
+    played = [result for result in results if isinstance(result, MatchResult)]
+    for error in errors[:5]:
+        print(f"Error in client: {error!r}")
+
+    # Both clients of a match simulate it independently; their final digests must agree
+    digests: dict[int, set[bytes]] = {}
+    for result in played:
+        digests.setdefault(result.seed, set()).add(result.digest)
+    diverged = sum(1 for seen in digests.values() if len(seen) > 1)
+    desynced = sum(1 for result in played if result.reason == DESYNC)
+    finished = sum(1 for result in played if result.reason == FINISHED) // 2
+    turns = sum(result.turns for result in played) / 2
+    traffic = sum(result.bytes_sent for result in played)
+    stalls = sorted(result.stall_ms / max(1, result.turns) for result in played)
+
+    print(f"{len(played) // 2} matches in {elapsed:.1f} s: {finished} finished, {len(errors)} client errors")
+    print(f"desyncs: {desynced // 2} reported by the relay, {diverged} final digests differing")
+    if played:
+        turn_seconds = TURN_TICKS * TICK_MS / 1000
+        print(f"traffic: {traffic * 2 / len(played):.0f} bytes/match, {traffic / (turns * turn_seconds) if turns else 0:.0f} bytes/s per match")
+        print(f"opponent wait per turn: median {statistics.median(stalls):.3f} ms, worst {stalls[-1]:.3f} ms")
+    if relay is not None:
+        print(f"relay: {relay.stats.summary()}")
+    sys.exit(1 if errors or diverged or desynced else 0)
+
+
+if __name__ == "__main__":
+    main()
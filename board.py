@@ -0,0 +1,218 @@
+from typing import NamedTuple
+import hashlib
+
+from tetromino import ROTATION_KICKS, SHAPE_TABLES, Color, ShapeTable
+
+Cell = int | Color
+ColorRow = tuple[Cell, ...]
+
+
+class BoardState(NamedTuple):
+    """Immutable copy of a BitBoard; colour rows are shared with the board and other states"""
+    packed: int
+    heights: tuple[int, ...]
+    colors: tuple[ColorRow, ...]
+
+
+def pack_mask(table: ShapeTable, columns: int) -> int:
+    """Lay the bounding box rows of a piece out with a stride of `columns` bits"""
+    packed = 0
+    for i, bits in enumerate(table.row_bits):
+        packed |= bits << (i * columns)
+    return packed
+
+
+class BitBoard:
+    """Grid stored as one integer bitmask per row, with colours in a parallel array
+
+    The rows are also kept packed into a single integer (bit y * columns + x),
+    so testing a piece against the stack is one shift and one AND. Colour rows
+    are tuples that are replaced rather than edited, so a snapshot() only has
+    to copy the list of row references.
+    """
+    columns: int
+    height: int
+    full_row: int
+    rows: list[int]  # bit x set when column x is occupied
+    packed: int  # all rows, row y at bit offset y * columns
+    heights: list[int]  # skyline: rows from the floor up to the top filled cell of each column
+    colors: list[ColorRow]  # 0 for empty cells, otherwise the locked colour
+    empty_row: ColorRow
+    packed_masks: list[list[int]]  # pack_mask() of SHAPE_TABLES for this width
+
+    def __init__(self, columns: int, height: int) -> None:
+        self.columns = columns
+        self.height = height
+        self.full_row = (1 << columns) - 1
+        self.rows = [0] * height
+        self.packed = 0
+        self.heights = [0] * columns
+        self.empty_row = (0,) * columns
+        self.colors = [self.empty_row] * height
+        self.packed_masks = [[pack_mask(table, columns) for table in tables] for tables in SHAPE_TABLES]
+
+    def collides(self, kind: int, rotation: int, x: int, y: int) -> bool:
+        """Check if a piece with its shape origin at (x, y) overlaps a wall, the floor or a cell"""
+        _, left, top, width, height, _, _ = SHAPE_TABLES[kind][rotation]
+        x += left
+        y += top
+        if x < 0 or y < 0 or x + width > self.columns or y + height > self.height:
+            return True
+        return self.packed & (self.packed_masks[kind][rotation] << (y * self.columns + x)) != 0
+
+    def rotate(self, kind: int, rotation: int, x: int, y: int, turns: int = 1) -> tuple[int, int, int] | None:
+        """Turn a piece by quarter turns clockwise, trying each wall kick in order; (rotation, x, y) or None if all are blocked"""
+        for new_rotation, dx, dy in ROTATION_KICKS[kind][rotation][turns % 4]:
+            if not self.collides(kind, new_rotation, x + dx, y + dy):
+                return new_rotation, x + dx, y + dy
+        return None
+
+    def place(self, kind: int, rotation: int, x: int, y: int, color: Cell) -> None:
+        """Write a piece into the board; the caller must have checked collides() first"""
+        table = SHAPE_TABLES[kind][rotation]
+        self.packed |= self.packed_masks[kind][rotation] << ((y + table.top) * self.columns + x + table.left)
+        rows, colors, heights = self.rows, self.colors, self.heights
+        changed: dict[int, list[Cell]] = {}
+        for cx, cy in table.cells:
+            column = x + cx
+            row = y + cy
+            rows[row] |= 1 << column
+            cells = changed.get(row)
+            if cells is None:
+                cells = changed[row] = list(colors[row])
+            cells[column] = color
+            if heights[column] < self.height - row:
+                heights[column] = self.height - row
+        for row, cells in changed.items():
+            colors[row] = tuple(cells)
+
+    def unplace(self, kind: int, rotation: int, x: int, y: int) -> None:
+        """Remove a piece that place() wrote at (x, y)"""
+        table = SHAPE_TABLES[kind][rotation]
+        self.packed &= ~(self.packed_masks[kind][rotation] << ((y + table.top) * self.columns + x + table.left))
+        rows, colors = self.rows, self.colors
+        changed: dict[int, list[Cell]] = {}
+        for cx, cy in table.cells:
+            column = x + cx
+            row = y + cy
+            rows[row] &= ~(1 << column)
+            cells = changed.get(row)
+            if cells is None:
+                cells = changed[row] = list(colors[row])
+            cells[column] = 0
+        for row, cells in changed.items():
+            colors[row] = tuple(cells)
+        for column in range(x + table.left, x + table.left + table.width):
+            self.heights[column] = self.column_height(column)
+
+    def drop_distance(self, kind: int, rotation: int, x: int, y: int) -> int:
+        """Number of rows a piece at (x, y) can fall before it lands"""
+        table = SHAPE_TABLES[kind][rotation]
+        x += table.left
+        distance = self.height
+        for j, bottom in enumerate(table.bottom):
+            # First filled row under this column of the piece, from the skyline
+            gap = self.height - self.heights[x + j] - 1 - (y + bottom)
+            if gap < 0:
+                # The piece is tucked under an overhang; the skyline says nothing about what lies below
+                return self.scan_drop_distance(kind, rotation, x - table.left, y)
+            distance = min(distance, gap)
+        return distance
+
+    def scan_drop_distance(self, kind: int, rotation: int, x: int, y: int) -> int:
+        distance = 0
+        while not self.collides(kind, rotation, x, y + distance + 1):
+            distance += 1
+        return distance
+
+    def full_rows(self, start: int = 0, stop: int | None = None) -> list[int]:
+        """Indices of the full rows in [start, stop), ascending"""
+        full_row = self.full_row
+        rows = self.rows
+        return [i for i in range(start, self.height if stop is None else stop) if rows[i] == full_row]
+
+    def remove_rows(self, lines: list[int]) -> list[ColorRow]:
+        """Delete the given rows (in ascending order), shift everything above down and return the removed colours"""
+        columns = self.columns
+        count = len(lines)
+        surface = [self.height - h for h in self.heights]
+        removed_lines = set(lines)
+        removed = [self.colors[line] for line in lines]
+
+        # Compact in one pass: kept rows keep their order under `count` new empty rows
+        self.rows = [0] * count + [bits for i, bits in enumerate(self.rows) if i not in removed_lines]
+        self.colors = [self.empty_row] * count + [row for i, row in enumerate(self.colors) if i not in removed_lines]
+
+        # Each band of rows between two removed rows moves down by the number of removed rows below it
+        packed = self.packed
+        compacted = 0
+        start = 0
+        shift = count
+        for line in (*lines, self.height):
+            band = packed & ((1 << (line * columns)) - (1 << (start * columns)))
+            compacted |= band << (shift * columns)
+            start = line + 1
+            shift -= 1
+        self.packed = compacted
+
+        # A removed row is full, so every column's top cell is at or above it.
+        # Only columns whose top cell was itself removed need a rescan.
+        for column, top in enumerate(surface):
+            if top in removed_lines:
+                self.heights[column] = self.column_height(column)
+            else:
+                self.heights[column] -= count
+        return removed
+
+    def restore_rows(self, lines: list[int], removed: list[ColorRow]) -> None:
+        """Undo remove_rows(lines), putting back the full rows it returned"""
+        for line, colors in zip(reversed(lines), reversed(removed)):
+            del self.rows[0]
+            del self.colors[0]
+            self.rows.insert(line, self.full_row)
+            self.colors.insert(line, colors)
+        self.repack()
+
+    def add_garbage(self, holes: list[int], color: Cell) -> None:
+        """Push the stack up one row per hole and fill the new bottom rows except at their hole column
+
+        Cells pushed past the top are lost; the caller decides whether that ends the game.
+        """
+        count = len(holes)
+        full_row = self.full_row
+        self.rows = self.rows[count:] + [full_row & ~(1 << hole) for hole in holes]
+        self.colors = self.colors[count:] + [
+            tuple(0 if x == hole else color for x in range(self.columns)) for hole in holes
+        ]
+        self.repack()
+
+    def snapshot(self) -> BoardState:
+        return BoardState(self.packed, tuple(self.heights), tuple(self.colors))
+
+    def restore(self, state: BoardState) -> None:
+        columns = self.columns
+        full_row = self.full_row
+        self.packed = state.packed
+        self.heights = list(state.heights)
+        self.colors = list(state.colors)
+        self.rows = [(state.packed >> (y * columns)) & full_row for y in range(self.height)]
+
+    def digest(self) -> bytes:
+        """Stable 8-byte hash of which cells are occupied, identical across processes and runs"""
+        size = (self.columns * self.height + 7) // 8
+        return hashlib.blake2b(self.packed.to_bytes(size, 'little'), digest_size=8).digest()
+
+    def column_height(self, column: int) -> int:
+        bit = 1 << column
+        for y, bits in enumerate(self.rows):
+            if bits & bit:
+                return self.height - y
+        return 0
+
+    def repack(self) -> None:
+        """Rebuild the packed integer and skyline after `rows` was edited directly"""
+        packed = 0
+        for bits in reversed(self.rows):
+            packed = (packed << self.columns) | bits
+        self.packed = packed
+        self.heights = [self.column_height(column) for column in range(self.columns)]
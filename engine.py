@@ -0,0 +1,497 @@
+from collections.abc import Callable
+from typing import NamedTuple
+
+from board import BitBoard, BoardState, ColorRow
+from features import FeatureTracker, encode
+from randomizer import GeneratorState, PieceGenerator
+from tetromino import GARBAGE_COLOR, SHAPE_TABLES, Tetromino, spawn_column
+
+# Listeners receive the event name and an integer payload:
+#   'input'         -> action * 2 + pressed, as the input is applied on the current tick
+#   'hard_drop'     -> rows the piece fell
+#   'lock'          -> top row the locked piece covers * LOCK_HEIGHTS + the number of rows it covers;
+#                      decode with divmod(value, LOCK_HEIGHTS), which holds while every shape is shorter
+#   'lines_cleared' -> number of rows removed
+#   'level_up'      -> the new level
+#   'garbage'       -> rows of an opponent's garbage pushed under the stack
+#   'game_over'     -> the final score
+EventListener = Callable[[str, int], None]
+
+# Game logic advances in fixed ticks of this many milliseconds, independent of the frame rate
+TICK_MS = 10
+
+# Player actions, fed to the engine with press() and release()
+LEFT, RIGHT, DOWN, ROTATE, HARD_DROP, ROTATE_CCW, ROTATE_180 = range(7)
+REPEATING_ACTIONS = (LEFT, RIGHT, DOWN)
+
+# Smallest board every piece can spawn and rotate on
+MIN_BOARD_SIZE = 5
+
+# The 'lock' payload packs a piece's height below this into the same int as its top row
+LOCK_HEIGHTS = 8
+assert all(table.height < LOCK_HEIGHTS for tables in SHAPE_TABLES for table in tables)
+
+# (kind, rotation, x, y)
+PieceState = tuple[int, int, int, int]
+
+
+class EngineState(NamedTuple):
+    """Immutable, hashable copy of everything TetrisEngine.restore() needs"""
+    board: BoardState
+    piece: PieceState | None
+    generator: GeneratorState
+    game_speed: int
+    score: int
+    level: int
+    lines_cleared: int
+    is_game_over: bool
+    gravity_elapsed: int
+    tick_count: int
+    pending_inputs: tuple[tuple[int, bool], ...]
+    held_actions: tuple[tuple[int, tuple[int, int]], ...]
+    full_lines: tuple[int, ...]
+    pending_garbage: tuple[int, ...] = ()
+
+
+class UndoRecord(NamedTuple):
+    """What one locked piece changed, enough for TetrisEngine.undo() to take it back"""
+    piece: PieceState  # where the piece locked
+    generator: GeneratorState  # before the following piece was drawn
+    game_speed: int  # drop speed before the move
+    score: int = 0  # points the move scored
+    lines: int = 0
+    level: int = 0  # levels gained
+    cleared: tuple[int, ...] = ()  # rows removed, ascending
+    removed: tuple[ColorRow, ...] = ()  # their colours
+
+
+class TetrisEngine:
+    """Game rules and state, free of any display, audio or clock dependency"""
+    grid_columns: int = 10
+    grid_rows: int = 20
+    board: BitBoard
+    current_piece: Tetromino | None = None
+    generator: PieceGenerator
+    game_speed: int = 500  # milliseconds per drop
+    score: int = 0
+    level: int = 1
+    lines_cleared: int = 0
+    is_game_over: bool = False
+    gravity_elapsed: int = 0  # milliseconds since the last gravity step
+    repeat_delay: int = 100  # milliseconds an action is held before it auto-repeats (DAS)
+    move_delay: int = 30  # milliseconds between auto-repeated moves (ARR)
+    tick_count: int = 0
+    pending_inputs: list[tuple[int, bool]]  # (action, pressed) applied at the next tick
+    held_actions: dict[int, tuple[int, int]]  # action -> (tick first pressed, tick last moved)
+    listeners: list[EventListener]
+    undo_log: list[UndoRecord]
+    full_lines: list[int]  # rows the last locked piece completed, cleared by the next update()
+    pending_garbage: list[int]  # hole column of each garbage row waiting to rise, bottom row last
+    undo_limit: int = 0  # locked pieces undo() can take back, 0 keeps no log
+    features: FeatureTracker | None = None  # started by track_features(), then kept in step with every lock and clear
+
+    def __init__(
+        self,
+        seed: int | None = None,
+        strategy: str = 'random',
+        lookahead: int = 1,
+        columns: int = 10,
+        rows: int = 20,
+    ) -> None:
+        if columns < MIN_BOARD_SIZE or rows < MIN_BOARD_SIZE:
+            raise ValueError(f"Board must be at least {MIN_BOARD_SIZE}x{MIN_BOARD_SIZE}, got {columns}x{rows}")
+
+        self.grid_columns = columns
+        self.grid_rows = rows
+        self.listeners = []
+        self.pending_inputs = []
+        self.held_actions = {}
+        self.undo_log = []
+        self.full_lines = []
+        self.pending_garbage = []
+        self.generator = PieceGenerator(seed, strategy, lookahead)
+        self.reset(self.generator.seed)
+
+    @property
+    def grid(self) -> list[ColorRow]:
+        """Colour of every cell, 0 when empty"""
+        return self.board.colors
+
+    @property
+    def seed(self) -> int:
+        return self.generator.seed
+
+    @property
+    def next_piece(self) -> Tetromino:
+        return Tetromino(self.generator.queue[0])
+
+    def preview(self) -> tuple[int, ...]:
+        """Kinds of the upcoming pieces, soonest first"""
+        return self.generator.preview()
+
+    def track_features(self) -> FeatureTracker:
+        """Start updating board features and the Zobrist hash on every lock and clear, if not already"""
+        if self.features is None:
+            self.features = FeatureTracker(self.grid_columns, self.grid_rows)
+            self.features.reset(self.board.rows)
+        return self.features
+
+    @property
+    def board_hash(self) -> int:
+        """Zobrist hash of which cells are occupied"""
+        return self.track_features().hash
+
+    def observe(self) -> tuple[int, ...]:
+        """Board features followed by one-hot kinds of the current and upcoming pieces"""
+        kinds = self.preview()
+        if self.current_piece is not None:
+            kinds = (self.current_piece.kind, *kinds)
+        return encode(self.track_features().features(), kinds)
+
+    def spawn(self, kind: int) -> Tetromino:
+        piece = Tetromino(kind)
+        piece.position = (spawn_column(self.grid_columns), 0)
+        return piece
+
+    def new_piece(self) -> Tetromino:
+        return self.spawn(self.generator.next())
+
+    def add_listener(self, listener: EventListener) -> None:
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener: EventListener) -> None:
+        self.listeners.remove(listener)
+
+    def emit(self, event: str, value: int = 0) -> None:
+        for listener in self.listeners:
+            listener(event, value)
+
+    def reset(self, seed: int | None = None) -> None:
+        """Start a new game with its own piece sequence, from `seed` or a fresh random one"""
+        self.generator = PieceGenerator(seed, self.generator.strategy, self.generator.lookahead)
+        self.board = BitBoard(self.grid_columns, self.grid_rows)
+        if self.features is not None:
+            self.features.reset(self.board.rows)
+        self.game_speed = 500
+        self.score = 0
+        self.level = 1
+        self.lines_cleared = 0
+        self.is_game_over = False
+        self.gravity_elapsed = 0
+        self.tick_count = 0
+        self.pending_inputs.clear()
+        self.held_actions.clear()
+        self.undo_log.clear()
+        self.full_lines = []
+        self.pending_garbage = []
+
+        # Spawn the first piece; the generator's queue holds the upcoming ones
+        self.current_piece = self.new_piece()
+
+    def valid_move(self, dx: int, dy: int) -> bool:
+        """Check if the current piece can move by (dx, dy)"""
+        piece = self.current_piece
+        if piece is None:
+            return False
+
+        x, y = piece.position
+        return not self.board.collides(piece.kind, piece.rotation, x + dx, y + dy)
+
+    def move_piece(self, dx: int, dy: int) -> bool:
+        """Move the current piece by (dx, dy) if possible"""
+        if self.current_piece is None:
+            return False
+
+        if not self.valid_move(dx, dy):
+            return False
+        self.current_piece.position = (self.current_piece.position[0] + dx, self.current_piece.position[1] + dy)
+        return True
+
+    def drop_distance(self) -> int:
+        """Rows the current piece can fall before it lands"""
+        piece = self.current_piece
+        if piece is None:
+            return 0
+
+        x, y = piece.position
+        return self.board.drop_distance(piece.kind, piece.rotation, x, y)
+
+    def drop_piece(self) -> None:
+        """Drop the current piece down until it lands"""
+        if self.current_piece is None:
+            return
+
+        distance = self.drop_distance()
+        self.current_piece.position = (self.current_piece.position[0], self.current_piece.position[1] + distance)
+
+        self.emit('hard_drop', distance)
+
+    def hard_drop(self) -> None:
+        """Drop the current piece to the bottom and lock it in place"""
+        self.drop_piece()
+        self.lock_piece()
+
+    def rotate_piece(self, turns: int = 1) -> None:
+        """Rotate the current piece by quarter turns clockwise, taking the first SRS wall kick that fits"""
+        piece = self.current_piece
+        if piece is None:
+            return
+
+        kicked = self.board.rotate(piece.kind, piece.rotation, *piece.position, turns)
+        if kicked is not None:
+            piece.rotation, x, y = kicked
+            piece.position = (x, y)
+
+    def lock_piece(self) -> None:
+        """Lock the current piece into the grid"""
+        piece = self.current_piece
+        if piece is None:
+            return
+
+        x, y = piece.position
+        self.board.place(piece.kind, piece.rotation, x, y, piece.color)
+        if self.features is not None:
+            self.features.place(piece.kind, piece.rotation, x, y)
+        # Only rows under the piece can have become full
+        top = y + piece.table.top
+        self.full_lines = self.board.full_rows(top, top + piece.table.height)
+        if self.undo_limit:
+            self.undo_log.append(UndoRecord(
+                (piece.kind, piece.rotation, x, y),
+                self.generator.snapshot(),
+                self.game_speed,
+            ))
+            if len(self.undo_log) > self.undo_limit:
+                del self.undo_log[0]
+
+        self.current_piece = None
+        self.emit('lock', top * LOCK_HEIGHTS + piece.table.height)
+
+    def apply_gravity(self) -> None:
+        """Move the current piece down one row, locking it if it has landed"""
+        if not self.valid_move(0, 1):
+            # If the piece can't move down, it has landed
+            self.lock_piece()
+        elif self.current_piece is not None:
+            self.current_piece.position = (self.current_piece.position[0], self.current_piece.position[1] + 1)
+
+    def press(self, action: int) -> None:
+        """Queue an action press; it takes effect on the next tick"""
+        self.pending_inputs.append((action, True))
+
+    def release(self, action: int) -> None:
+        self.pending_inputs.append((action, False))
+
+    def release_all(self) -> None:
+        """Drop queued presses and release every held action on the next tick"""
+        self.pending_inputs = [(action, False) for action in self.held_actions]
+
+    def apply_input(self, action: int, pressed: bool) -> None:
+        if not pressed:
+            self.held_actions.pop(action, None)
+        elif action == LEFT:
+            self.move_piece(-1, 0)
+        elif action == RIGHT:
+            self.move_piece(1, 0)
+        elif action == DOWN:
+            self.move_piece(0, 1)
+        elif action == ROTATE:
+            self.rotate_piece()
+        elif action == ROTATE_CCW:
+            self.rotate_piece(3)
+        elif action == ROTATE_180:
+            self.rotate_piece(2)
+        elif action == HARD_DROP:
+            self.hard_drop()
+
+        if pressed and action in REPEATING_ACTIONS:
+            self.held_actions[action] = (self.tick_count, self.tick_count)
+
+    def repeat_held_actions(self) -> None:
+        """Auto-repeat held moves once they pass the DAS and ARR delays"""
+        if self.current_piece is None:
+            return
+
+        tick = self.tick_count
+        for action, (first_press_tick, last_move_tick) in list(self.held_actions.items()):
+            if (tick - first_press_tick) * TICK_MS > self.repeat_delay:
+                if (tick - last_move_tick) * TICK_MS > self.move_delay:
+                    if action == LEFT and self.move_piece(-1, 0):
+                        self.held_actions[action] = (first_press_tick, tick)
+                    elif action == RIGHT and self.move_piece(1, 0):
+                        self.held_actions[action] = (first_press_tick, tick)
+                    elif action == DOWN and self.move_piece(0, 1):
+                        self.held_actions[action] = (first_press_tick, tick)
+
+    def tick(self) -> None:
+        """Advance the game by one fixed step of TICK_MS milliseconds"""
+        if self.is_game_over:
+            return
+
+        self.tick_count += 1
+        inputs = self.pending_inputs
+        if inputs:
+            self.pending_inputs = []
+            for action, pressed in inputs:
+                self.emit('input', action * 2 + pressed)
+                self.apply_input(action, pressed)
+
+        self.repeat_held_actions()
+
+        self.gravity_elapsed += TICK_MS
+        if self.gravity_elapsed > self.game_speed:
+            self.gravity_elapsed = 0
+            self.apply_gravity()
+
+        self.update()
+
+    def update(self) -> None:
+        spawned = self.current_piece is None
+        if spawned:
+            self.current_piece = self.new_piece()
+
+        # If the new piece cannot be placed, the game is over
+        if not self.valid_move(0, 0):
+            self.is_game_over = True
+            self.emit('game_over', self.score)
+            return
+
+        if self.full_lines:
+            self.clear_lines()
+
+        # Garbage rises between pieces, after this piece's own clears had the chance to cancel it
+        if spawned and self.pending_garbage:
+            self.raise_garbage()
+
+    def add_garbage(self, count: int, hole: int) -> None:
+        """Queue `count` garbage rows, open at column `hole`, to rise when the next piece spawns"""
+        self.pending_garbage.extend([hole] * count)
+
+    def cancel_garbage(self, count: int) -> int:
+        """Drop up to `count` queued garbage rows, oldest first; returns how many were dropped"""
+        cancelled = min(count, len(self.pending_garbage))
+        del self.pending_garbage[:cancelled]
+        return cancelled
+
+    def raise_garbage(self) -> None:
+        holes = self.pending_garbage
+        self.pending_garbage = []
+        count = len(holes)
+        # Locked cells pushed past the top end the game, as does a stack pushed into the new piece
+        topped_out = any(self.board.rows[:count])
+        self.board.add_garbage(holes, GARBAGE_COLOR)
+        if self.features is not None:
+            self.features.reset(self.board.rows)
+        # The undo log's rows no longer line up with the board
+        self.undo_log.clear()
+        self.emit('garbage', count)
+
+        if topped_out or not self.valid_move(0, 0):
+            self.is_game_over = True
+            self.emit('game_over', self.score)
+
+    def clear_lines(self) -> None:
+        """Clear the rows the last locked piece completed, then score them"""
+        lines_to_clear = self.full_lines
+        self.full_lines = []
+        score = self.score
+        level = self.level
+
+        removed = []
+        if lines_to_clear:
+            removed = self.board.remove_rows(lines_to_clear)
+            if self.features is not None:
+                self.features.clear(lines_to_clear)
+            combo_bonus = 0
+            for _ in lines_to_clear:
+                combo_bonus += 1
+                self.score += 100 * combo_bonus
+
+            self.emit('lines_cleared', len(lines_to_clear))
+
+        self.lines_cleared += len(lines_to_clear)
+        if self.lines_cleared >= 10 * self.level:
+            self.level += 1
+            self.score += 1000
+            self.game_speed = max(100, self.game_speed - 50)
+            self.emit('level_up', self.level)
+
+        if self.score != score and self.undo_log:
+            self.undo_log[-1] = self.undo_log[-1]._replace(
+                score=self.score - score,
+                lines=len(lines_to_clear),
+                level=self.level - level,
+                cleared=tuple(lines_to_clear),
+                removed=tuple(removed),
+            )
+
+    def undo(self) -> bool:
+        """Take back the last locked piece, putting it back at the spawn; False if the log is empty"""
+        if not self.undo_log:
+            return False
+
+        record = self.undo_log.pop()
+        kind, rotation, x, y = record.piece
+        if record.cleared:
+            self.board.restore_rows(list(record.cleared), list(record.removed))
+        self.board.unplace(kind, rotation, x, y)
+        if self.features is not None:
+            self.features.reset(self.board.rows)
+        self.generator.restore(record.generator)
+        self.current_piece = self.spawn(kind)
+        self.score -= record.score
+        self.lines_cleared -= record.lines
+        self.level -= record.level
+        self.game_speed = record.game_speed
+        self.is_game_over = False
+        self.gravity_elapsed = 0
+        self.pending_inputs.clear()
+        self.held_actions.clear()
+        self.full_lines = []
+        return True
+
+    def snapshot(self) -> EngineState:
+        """Capture the game; the board part shares its rows with the live board instead of copying cells"""
+        piece = self.current_piece
+        return EngineState(
+            self.board.snapshot(),
+            None if piece is None else (piece.kind, piece.rotation, *piece.position),
+            self.generator.snapshot(),
+            self.game_speed,
+            self.score,
+            self.level,
+            self.lines_cleared,
+            self.is_game_over,
+            self.gravity_elapsed,
+            self.tick_count,
+            tuple(self.pending_inputs),
+            tuple(self.held_actions.items()),
+            tuple(self.full_lines),
+            tuple(self.pending_garbage),
+        )
+
+    def restore(self, state: EngineState) -> None:
+        """Return to a snapshot(); the undo log is cleared"""
+        self.board.restore(state.board)
+        if self.features is not None:
+            self.features.reset(self.board.rows)
+        if state.piece is None:
+            self.current_piece = None
+        else:
+            kind, rotation, x, y = state.piece
+            self.current_piece = Tetromino(kind)
+            self.current_piece.rotation = rotation
+            self.current_piece.position = (x, y)
+        self.generator.restore(state.generator)
+        self.game_speed = state.game_speed
+        self.score = state.score
+        self.level = state.level
+        self.lines_cleared = state.lines_cleared
+        self.is_game_over = state.is_game_over
+        self.gravity_elapsed = state.gravity_elapsed
+        self.tick_count = state.tick_count
+        self.pending_inputs = list(state.pending_inputs)
+        self.held_actions = dict(state.held_actions)
+        self.full_lines = list(state.full_lines)
+        self.pending_garbage = list(state.pending_garbage)
+        self.undo_log.clear()
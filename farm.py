@@ -0,0 +1,170 @@
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+import argparse
+import json
+import os
+import random
+import sys
+
+from ai import Bot, BotController
+from engine import HARD_DROP, RIGHT, ROTATE, TICK_MS, TetrisEngine
+from profiler import nearest_rank
+from randomizer import STRATEGIES
+
+STAT_FIELDS = ('score', 'lines', 'level', 'pieces', 'ticks')
+
+
+class GameStats(NamedTuple):
+    seed: int
+    score: int
+    lines: int
+    level: int
+    pieces: int
+    ticks: int
+
+
+def random_policy(engine: TetrisEngine, rng: random.Random) -> None:
+    """Rotate and shift the piece by random amounts, then hard drop it"""
+    for _ in range(rng.randrange(4)):
+        engine.press(ROTATE)
+        engine.tick()
+    for _ in range(rng.randrange(engine.grid_columns)):
+        engine.press(RIGHT)
+        engine.tick()
+        engine.release(RIGHT)
+    engine.press(HARD_DROP)
+    engine.tick()
+
+
+# One bot per board size in each worker process, so its move cache is shared by every game the worker plays
+bots: dict[tuple[int, int], Bot] = {}
+
+
+def bot_policy(engine: TetrisEngine, rng: random.Random) -> None:
+    """Let the built-in bot choose the placement and feed its path to the engine"""
+    size = (engine.grid_columns, engine.grid_rows)
+    bot = bots.get(size)
+    if bot is None:
+        bot = bots[size] = Bot(columns=engine.grid_columns, rows=engine.grid_rows)
+    controller = BotController(bot, engine)
+    piece = engine.current_piece
+    while engine.current_piece is piece and not engine.is_game_over:
+        controller.drive()
+        engine.tick()
+
+
+Policy = Callable[[TetrisEngine, random.Random], None]
+
+# Each policy places one piece per call by feeding actions to the engine
+POLICIES: dict[str, Policy] = {
+    'random': random_policy,
+    'bot': bot_policy,
+}
+
+
+def play_game(seed: int, strategy: str = 'random', policy: str = 'random', max_ticks: int = 1_000_000) -> GameStats:
+    """Play one headless game to the end (or max_ticks) and return its statistics"""
+    engine = TetrisEngine(seed, strategy)
+    rng = random.Random(seed)
+    pieces = 0
+
+    def count_pieces(event: str, value: int) -> None:
+        nonlocal pieces
+        if event == 'lock':
+            pieces += 1
+
+    engine.add_listener(count_pieces)
+    place_piece = POLICIES[policy]
+    while not engine.is_game_over and engine.tick_count < max_ticks:
+        place_piece(engine, rng)
+
+    return GameStats(seed, engine.score, engine.lines_cleared, engine.level, pieces, engine.tick_count)
+
+
+def summarize(results: list[GameStats]) -> dict[str, dict[str, float]]:
+    """Distribution of each statistic across games; empty when no games were played"""
+    summary = {}
+    if not results:
+        return summary
+    for field in STAT_FIELDS:
+        values = sorted(getattr(result, field) for result in results)
+        summary[field] = {
+            'min': values[0],
+            'p50': nearest_rank(values, 0.50),
+            'p90': nearest_rank(values, 0.90),
+            'p99': nearest_rank(values, 0.99),
+            'max': values[-1],
+            'mean': sum(values) / len(values),
+        }
+    return summary
+
+
+def run_farm(
+    games: int,
+    workers: int | None = None,
+    seed: int = 0,
+    strategy: str = 'random',
+    policy: str = 'random',
+    max_ticks: int = 1_000_000,
+    progress: bool = False,
+) -> list[GameStats]:
+    """Play `games` games across a process pool; game i always uses seed + i"""
+    results = []
+    seeds = range(seed, seed + games)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Hand games out in chunks so short games don't drown in inter-process overhead
+        chunksize = max(1, games // ((workers or os.cpu_count() or 1) * 8))
+        stream = executor.map(
+            play_game,
+            seeds,
+            [strategy] * games,
+            [policy] * games,
+            [max_ticks] * games,
+            chunksize=chunksize,
+        )
+        for result in stream:
+            results.append(result)
+            if progress:
+                print(f"\r{len(results)}/{games} games", end='', file=sys.stderr, flush=True)
+    if progress:
+        print(file=sys.stderr)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Play many headless Tetris games in parallel and report statistics")
+    parser.add_argument('--games', type=int, default=100, help="number of games to play")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first game; game i uses seed + i")
+    parser.add_argument('--randomizer', choices=STRATEGIES, default='random', help="piece randomizer")
+    parser.add_argument('--policy', choices=POLICIES, default='random', help="how pieces are placed")
+    parser.add_argument('--max-ticks', type=int, default=1_000_000, help="stop a game after this many ticks")
+    parser.add_argument('--json', action='store_true', help="print the summary and every game as JSON")
+    args = parser.parse_args()
+    if args.games < 1:
+        parser.error("--games must be at least 1")
+
+    results = run_farm(
+        args.games,
+        args.workers,
+        args.seed,
+        args.randomizer,
+        args.policy,
+        args.max_ticks,
+        progress=not args.json,
+    )
+    summary = summarize(results)
+
+    if args.json:
+        print(json.dumps({'summary': summary, 'games': [result._asdict() for result in results]}))
+        return
+
+    print(f"{len(results)} games, seeds {args.seed}..{args.seed + args.games - 1}, {TICK_MS} ms ticks")
+    print(f"{'':8}" + ''.join(f"{name:>10}" for name in ('min', 'p50', 'p90', 'p99', 'max', 'mean')))
+    for field, stats in summary.items():
+        print(f"{field:8}" + ''.join(f"{stats[name]:>10.0f}" for name in ('min', 'p50', 'p90', 'p99', 'max', 'mean')))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable
+from typing import Generic, NamedTuple, TypeVar
+import functools
+import random
+
+from tetromino import SHAPE_TABLES
+
+ZOBRIST_SEED = 0x7E7215  # fixed, so hashes match across processes and runs
+EMPTY_ROW_TRANSITIONS = 2  # an empty row changes from wall to empty and back
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class Zobrist:
+    """Random 64-bit key per cell; a board hashes to the XOR of the keys of its occupied cells
+
+    Each row also gets lookup tables of the XOR for every 4-cell pattern, built on
+    first use, so a whole row hashes in a few lookups instead of one per cell.
+    """
+    columns: int
+    rows: int
+    keys: tuple[int, ...]  # indexed like BitBoard.packed, y * columns + x
+    tables: list[list[int] | None]  # per row: XOR of the keys for each nibble value, 16 per nibble
+
+    def __init__(self, columns: int, rows: int) -> None:
+        self.columns = columns
+        self.rows = rows
+        rng = random.Random(f'{ZOBRIST_SEED}:{columns}x{rows}')
+        self.keys = tuple(rng.getrandbits(64) for _ in range(columns * rows))
+        self.tables = [None] * rows
+
+    def row_table(self, y: int) -> list[int]:
+        table = []
+        offset = y * self.columns
+        for nibble in range(0, self.columns, 4):
+            keys = self.keys[offset + nibble:offset + min(nibble + 4, self.columns)]
+            for value in range(16):
+                combined = 0
+                for bit, key in enumerate(keys):
+                    if value >> bit & 1:
+                        combined ^= key
+                table.append(combined)
+        self.tables[y] = table
+        return table
+
+    def row_hash(self, y: int, bits: int) -> int:
+        table = self.tables[y] or self.row_table(y)
+        value = 0
+        index = 0
+        while bits:
+            value ^= table[index + (bits & 15)]
+            bits >>= 4
+            index += 16
+        return value
+
+    def cells_hash(self, packed: int) -> int:
+        """Hash of a few scattered cells, e.g. one piece, one key at a time"""
+        keys = self.keys
+        value = 0
+        while packed:
+            low = packed & -packed
+            value ^= keys[low.bit_length() - 1]
+            packed ^= low
+        return value
+
+    def board_hash(self, packed: int) -> int:
+        """Hash of a whole packed board, row by row"""
+        columns = self.columns
+        full_row = (1 << columns) - 1
+        value = 0
+        y = 0
+        while packed:
+            bits = packed & full_row
+            if bits:
+                value ^= self.row_hash(y, bits)
+            packed >>= columns
+            y += 1
+        return value
+
+
+@functools.cache
+def zobrist(columns: int, rows: int) -> Zobrist:
+    """The shared Zobrist keys of a board size, the same in every process and run"""
+    return Zobrist(columns, rows)
+
+
+# Per kind and rotation: (column offset, top cell row offset, cells) for each column the shape covers
+COLUMN_SPANS = tuple(
+    tuple(
+        tuple(
+            (x, min(cy for cx, cy in table.cells if cx == x), sum(1 for cx, _ in table.cells if cx == x))
+            for x in sorted({cx for cx, _ in table.cells})
+        )
+        for table in tables
+    )
+    for tables in SHAPE_TABLES
+)
+
+
+def row_transitions(bits: int, columns: int) -> int:
+    """Filled/empty changes along a row, counting the walls on both sides as filled"""
+    walled = (bits << 1) | 1 | (1 << (columns + 1))
+    return ((walled ^ (walled >> 1)) & ((1 << (columns + 1)) - 1)).bit_count()
+
+
+class BoardFeatures(NamedTuple):
+    heights: tuple[int, ...]  # rows from the floor up to the top filled cell of each column
+    holes: int  # empty cells with a filled cell above them
+    row_transitions: int  # filled/empty changes along every row, walls counting as filled
+    wells: int  # summed depth of columns lower than both neighbours (or the wall)
+
+    @property
+    def aggregate_height(self) -> int:
+        return sum(self.heights)
+
+    @property
+    def bumpiness(self) -> int:
+        return sum(abs(left - right) for left, right in zip(self.heights, self.heights[1:]))
+
+
+class FeatureTracker:
+    """Board features and Zobrist hash of a board, updated from each placement and clear
+
+    place() touches only the rows and columns under the piece. clear() shifts the
+    per-row values, rescans only the columns whose top cell was removed, and
+    rehashes only the rows that moved.
+    """
+    columns: int
+    rows: int
+    zobrist: Zobrist
+    cells: list[int]  # bit x of row y set when the cell is occupied
+    heights: list[int]
+    filled: list[int]  # occupied cells per column; holes are heights minus these
+    transitions: list[int]  # row_transitions() per row
+    wells: list[int]  # well depth per column
+    total_transitions: int = 0
+    total_wells: int = 0
+    hash: int = 0
+
+    def __init__(self, columns: int, rows: int) -> None:
+        self.columns = columns
+        self.rows = rows
+        self.zobrist = zobrist(columns, rows)
+        self.reset([0] * rows)
+
+    def reset(self, cells: list[int]) -> None:
+        """Recompute everything from row bitmasks, e.g. after a restore or undo"""
+        columns = self.columns
+        self.cells = list(cells)
+        self.heights = [0] * columns
+        self.filled = [0] * columns
+        self.hash = 0
+        for y, bits in enumerate(self.cells):
+            if bits:
+                self.hash ^= self.zobrist.row_hash(y, bits)
+            while bits:
+                low = bits & -bits
+                x = low.bit_length() - 1
+                self.filled[x] += 1
+                if not self.heights[x]:
+                    self.heights[x] = self.rows - y
+                bits ^= low
+        self.transitions = [row_transitions(bits, columns) for bits in self.cells]
+        self.total_transitions = sum(self.transitions)
+        self.wells = [self.well_depth(x) for x in range(columns)]
+        self.total_wells = sum(self.wells)
+
+    def well_depth(self, x: int) -> int:
+        heights = self.heights
+        left = heights[x - 1] if x > 0 else self.rows
+        right = heights[x + 1] if x + 1 < self.columns else self.rows
+        return max(0, min(left, right) - heights[x])
+
+    def update_wells(self, start: int, stop: int) -> None:
+        wells = self.wells
+        for x in range(max(0, start), min(self.columns, stop)):
+            depth = self.well_depth(x)
+            self.total_wells += depth - wells[x]
+            wells[x] = depth
+
+    def place(self, kind: int, rotation: int, x: int, y: int) -> None:
+        """Add a locked piece with its shape origin at (x, y)"""
+        table = SHAPE_TABLES[kind][rotation]
+        columns = self.columns
+        keys = self.zobrist.keys
+        board_hash = self.hash
+        for cx, cy in table.cells:
+            board_hash ^= keys[(y + cy) * columns + x + cx]
+        self.hash = board_hash
+
+        cells = self.cells
+        transitions = self.transitions
+        left = x + table.left
+        top = y + table.top
+        walls = 1 | (1 << (columns + 1))
+        inner = (1 << (columns + 1)) - 1
+        total = self.total_transitions
+        for row, bits in enumerate(table.row_bits, top):
+            bits = cells[row] | (bits << left)
+            cells[row] = bits
+            # row_transitions(), inlined
+            walled = (bits << 1) | walls
+            count = ((walled ^ (walled >> 1)) & inner).bit_count()
+            total += count - transitions[row]
+            transitions[row] = count
+        self.total_transitions = total
+
+        heights = self.heights
+        filled = self.filled
+        rows = self.rows
+        for cx, cy, count in COLUMN_SPANS[kind][rotation]:
+            column = x + cx
+            filled[column] += count
+            if heights[column] < rows - y - cy:
+                heights[column] = rows - y - cy
+
+        # A column's well depth depends on its neighbours' heights too
+        wells = self.wells
+        total = self.total_wells
+        last = columns - 1
+        for column in range(max(0, left - 1), min(columns, left + table.width + 1)):
+            side = min(heights[column - 1] if column else rows, heights[column + 1] if column < last else rows)
+            depth = side - heights[column] if side > heights[column] else 0
+            total += depth - wells[column]
+            wells[column] = depth
+        self.total_wells = total
+
+    def clear(self, lines: list[int]) -> None:
+        """Remove full rows (ascending) and drop everything above them"""
+        if not lines:
+            return
+        count = len(lines)
+        removed = set(lines)
+        top = self.rows - max(self.heights)
+
+        # Rows from the top of the stack down to the last cleared row move or vanish
+        row_hash = self.zobrist.row_hash
+        for y in range(top, lines[-1] + 1):
+            self.hash ^= row_hash(y, self.cells[y])
+        self.cells = [0] * count + [bits for y, bits in enumerate(self.cells) if y not in removed]
+        for y in range(top + count, lines[-1] + 1):
+            self.hash ^= row_hash(y, self.cells[y])
+
+        # Full rows have no transitions; the new empty rows at the top have two each
+        self.transitions = [EMPTY_ROW_TRANSITIONS] * count + [t for y, t in enumerate(self.transitions) if y not in removed]
+        self.total_transitions += EMPTY_ROW_TRANSITIONS * count
+
+        # Every column lost one cell per full row; only columns whose top cell was removed need a rescan
+        for x in range(self.columns):
+            self.filled[x] -= count
+            if self.rows - self.heights[x] in removed:
+                self.heights[x] = self.column_height(x)
+            else:
+                self.heights[x] -= count
+        self.update_wells(0, self.columns)
+
+    def column_height(self, x: int) -> int:
+        bit = 1 << x
+        for y, bits in enumerate(self.cells):
+            if bits & bit:
+                return self.rows - y
+        return 0
+
+    @property
+    def holes(self) -> int:
+        return sum(self.heights) - sum(self.filled)
+
+    def features(self) -> BoardFeatures:
+        return BoardFeatures(tuple(self.heights), self.holes, self.total_transitions, self.total_wells)
+
+
+def encode(features: BoardFeatures, kinds: Iterable[int]) -> tuple[int, ...]:
+    """Flat observation: column heights, holes, row transitions, wells, then a one-hot kind per piece"""
+    observation = [*features.heights, features.holes, features.row_transitions, features.wells]
+    for kind in kinds:
+        one_hot = [0] * len(SHAPE_TABLES)
+        one_hot[kind] = 1
+        observation += one_hot
+    return tuple(observation)
+
+
+class TranspositionCache(Generic[K, V]):
+    """Least-recently-used map with an entry cap, for values worth computing once per position"""
+    entries: OrderedDict[K, V]
+    max_entries: int
+    hits: int = 0
+    misses: int = 0
+
+    def __init__(self, max_entries: int = 65536) -> None:
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+
+    def get(self, key: K) -> V | None:
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: K, value: V) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,171 @@
+import argparse
+import random
+import sys
+
+import numpy as np
+
+from ai import MoveGenerator
+from batch_env import BatchTetris
+from engine import MIN_BOARD_SIZE, TetrisEngine
+from tetromino import ROTATION_KICKS, SHAPE_TABLES, Tetromino
+
+# A case: kind, rotation, x, y, quarter turns clockwise, board as a packed integer
+Case = tuple[int, int, int, int, int, int]
+
+
+def cells_mask(kind: int, rotation: int, x: int, y: int, columns: int) -> int:
+    mask = 0
+    for cx, cy in SHAPE_TABLES[kind][rotation].cells:
+        mask |= 1 << ((y + cy) * columns + x + cx)
+    return mask
+
+
+def kick_cases(columns: int, rows: int) -> tuple[list[tuple[Case, int]], list[tuple[int, int, int, int]]]:
+    """One board per kick on which that kick is the first to fit, and the kicks no board can reach that way
+
+    The board is full except for the piece and the kick's target cells, which is the
+    fewest cells any board where the kick fits can leave free; if an earlier kick
+    still fits there, it always wins and the later one is unreachable.
+    """
+    full = (1 << (columns * rows)) - 1
+    cases = []
+    unreachable = []
+    x, y = columns // 2 - 2, rows // 2 - 2
+    for kind, kicks in enumerate(ROTATION_KICKS):
+        for rotation, by_turns in enumerate(kicks):
+            for turns in range(1, 4):
+                for index, (new_rotation, dx, dy) in enumerate(by_turns[turns]):
+                    free = cells_mask(kind, rotation, x, y, columns) | cells_mask(kind, new_rotation, x + dx, y + dy, columns)
+                    earlier = any(
+                        cells_mask(kind, r, x + ex, y + ey, columns) & ~free == 0
+                        for r, ex, ey in by_turns[turns][:index]
+                    )
+                    if earlier:
+                        unreachable.append((kind, rotation, turns, index))
+                    else:
+                        cases.append(((kind, rotation, x, y, turns, full & ~free), index))
+    return cases, unreachable
+
+
+def random_cases(count: int, columns: int, rows: int, rng: random.Random) -> list[Case]:
+    """Pieces that fit on random boards, a mix of sparse and dense, turned every way"""
+    generator = MoveGenerator(columns, rows)
+    cases = []
+    while len(cases) < count:
+        density = rng.choice((0.2, 0.5, 0.7))
+        packed = sum(1 << bit for bit in range(columns * rows) if rng.random() < density)
+        kind = rng.randrange(len(SHAPE_TABLES))
+        rotation = rng.randrange(len(SHAPE_TABLES[kind]))
+        x, y = rng.randrange(-2, columns), rng.randrange(-2, rows)
+        if generator.fits(packed, kind, rotation, x, y):
+            cases.extend((kind, rotation, x, y, turns, packed) for turns in range(1, 4))
+    return cases
+
+
+def expected(case: Case, columns: int, rows: int) -> tuple[int, int, int]:
+    """The rule itself: the first kick whose cells are inside the board and free
+
+    This reads the same ROTATION_KICKS as the code it checks, so it catches the
+    implementations disagreeing, not a wrong kick; test_rotation.py pins the values.
+    """
+    kind, rotation, x, y, turns, packed = case
+    for new_rotation, dx, dy in ROTATION_KICKS[kind][rotation][turns]:
+        cells = [(x + dx + cx, y + dy + cy) for cx, cy in SHAPE_TABLES[kind][new_rotation].cells]
+        if all(0 <= cx < columns and 0 <= cy < rows and not packed >> (cy * columns + cx) & 1 for cx, cy in cells):
+            return new_rotation, x + dx, y + dy
+    return rotation, x, y
+
+
+def engine_results(cases: list[Case], columns: int, rows: int) -> list[tuple[int, int, int]]:
+    engine = TetrisEngine(0, columns=columns, rows=rows)
+    results = []
+    for kind, rotation, x, y, turns, packed in cases:
+        # Only the occupancy bits matter to rotation, so the board is set directly
+        engine.board.packed = packed
+        piece = engine.current_piece = Tetromino(kind)
+        piece.rotation, piece.position = rotation, (x, y)
+        engine.rotate_piece(turns)
+        results.append((piece.rotation, *piece.position))
+    return results
+
+
+def generator_results(cases: list[Case], columns: int, rows: int) -> list[tuple[int, int, int]]:
+    generator = MoveGenerator(columns, rows)
+    return [generator.rotate(packed, kind, rotation, x, y, turns) for kind, rotation, x, y, turns, packed in cases]
+
+
+def batch_results(cases: list[Case], columns: int, rows: int) -> list[tuple[int, int, int]]:
+    env = BatchTetris(len(cases), seed=0, columns=columns, rows=rows)
+    bits = np.array([[packed >> bit & 1 for bit in range(columns * rows)] for *_, packed in cases], dtype=np.uint8)
+    env.boards[:] = bits.reshape(len(cases), rows, columns)
+    env.kind[:] = [case[0] for case in cases]
+    env.rotation[:] = [case[1] for case in cases]
+    env.x[:] = [case[2] for case in cases]
+    env.y[:] = [case[3] for case in cases]
+    turns = np.array([case[4] for case in cases])
+    for quarter in range(1, 4):
+        env.rotate(np.flatnonzero(turns == quarter), quarter)
+    return list(zip(env.rotation.tolist(), env.x.tolist(), env.y.tolist()))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Check every SRS wall kick against the engine, the bot and the batch environment")
+    parser.add_argument('--random', type=int, default=3000, help="random boards to try on top of the constructed ones")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--columns', type=int, default=10)
+    parser.add_argument('--rows', type=int, default=20)
+    parser.add_argument('--list-shadowed', action='store_true', help="print the kicks an earlier kick always wins over")
+    args = parser.parse_args()
+    columns, rows = args.columns, args.rows
+    if columns < 8 or rows < 12:
+        # The constructed boards need room for a kick of 2 in any direction around the middle
+        parser.error("the board must be at least 8x12")
+    failures = 0
+
+    for kind, tables in enumerate(SHAPE_TABLES):
+        if len(tables) > 1 and len({table.cells for table in tables}) != 4:
+            print(f"Error: piece {kind} does not have 4 distinct rotation states")
+            failures += 1
+
+    # Every piece must reach all its states by rotating at spawn on the smallest board
+    for kind, tables in enumerate(SHAPE_TABLES):
+        engine = TetrisEngine(0, columns=MIN_BOARD_SIZE, rows=MIN_BOARD_SIZE)
+        engine.current_piece = engine.spawn(kind)
+        seen = set()
+        for _ in range(len(tables)):
+            engine.rotate_piece()
+            seen.add(engine.current_piece.rotation)
+        if len(seen) != len(tables):
+            print(f"Error: piece {kind} only reaches rotations {sorted(seen)} on a {MIN_BOARD_SIZE}x{MIN_BOARD_SIZE} board")
+            failures += 1
+
+    kicked, unreachable = kick_cases(columns, rows)
+    for case, index in kicked:
+        kind, rotation, x, y, turns, _ = case
+        new_rotation, dx, dy = ROTATION_KICKS[kind][rotation][turns][index]
+        if expected(case, columns, rows) != (new_rotation, x + dx, y + dy):
+            print(f"Error: kick {index} of piece {kind} rotation {rotation} turns {turns} is not the first to fit on its board")
+            failures += 1
+
+    cases = [case for case, _ in kicked] + random_cases(args.random, columns, rows, random.Random(args.seed))
+    want = [expected(case, columns, rows) for case in cases]
+    for name, results in (
+        ('TetrisEngine', engine_results(cases, columns, rows)),
+        ('MoveGenerator', generator_results(cases, columns, rows)),
+        ('BatchTetris', batch_results(cases, columns, rows)),
+    ):
+        wrong = [(case, got, good) for case, got, good in zip(cases, results, want) if got != good]
+        for (kind, rotation, x, y, turns, _), got, good in wrong[:5]:
+            print(f"Error: {name} turned piece {kind} rotation {rotation} at ({x}, {y}) by {turns} to {got}, expected {good}")
+        failures += len(wrong)
+
+    print(f"{len(kicked)} kicks checked on constructed boards, {len(unreachable)} shadowed by an earlier kick")
+    if args.list_shadowed:
+        for kind, rotation, turns, index in unreachable:
+            print(f"  piece {kind} rotation {rotation} turns {turns}: kick {index}")
+    print(f"{len(cases)} rotations compared across TetrisEngine, MoveGenerator and BatchTetris: {failures} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,224 +1,42 @@
+import time
+
+STARTED = time.perf_counter()  # launch, for time-to-first-frame; importing pygame below is part of startup
+
+from contextlib import AbstractContextManager, nullcontext
 from datetime import date, datetime
+from pathlib import Path
+import argparse
+import functools
 import random
+import sqlite3
 import pygame
 
-# fmt: off
-TETROMINO_INFO = [
-    # O
-    {
-        'shapes': [
-            [
-                '00',
-                '00',
-            ]
-        ],
-        'color': (0xfb, 0xe7, 0xa1)
-    },
-    # I
-    {
-        'shapes': [
-            [
-                '....',
-                '....',
-                '....',
-                '0000',
-                '....',
-            ],
-            [
-                '.0..',
-                '.0..',
-                '.0..',
-                '.0..'
-            ],
-            [
-                '....',
-                '....',
-                '....',
-                '0000',
-                '....',
-            ],
-            [
-                '..0.',
-                '..0.',
-                '..0.',
-                '..0.'
-            ],
-        ],
-        'color': (0x7f, 0xd8, 0xbe)
-    },
-    # T
-    {
-        'shapes': [
-            [
-                '.0.',
-                '000',
-                '...',
-            ],
-            [
-                '.0.',
-                '.00',
-                '.0.',
-            ],
-            [
-                '...',
-                '000',
-                '.0.',
-            ],
-            [
-                '.0.',
-                '00.',
-                '.0.',
-            ],
-        ],
-        'color': (0xbf, 0xa2, 0xdb)
-    },
-    # S
-    {
-        'shapes': [
-            [
-                '.....',
-                '..00.',
-                '.00..',
-                '.....',
-            ],
-            [
-                '.....',
-                '.0...',
-                '.00..',
-                '..0..',
-            ],
-            [
-                '.....',
-                '..00.',
-                '.00..',
-                '.....',
-            ],
-            [
-                '.....',
-                '.0...',
-                '.00..',
-                '..0..',
-            ],
-        ],
-        'color': (0x81, 0xd4, 0xfa)
-    },
-    # Z
-    {
-        'shapes': [
-            [
-                '.....',
-                '.00..',
-                '..00.',
-                '.....',
-            ],
-            [
-                '.....',
-                '..0..',
-                '.00..',
-                '.0...',
-            ],
-            [
-                '.....',
-                '.00..',
-                '..00.',
-                '.....',
-            ],
-            [
-                '.....',
-                '...0.',
-                '..00.',
-                '..0..',
-            ],
-        ],
-        'color': (0xf0, 0xcd, 0xd2)
-    },
-    # L
-    {
-        'shapes': [
-            [
-                '.....',
-                '..0..',
-                '..0..',
-                '..00.',
-                '.....',
-            ],
-            [
-                '.....',
-                '.....',
-                '.000.',
-                '.0...',
-                '.....',
-            ],
-            [
-                '.....',
-                '.00..',
-                '..0..',
-                '..0..',
-                '.....',
-            ],
-            [
-                '.....',
-                '...0.',
-                '.000.',
-                '.....',
-                '.....',
-            ]
-        ],
-        'color': (0xff, 0xbb, 0xd0)
-    },
-    # J
-    {
-        'shapes': [
-            [
-                '.....',
-                '..0..',
-                '..0..',
-                '.00..',
-                '.....',
-            ],
-            [
-                '.....',
-                '.0...',
-                '.000.',
-                '.....',
-                '.....',
-            ],
-            [
-                '.....',
-                '..00.',
-                '..0..',
-                '..0..',
-                '.....',
-            ],
-            [
-                '.....',
-                '.....',
-                '.000.',
-                '...0.',
-                '.....',
-            ],
-        ],
-        'color': (0x90, 0xca, 0xf9)
-    },
-]
-
-class Tetromino:
-    shape: list[list[str]]
-    rotation: int
-    color: tuple[int, int, int]
-    position: tuple[int, int]
-
-    def __init__(self, shape: list[list[str]], color: tuple[int, int, int]) -> None:
-        self.shape = shape
-        self.rotation = 0
-        self.color = color
-        self.position = (0, 0)
-
-    def rotate(self) -> None:
-        self.rotation = (self.rotation + 1) % len(self.shape)
-
-    def get_shape(self) -> list[str]:
-        return self.shape[self.rotation]
+from address import parse_address
+from ai import Bot, BotController
+from assets import AssetCache
+from engine import DOWN, HARD_DROP, LEFT, LOCK_HEIGHTS, MIN_BOARD_SIZE, RIGHT, ROTATE, ROTATE_180, ROTATE_CCW, TICK_MS, TetrisEngine
+from profiler import Profiler, write_trace
+from randomizer import STRATEGIES
+from replay import ReplayError, ReplayRecorder, check_recordable
+from scores import ScoreStore
+from spectator import DEFAULT_PORT as SPECTATOR_PORT
+from spectator import SpectatorPublisher
+from telemetry import DEFAULT_PORT as TELEMETRY_PORT
+from telemetry import TelemetryClient
+from tetromino import COLORS, SHAPE_TABLES
+from worker import IOWorker, write_file
+
+# Stands in for a profiler phase when profiling is off
+NO_PHASE = nullcontext()
+
+
+def scroll_to(view: int, start: int, size: int, visible: int, total: int) -> int:
+    """First cell of a `visible`-cell view over `total` cells that shows cells [start, start + size)"""
+    if start < view or start + size > view + visible:
+        # Jump to centre the target rather than creeping along, so the view moves rarely
+        view = start + size // 2 - visible // 2
+    return max(0, min(view, total - visible))
+
 
 class Tetris:
     screen: pygame.Surface
@@ -227,40 +45,113 @@ class Tetris:
     right_panel_color: tuple[int, int, int] = (50, 50, 50)
     grid_color: tuple[int, int, int] = (33, 33, 33)
     grid_line_color: tuple[int, int, int] = (200, 200, 200)
-    grid_columns: int = 10
-    grid_rows: int = 20
-    grid: list[list[int | tuple[int, int, int]]]
-    current_piece: Tetromino | None = None
-    next_piece: Tetromino | None = None
-    game_speed: int = 500  # milliseconds per drop
-    score: int = 0
-    level: int = 1
-    lines_cleared: int = 0
-    is_game_over: bool = False
-    held_keys: dict[int, tuple[int, int]] = {}
-    repeat_delay: int = 100  # milliseconds
-    move_delay: int = 30  # milliseconds
+    show_ghost: bool = True
+    dirty_rendering: bool = True  # push only changed screen areas instead of flipping every frame
+    background: pygame.Surface
+    board_surface: pygame.Surface
+    board_dirty: bool = True  # rebuild the whole board surface
+    dirty_rows: tuple[int, int] | None = None  # board rows [start, stop) whose cells changed since the last draw
+    needs_full_redraw: bool = True
+    min_cell_size: int = 8  # boards that would need smaller cells scroll instead
+    view_x: int = 0  # first board column and row in view, when the board does not fit on screen
+    view_y: int = 0
+    drawn_piece: tuple[int, int, int, int, int] | None = None
+    drawn_status: tuple[int, int, int, tuple[int, ...]] | None = None
+    state: str = 'playing'  # 'playing', 'paused' or 'game_over'
+    idle_timeout: int = 1000  # milliseconds to block waiting for input while not playing
+    engine: TetrisEngine
+    replay_dir: Path | None = None  # record every game into this directory
+    recorder: ReplayRecorder | None = None
+    demo: BotController | None = None  # the bot plays instead of the keyboard
+    profiler: Profiler | None = None
+    profile_path: Path | None = None  # write a frame trace of every game next to this path
+    show_hud: bool = False  # performance overlay, toggled with F3
+    hud_interval: int = 250  # milliseconds between overlay refreshes
+    hud_updated: int = 0
+    scores: ScoreStore | None = None  # opened on the I/O worker after the first frame
+    score_path: Path | None = None
+    player: str = 'player'  # name stored with each score
+    io: IOWorker  # audio, file writes and telemetry, off the frame loop
+    telemetry: TelemetryClient | None = None
+    publisher: SpectatorPublisher | None = None  # streams the game to spectators, see spectator.py
+    assets: AssetCache
+    audio: bool = True  # False never opens the mixer
+    started: float = STARTED  # perf_counter() at launch
+    first_frame_ms: float | None = None  # launch to the first frame on screen
+    exit_after_first_frame: bool = False  # quit once startup has been measured
+    key_actions: dict[int, int] = {
+        pygame.K_LEFT: LEFT,
+        pygame.K_RIGHT: RIGHT,
+        pygame.K_DOWN: DOWN,
+        pygame.K_UP: ROTATE,
+        pygame.K_x: ROTATE,
+        pygame.K_z: ROTATE_CCW,
+        pygame.K_LCTRL: ROTATE_CCW,
+        pygame.K_a: ROTATE_180,
+        pygame.K_SPACE: HARD_DROP,
+    }
+    fps: int = 60  # render frame cap, 0 renders as fast as possible
+    max_frame_time: int = 250  # milliseconds of logic to catch up after a stall, at most
+    tick_accumulator: int = 0  # milliseconds of real time not yet simulated
     shake_end_time: int = 0
     shake_magnitude: int = 0
     shake_offset: tuple[int, int] = (0, 0)
 
-    def __init__(self, width = 600, height = 800) -> None:
-        pygame.init()
+    def __init__(
+        self,
+        width = 600,
+        height = 800,
+        dirty_rendering: bool = True,
+        fps: int = 60,
+        seed: int | None = None,
+        strategy: str = 'random',
+        preview: int = 1,
+        replay_dir: Path | None = None,
+        demo: bool = False,
+        columns: int = 10,
+        rows: int = 20,
+        profile_path: Path | None = None,
+        show_hud: bool = False,
+        score_path: Path | None = Path('scores.db'),
+        player: str = 'player',
+        telemetry: tuple[str, int] | None = None,
+        audio: bool = True,
+        exit_after_first_frame: bool = False,
+        spectate: tuple[str, int] | None = None,
+    ) -> None:
+        # Only what the first frame needs: fonts start on first use, audio after the first frame
+        pygame.display.init()
+        self.dirty_rendering = dirty_rendering
+        self.fps = fps
         flags = pygame.RESIZABLE
         self.screen = pygame.display.set_mode((width, height), flags)
         pygame.display.set_caption("Tetris")
+        # Creating a Clock also starts SDL's timer, which pygame.time.get_ticks() needs
         self.clock = pygame.time.Clock()
+        self.assets = AssetCache()
+        self.audio = audio
+        self.exit_after_first_frame = exit_after_first_frame
+        self.io = IOWorker()
+        if telemetry is not None:
+            self.telemetry = TelemetryClient(telemetry)
+        if spectate is not None:
+            self.open_publisher(spectate)
+
+        # The engine owns the grid, pieces and scoring; this class only draws and handles input
+        self.engine = TetrisEngine(seed, strategy, preview, columns, rows)
+        self.engine.add_listener(self.on_engine_event)
+        self.replay_dir = replay_dir
+        self.start_recording()
+        if demo:
+            self.demo = BotController(Bot(columns=columns, rows=rows), self.engine)
+        self.profile_path = profile_path
+        self.show_hud = show_hud
+        if profile_path is not None or show_hud:
+            self.enable_profiler()
+        self.player = 'bot' if demo else player
+        self.score_path = score_path
         self.update_display_size()
 
-        # Initialize the grid
-        self.grid = [[0 for _ in range(self.grid_columns)] for _ in range(self.grid_rows)]
-
-        # Initialize the first pieces
-        random_tetromino = random.choice(TETROMINO_INFO)
-        self.next_piece = Tetromino(random_tetromino['shapes'], random_tetromino['color'])
-        random_tetromino = random.choice(TETROMINO_INFO)
-        self.current_piece = Tetromino(random_tetromino['shapes'], random_tetromino['color'])
-
         # Screen shake state
         self.shake_end_time = 0        # timestamp (ms) when the shake should stop
         self.shake_magnitude = 0       # maximum pixel offset during shake
@@ -291,123 +182,238 @@ class Tetris:
         self.right_panel_start_x = horizontal_center + panel_width
         self.grid_start_x = horizontal_center - panel_width
         self.grid_width = panel_width * 2
-        self.piece_size = self.grid_width // self.grid_columns  # Assuming 10 columns in the grid
+        self.preview_size = panel_width // 5
+
+        # Fit the whole board if cells stay large enough, otherwise show a scrolling part of it
+        columns = self.engine.grid_columns
+        rows = self.engine.grid_rows
+        self.piece_size = max(self.min_cell_size, min(self.grid_width // columns, panel_height // rows))
+        self.visible_columns = min(columns, self.grid_width // self.piece_size)
+        self.visible_rows = min(rows, panel_height // self.piece_size)
+
+        self.left_panel_rect = pygame.Rect(self.left_panel_start_x, self.panel_start_y, panel_width, panel_height)
+        self.right_panel_rect = pygame.Rect(self.right_panel_start_x, self.panel_start_y, panel_width, panel_height)
+        self.grid_rect = pygame.Rect(self.grid_start_x, self.panel_start_y, self.grid_width, panel_height)
+        self.board_rect = pygame.Rect(
+            self.grid_start_x,
+            self.panel_start_y,
+            self.visible_columns * self.piece_size,
+            self.visible_rows * self.piece_size,
+        )
+        self.view_x = 0
+        self.view_y = 0
+        self.follow_piece()
+
+        self.build_background()
+        self.build_board_surface()
+        self.needs_full_redraw = True
 
     def reset(self) -> None:
-        self.grid = [[0 for _ in range(self.grid_columns)] for _ in range(self.grid_rows)]
-        self.current_piece = None
-        self.game_speed = 500
-        self.score = 0
-        self.level = 1
-        self.lines_cleared = 0
-        self.is_game_over = False
-
+        self.engine.reset()
+        self.start_recording()
+        self.state = 'playing'
+        self.board_dirty = True
+        self.needs_full_redraw = True
         self.play_background_music()
 
-    def draw_background(self) -> None:
-        # Initialize values
-        screen_width, screen_height = self.screen.get_size()
-        horizontal_center = screen_width // 2
+    def start_recording(self) -> None:
+        if self.replay_dir is not None:
+            self.recorder = ReplayRecorder(self.engine)
 
-        if screen_width < 400 or screen_height < 500:
-            raise ValueError("Screen size must be at least 400x500")
-
-        # Use current shake offset when drawing
-        offset_x, offset_y = self.shake_offset
+    def save_recording(self) -> None:
+        """Write the current game's replay, if recording, and stop recording it"""
+        if self.recorder is None or self.replay_dir is None:
+            return
+        now = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.io.persist(write_file, self.replay_dir / f"{now}-{self.engine.seed}.ttr", self.recorder.finish())
+        self.recorder = None
+
+    def open_scores(self, path: Path, legacy: Path = Path('score_board.txt')) -> None:
+        """Open the score database, bringing in the old text score board when the database is new"""
+        new = not path.exists()
+        try:
+            self.scores = ScoreStore(path)
+        except sqlite3.Error as e:
+            print(f"Error opening score database: {e}")
+            return
+        if new and legacy.exists():
+            self.scores.import_legacy(legacy)
+
+    def add_score(self, player: str, score: int, lines: int, level: int, seed: int) -> None:
+        """Store a finished game; runs on the I/O worker, after open_scores()"""
+        if self.scores is not None:
+            self.scores.add(player, score, lines, level, seed)
+
+    def open_publisher(self, address: tuple[str, int]) -> None:
+        try:
+            self.publisher = SpectatorPublisher(address)
+        except OSError as e:
+            print(f"Error starting the spectator stream on {address[0]}:{address[1]}: {e}")
+
+    def publish(self) -> None:
+        """Send spectators what changed; encoding runs here, the writes on the publisher's thread"""
+        if self.publisher is not None:
+            with self.phase('publish'):
+                self.publisher.publish(self.engine)
+
+    def enable_profiler(self) -> None:
+        """Start timing the frame phases and counting hot engine calls"""
+        if self.profiler is not None:
+            return
+        # The HUD alone only needs the rolling window; a full trace is kept just for --profile
+        profiler = Profiler(self.fps, record_trace=self.profile_path is not None)
+        engine = self.engine
+        profiler.instrument(engine, 'repeat_held_actions', 'held_keys')
+        profiler.instrument(engine, 'apply_gravity', 'gravity')
+        profiler.instrument(engine, 'update', 'update')
+        profiler.instrument(engine, 'clear_lines', 'clear_lines')
+        profiler.instrument(engine, 'valid_move', counter='valid_move')
+        profiler.instrument(engine, 'drop_distance', counter='drop_distance')
+        for method in ('draw_background', 'draw_grid', 'draw_status', 'draw_dirty'):
+            profiler.instrument(self, method, method)
+        profiler.instrument(self, 'present', 'flip')
+        self.profiler = profiler
+
+    def phase(self, name: str) -> AbstractContextManager:
+        return self.profiler.phase(name) if self.profiler is not None else NO_PHASE
+
+    def save_profile(self) -> None:
+        """Write the current game's frame trace, if profiling to a file, and start a new one"""
+        if self.profiler is None or self.profile_path is None or not self.profiler.trace:
+            return
+        now = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = self.profile_path.with_name(f"{self.profile_path.stem}-{now}{self.profile_path.suffix}")
+        # reset() starts a new trace list, so the worker can write this one undisturbed
+        self.io.persist(write_trace, path, self.profiler.trace, self.profiler.dropped)
+        self.profiler.reset()
+
+    def on_engine_event(self, event: str, value: int) -> None:
+        """Play sounds and effects for events raised by the engine"""
+        if event == 'lock':
+            # Only the rows the piece covers changed
+            top, height = divmod(value, LOCK_HEIGHTS)
+            self.mark_rows_dirty(top, top + height)
+        elif event == 'lines_cleared':
+            # Everything from the new top of the stack down to the cleared rows has moved
+            board = self.engine.board
+            top = board.height - max(board.heights)
+            stop = self.dirty_rows[1] if self.dirty_rows is not None else board.height
+            self.mark_rows_dirty(top - value, stop)
+        elif event == 'garbage':
+            # The whole stack moved up
+            self.board_dirty = True
+
+        if event == 'hard_drop':
+            self.play_sound('hit1')
+        elif event == 'lines_cleared':
+            # Trigger a screen shake for line clears, magnitude scales with the number of lines
+            duration = 300  # milliseconds
+            self.shake_magnitude = value
+            self.shake_end_time = pygame.time.get_ticks() + duration
+            self.play_sound('bwah')
+
+    def build_background(self) -> None:
+        """Pre-render the panels, grid area and grid lines; only needed when the window size changes"""
+        self.background = pygame.Surface(self.screen.get_size())
+        surface = self.background
 
         # Fill the background with black
-        self.screen.fill(self.bg_color)
+        surface.fill(self.bg_color)
 
         # Draw left panel
-        pygame.draw.rect(self.screen, self.left_panel_color, (horizontal_center - self.panel_width * 2 + offset_x, self.panel_start_y + offset_y, self.panel_width, self.panel_height))
+        pygame.draw.rect(surface, self.left_panel_color, self.left_panel_rect)
 
         # Draw right panel
-        pygame.draw.rect(self.screen, self.right_panel_color, (horizontal_center + self.panel_width + offset_x, self.panel_start_y + offset_y, self.panel_width, self.panel_height))
-
-        # Draw grid area
-        pygame.draw.rect(self.screen, self.grid_color, (self.grid_start_x + offset_x, self.panel_start_y + offset_y, self.grid_width, self.panel_height))
-        for i in range(self.grid_columns + 1):
-            x = self.grid_start_x + i * self.piece_size + offset_x
-            pygame.draw.line(self.screen, self.grid_line_color, (x, self.panel_start_y + offset_y), (x, self.panel_start_y + self.panel_height + offset_y))
-        for j in range(self.grid_rows + 1):
-            y = self.panel_start_y + j * self.piece_size + offset_y
-            pygame.draw.line(self.screen, self.grid_line_color, (self.grid_start_x + offset_x, y), (self.grid_start_x + self.grid_width + offset_x, y))
-
-    def valid_move(self, dx: int, dy: int) -> bool:
-        """Check if the current piece can move by (dx, dy)"""
-        if self.current_piece is None:
+        pygame.draw.rect(surface, self.right_panel_color, self.right_panel_rect)
+
+        # Draw grid area; the lines are the same wherever the view has scrolled to
+        pygame.draw.rect(surface, self.grid_color, self.grid_rect)
+        for i in range(self.visible_columns + 1):
+            x = self.grid_start_x + i * self.piece_size
+            pygame.draw.line(surface, self.grid_line_color, (x, self.panel_start_y), (x, self.board_rect.bottom))
+        for j in range(self.visible_rows + 1):
+            y = self.panel_start_y + j * self.piece_size
+            pygame.draw.line(surface, self.grid_line_color, (self.grid_start_x, y), (self.board_rect.right, y))
+
+    def build_board_surface(self) -> None:
+        """Redraw every locked cell of the board; only needed after a resize or a reset"""
+        self.board_surface = pygame.Surface(
+            (self.engine.grid_columns * self.piece_size, self.engine.grid_rows * self.piece_size),
+            pygame.SRCALPHA,
+        )
+        self.draw_board_rows(0, self.engine.grid_rows)
+        self.board_dirty = False
+        self.dirty_rows = None
+
+    def draw_board_rows(self, start: int, stop: int) -> None:
+        """Redraw the locked cells of board rows [start, stop) on the board surface"""
+        size = self.piece_size
+        self.board_surface.fill((0, 0, 0, 0), (0, start * size, self.board_surface.get_width(), (stop - start) * size))
+        rows = self.engine.board.rows
+        grid = self.engine.grid
+        for y in range(start, stop):
+            # Visit only the occupied cells, so cost follows the filled area rather than the board width
+            bits = rows[y]
+            while bits:
+                bit = bits & -bits
+                x = bit.bit_length() - 1
+                pygame.draw.rect(self.board_surface, grid[y][x], (x * size, y * size, size - 1, size - 1))
+                bits ^= bit
+
+    def mark_rows_dirty(self, start: int, stop: int) -> None:
+        start = max(0, start)
+        stop = min(self.engine.grid_rows, stop)
+        if self.dirty_rows is not None:
+            start = min(start, self.dirty_rows[0])
+            stop = max(stop, self.dirty_rows[1])
+        self.dirty_rows = (start, stop)
+
+    def update_board_rows(self) -> pygame.Rect | None:
+        """Bring changed rows of the board surface up to date; returns their area on screen, if in view"""
+        if self.dirty_rows is None:
+            return None
+        start, stop = self.dirty_rows
+        self.dirty_rows = None
+        self.draw_board_rows(start, stop)
+        _, origin_y = self.board_origin()
+        rect = pygame.Rect(self.board_rect.x, origin_y + start * self.piece_size, self.board_rect.width, (stop - start) * self.piece_size)
+        rect = rect.clip(self.board_rect)
+        return rect if rect else None
+
+    def board_origin(self) -> tuple[int, int]:
+        """Screen position of board cell (0, 0), which is off screen when the view has scrolled"""
+        return (
+            self.grid_start_x - self.view_x * self.piece_size,
+            self.panel_start_y - self.view_y * self.piece_size,
+        )
+
+    def follow_piece(self) -> bool:
+        """Scroll the view so the current piece is in sight; returns True if the view moved"""
+        piece = self.engine.current_piece
+        if piece is None:
             return False
-
-        new_x = self.current_piece.position[0] + dx
-        new_y = self.current_piece.position[1] + dy
-
-        # Check for collisions
-        for i, row in enumerate(self.current_piece.get_shape()):
-            for j, cell in enumerate(row):
-                if cell == '0':
-                    grid_x = new_x + j
-                    grid_y = new_y + i
-                    if grid_x < 0 or grid_x >= self.grid_columns or grid_y < 0 or grid_y >= self.grid_rows:
-                        return False
-                    if self.grid[grid_y][grid_x] != 0:
-                        return False
+        x, y = piece.position
+        table = piece.table
+        view_x = scroll_to(self.view_x, x + table.left, table.width, self.visible_columns, self.engine.grid_columns)
+        view_y = scroll_to(self.view_y, y + table.top, table.height, self.visible_rows, self.engine.grid_rows)
+        if (view_x, view_y) == (self.view_x, self.view_y):
+            return False
+        self.view_x = view_x
+        self.view_y = view_y
         return True
-    
-    def move_piece(self, dx: int, dy: int) -> None:
-        """Move the current piece by (dx, dy) if possible"""
-        if self.current_piece is None:
-            return
-
-        if self.valid_move(dx, dy):
-            self.current_piece.position = (self.current_piece.position[0] + dx, self.current_piece.position[1] + dy)
-
-    def drop_piece(self) -> None:
-        """Drop the current piece down until it lands"""
-        if self.current_piece is None:
-            return
 
-        while self.valid_move(0, 1):
-            self.current_piece.position = (self.current_piece.position[0], self.current_piece.position[1] + 1)
-
-        pygame.mixer.Sound("assets/sounds/hit1.wav").play()
-
-    def rotate_piece(self) -> None:
-        """Rotate the current piece if possible"""
-        if self.current_piece is None:
-            return
-
-        original_rotation = self.current_piece.rotation
-        self.current_piece.rotate()
-        
-        if not self.valid_move(0, 0):
-            if self.current_piece.position[0] < 0:
-                self.current_piece.position = (0, self.current_piece.position[1])
-            elif self.current_piece.position[0] + len(self.current_piece.get_shape()[0]) > self.grid_columns:
-                self.current_piece.position = (self.grid_columns - len(self.current_piece.get_shape()[0]), self.current_piece.position[1])
-            
-        # If still not valid, revert rotation
-        if not self.valid_move(0, 0):
-            self.current_piece.rotation = original_rotation
-
-    def lock_piece(self) -> None:
-        """Lock the current piece into the grid"""
-        if self.current_piece is None:
-            return
-
-        x, y = self.current_piece.position
-        for i, row in enumerate(self.current_piece.get_shape()):
-            for j, cell in enumerate(row):
-                if cell == '0':
-                    self.grid[y + i][x + j] = self.current_piece.color
-
-        self.current_piece = None
+    def draw_background(self) -> None:
+        # Use current shake offset when drawing
+        offset_x, offset_y = self.shake_offset
+        if offset_x or offset_y:
+            self.screen.fill(self.bg_color)
+        self.screen.blit(self.background, (offset_x, offset_y))
 
     def draw_status(self) -> None:
         font_size = self.panel_width // 10
-        font = pygame.font.SysFont('Arial', font_size)
-        score_text = font.render(f'Score: {self.score}', True, (255, 255, 255))
-        level_text = font.render(f'Level: {self.level}', True, (255, 255, 255))
-        lines_text = font.render(f'Lines: {self.lines_cleared}', True, (255, 255, 255))
+        score_text = self.assets.text('score', f'Score: {self.engine.score}', font_size)
+        level_text = self.assets.text('level', f'Level: {self.engine.level}', font_size)
+        lines_text = self.assets.text('lines', f'Lines: {self.engine.lines_cleared}', font_size)
 
         offset_x, offset_y = self.shake_offset
 
@@ -415,113 +421,311 @@ class Tetris:
         self.screen.blit(level_text, (self.left_panel_start_x + 10 + offset_x, self.panel_start_y + 40 + offset_y))
         self.screen.blit(lines_text, (self.left_panel_start_x + 10 + offset_x, self.panel_start_y + 70 + offset_y))
 
-        # Draw next piece
-        if self.next_piece is not None:
-            next_text = font.render('Next:', True, (255, 255, 255))
-            self.screen.blit(next_text, (self.right_panel_start_x + 10 + offset_x, self.panel_start_y + 10 + offset_y))
-
-            for i, row in enumerate(self.next_piece.get_shape()):
-                for j, cell in enumerate(row):
-                    if cell == '0':
-                        pygame.draw.rect(
-                            self.screen,
-                            self.next_piece.color,
-                            (
-                                self.right_panel_start_x + 10 + j * self.piece_size + offset_x,
-                                self.panel_start_y + 40 + i * self.piece_size + offset_y,
-                                self.piece_size - 1,
-                                self.piece_size - 1
-                            )
-                        )
-
-    def update(self) -> None:
-        if self.current_piece is None:
-            random_tetromino = random.choice(TETROMINO_INFO)
-            self.current_piece = self.next_piece
-            self.next_piece = Tetromino(random_tetromino['shapes'], random_tetromino['color'])
-
-        # If the new piece cannot be placed, the game is over
-        if not self.valid_move(0, 0):
-            self.is_game_over = True
-            return
-        
-        self.clear_lines()
-
-    def clear_lines(self) -> None:
-        """Check for and clear full lines in the grid"""
-        # Clear full lines
-        lines_to_clear = []
-        for i, row in enumerate(self.grid):
-            if all(cell != 0 for cell in row):
-                lines_to_clear.append(i)
-        
-        if lines_to_clear:
-            combo_bonus = 0
-            for line in lines_to_clear:
-                del self.grid[line]
-                self.grid.insert(0, [0 for _ in range(self.grid_columns)])
-                combo_bonus += 1
-                self.score += 100 * combo_bonus
-
-            # Trigger a screen shake for multi-line clears
-            if len(lines_to_clear) >= 1:
-                # duration grows slightly with more lines, magnitude scales but is clamped
-                duration = 300  # milliseconds
-                self.shake_magnitude = len(lines_to_clear)
-                self.shake_end_time = pygame.time.get_ticks() + duration
-                pygame.mixer.Sound("assets/sounds/bwah.wav").play()
-
-        self.lines_cleared += len(lines_to_clear)
-        if self.lines_cleared >= 10 * self.level:
-            self.level += 1
-            self.score += 1000
-            self.game_speed = max(100, self.game_speed - 50)
+        # Draw the upcoming pieces, stacked top to bottom
+        next_text = self.assets.text('next', 'Next:', font_size)
+        self.screen.blit(next_text, (self.right_panel_start_x + 10 + offset_x, self.panel_start_y + 10 + offset_y))
+
+        top = self.panel_start_y + 40
+        size = self.preview_size
+        for kind in self.engine.preview():
+            table = SHAPE_TABLES[kind][0]
+            if top + table.height * size > self.panel_start_y + self.panel_height:
+                break
+            color = COLORS[kind]
+            for j, i in table.cells:
+                pygame.draw.rect(
+                    self.screen,
+                    color,
+                    (
+                        self.right_panel_start_x + 10 + (j - table.left) * size + offset_x,
+                        top + (i - table.top) * size + offset_y,
+                        size - 1,
+                        size - 1
+                    )
+                )
+            top += (table.height + 1) * size
 
     def draw_grid(self) -> None:
         offset_x, offset_y = self.shake_offset
-        for y, row in enumerate(self.grid):
-            for x, cell in enumerate(row):
-                if cell != 0:
+        if self.board_dirty:
+            self.build_board_surface()
+        else:
+            self.update_board_rows()
+        view = pygame.Rect(self.view_x * self.piece_size, self.view_y * self.piece_size, self.board_rect.width, self.board_rect.height)
+        self.screen.blit(self.board_surface, self.board_rect.move(offset_x, offset_y), view)
+        self.draw_piece()
+
+    def draw_piece(self) -> None:
+        """Draw the current piece and its ghost"""
+        offset_x, offset_y = self.shake_offset
+        origin_x, origin_y = self.board_origin()
+        current_piece = self.engine.current_piece
+        if current_piece is not None:
+            x, y = current_piece.position
+            color = current_piece.color
+            # Parts of the piece outside the view must not spill onto the panels
+            self.screen.set_clip(self.board_rect.move(offset_x, offset_y))
+
+            # Draw the ghost piece as an outline where a hard drop would land
+            if self.show_ghost:
+                ghost_y = y + self.engine.drop_distance()
+                for j, i in current_piece.cells:
                     pygame.draw.rect(
                         self.screen,
-                        cell,
+                        color,
                         (
-                            self.grid_start_x + x * self.piece_size + offset_x,
-                            y * self.piece_size + self.panel_start_y + offset_y,
+                            origin_x + (x + j) * self.piece_size + offset_x,
+                            origin_y + (ghost_y + i) * self.piece_size + offset_y,
                             self.piece_size - 1,
                             self.piece_size - 1
-                        )
+                        ),
+                        1
                     )
 
-        # Draw current piece
-        if self.current_piece is not None:
-            x, y = self.current_piece.position
-            for i, row in enumerate(self.current_piece.get_shape()):
-                for j, cell in enumerate(row):
-                    if cell == '0':
-                        pygame.draw.rect(
-                            self.screen,
-                            self.current_piece.color,
-                            (
-                                self.grid_start_x + (x + j) * self.piece_size + offset_x,
-                                (y + i) * self.piece_size + self.panel_start_y + offset_y,
-                                self.piece_size - 1,
-                                self.piece_size - 1
-                            )
-                        )
+            for j, i in current_piece.cells:
+                pygame.draw.rect(
+                    self.screen,
+                    color,
+                    (
+                        origin_x + (x + j) * self.piece_size + offset_x,
+                        origin_y + (y + i) * self.piece_size + offset_y,
+                        self.piece_size - 1,
+                        self.piece_size - 1
+                    )
+                )
+            self.screen.set_clip(None)
+
+    def piece_state(self) -> tuple[int, int, int, int, int] | None:
+        """Everything that decides how the current piece and its ghost look on screen"""
+        piece = self.engine.current_piece
+        if piece is None:
+            return None
+        x, y = piece.position
+        return (piece.kind, piece.rotation, x, y, y + self.engine.drop_distance())
+
+    def status_state(self) -> tuple[int, int, int, tuple[int, ...]]:
+        return (
+            self.engine.score,
+            self.engine.level,
+            self.engine.lines_cleared,
+            self.engine.preview(),
+        )
+
+    def piece_rects(self, state: tuple[int, int, int, int, int] | None) -> list[pygame.Rect]:
+        """Screen areas covered by a piece and its ghost"""
+        if state is None:
+            return []
+        kind, rotation, x, y, ghost_y = state
+        table = SHAPE_TABLES[kind][rotation]
+        origin_x, origin_y = self.board_origin()
+        rects = []
+        for row in (y, ghost_y):
+            rect = pygame.Rect(
+                origin_x + (x + table.left) * self.piece_size,
+                origin_y + (row + table.top) * self.piece_size,
+                table.width * self.piece_size,
+                table.height * self.piece_size,
+            ).clip(self.board_rect)
+            if rect:
+                rects.append(rect)
+        return rects
+
+    def restore(self, rect: pygame.Rect) -> None:
+        """Repaint an area of the screen from the cached background and board surfaces"""
+        self.screen.blit(self.background, rect, rect)
+        board_area = rect.clip(self.board_rect)
+        if board_area:
+            origin_x, origin_y = self.board_origin()
+            self.screen.blit(self.board_surface, board_area, board_area.move(-origin_x, -origin_y))
+
+    def draw_full(self) -> None:
+        self.follow_piece()
+        self.draw_background()
+        self.draw_grid()
+        self.draw_status()
+        self.drawn_piece = self.piece_state()
+        self.drawn_status = self.status_state()
+
+    def draw_dirty(self) -> list[pygame.Rect]:
+        """Redraw only what changed since the last frame and return the changed screen areas"""
+        rects: list[pygame.Rect] = []
+
+        # Scrolling moves everything on the board; otherwise only changed rows and the piece are redrawn
+        view_moved = self.follow_piece()
+        if self.board_dirty or view_moved:
+            if self.board_dirty:
+                self.build_board_surface()
+            else:
+                self.update_board_rows()
+            self.restore(self.grid_rect)
+            self.draw_piece()
+            self.drawn_piece = self.piece_state()
+            rects.append(self.grid_rect)
+        else:
+            changed_rows = self.update_board_rows()
+            piece_state = self.piece_state()
+            if changed_rows is not None or piece_state != self.drawn_piece:
+                old_rects = self.piece_rects(self.drawn_piece)
+                if changed_rows is not None:
+                    self.restore(changed_rows)
+                    rects.append(changed_rows)
+                for rect in old_rects:
+                    self.restore(rect)
+                self.draw_piece()
+                rects.extend(old_rects)
+                rects.extend(self.piece_rects(piece_state))
+                self.drawn_piece = piece_state
+
+        status_state = self.status_state()
+        if status_state != self.drawn_status:
+            self.restore(self.left_panel_rect)
+            self.restore(self.right_panel_rect)
+            self.draw_status()
+            rects.append(self.left_panel_rect)
+            rects.append(self.right_panel_rect)
+            self.drawn_status = status_state
+
+        return rects
+
+    def present(self, rects: list[pygame.Rect] | None = None) -> None:
+        """Show the frame: the whole screen, or only the given areas"""
+        if rects is None:
+            pygame.display.flip()
+        elif rects:
+            pygame.display.update(rects)
+
+    def draw_hud(self, force: bool = False) -> pygame.Rect | None:
+        """Draw the performance overlay in the left panel; returns its area if it was redrawn"""
+        now = pygame.time.get_ticks()
+        if self.profiler is None or (not force and now - self.hud_updated < self.hud_interval):
+            return None
+        self.hud_updated = now
+
+        stats = self.profiler.stats()
+        lines = [
+            f"{stats.fps:.0f} fps, {stats.dropped} dropped",
+            f"p50 {stats.p50_ms:.1f} / p99 {stats.p99_ms:.1f} ms",
+            *(f"{name} {ms:.2f} ms" for name, ms in sorted(stats.phases.items())),
+            *(f"{name} {calls:.0f}/frame" for name, calls in sorted(stats.counters.items())),
+        ]
+        rect = pygame.Rect(self.left_panel_start_x, self.panel_start_y + 110, self.panel_width, self.panel_height - 110)
+        self.restore(rect)
+        font_size = max(12, self.panel_width // 12)
+        y = rect.y
+        self.screen.set_clip(rect)
+        for i, line in enumerate(lines):
+            text = self.assets.text(f'hud{i}', line, font_size, (180, 255, 180))
+            self.screen.blit(text, (rect.x + 10, y))
+            y += text.get_height()
+        self.screen.set_clip(None)
+        return rect
+
+    def play_sound(self, name: str) -> None:
+        if self.audio:
+            self.io.submit(self.assets.play, name)
+
+    def control_music(self, command: str, *args: int) -> None:
+        if self.audio:
+            self.io.submit(self.assets.control_music, command, *args)
 
     def play_background_music(self) -> None:
-        pygame.mixer.music.load("assets/sounds/bg.mp3")
-        pygame.mixer.music.play(-1)
+        if self.audio:
+            self.io.submit(self.assets.play_music, 'bg.mp3')
+
+    def on_first_frame(self) -> None:
+        """Record time-to-first-frame, then start what the first frame did not need"""
+        self.first_frame_ms = (time.perf_counter() - self.started) * 1000
+        if self.audio:
+            # Opening the mixer, loading the sounds and decoding the music all happen on the worker.
+            # Unlike later sounds these must not be dropped, or the whole session stays silent.
+            self.io.persist(self.assets.start_audio)
+            self.io.persist(self.assets.play_music, 'bg.mp3')
+        if self.score_path is not None:
+            # Creating the database can mean several synchronous writes
+            self.io.persist(self.open_scores, self.score_path)
+        if self.telemetry is not None:
+            self.io.submit(self.telemetry.send, 'startup', first_frame_ms=round(self.first_frame_ms, 1))
+        if self.exit_after_first_frame:
+            print(f"Time to first frame: {self.first_frame_ms:.1f} ms")
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
+
+    def draw_overlay(self, text: str, color: tuple[int, int, int]) -> None:
+        """Redraw the whole frame with a centred message on top"""
+        self.shake_offset = (0, 0)
+        self.draw_full()
+        overlay_text = self.assets.text('overlay', text, 50, color)
+        text_rect = overlay_text.get_rect(center=(self.screen.get_width() // 2, self.screen.get_height() // 2))
+        self.screen.blit(overlay_text, text_rect)
+        pygame.display.flip()
+
+    def redraw_idle(self) -> None:
+        if self.state == 'game_over':
+            self.draw_overlay('Game Over', (255, 0, 0))
+        elif self.state == 'paused':
+            self.draw_overlay('Paused', (255, 255, 255))
+
+    def enter_game_over(self) -> None:
+        """Switch to the game over state; its side effects run exactly once per game"""
+        self.state = 'game_over'
+        self.engine.release_all()
+        self.redraw_idle()
+        self.control_music('fadeout', 1000)
+        self.play_sound('fail')
+        self.publish()
+
+        self.save_recording()
+        self.save_profile()
+
+        # Queued behind open_scores() on the worker, so a game that ends before the database is open still counts
+        if self.score_path is not None:
+            engine = self.engine
+            self.io.persist(self.add_score, self.player, engine.score, engine.lines_cleared, engine.level, engine.seed)
+        if self.telemetry is not None:
+            engine = self.engine
+            self.io.submit(
+                self.telemetry.send,
+                'game_over',
+                player=self.player,
+                score=engine.score,
+                lines=engine.lines_cleared,
+                level=engine.level,
+                ticks=engine.tick_count,
+                seed=engine.seed,
+            )
+
+    def toggle_pause(self) -> None:
+        if self.state == 'playing':
+            self.state = 'paused'
+            self.engine.release_all()
+            self.control_music('pause')
+            self.redraw_idle()
+        elif self.state == 'paused':
+            self.state = 'playing'
+            self.needs_full_redraw = True
+            self.control_music('unpause')
 
     def run(self) -> None:
-        last_drop_time = pygame.time.get_ticks()
-        last_move_time = pygame.time.get_ticks()
+        engine = self.engine
         prev_frame_time = pygame.time.get_ticks()
-        self.play_background_music()
+        frame_end: float | None = None  # perf_counter() at the end of the last frame drawn while playing
         while True:
-            for event in pygame.event.get():
+            events_started = time.perf_counter()
+            if self.state == 'playing':
+                events = pygame.event.get()
+            else:
+                # Nothing moves while paused or on the game over screen, so sleep until input arrives
+                events = [pygame.event.wait(self.idle_timeout)] + pygame.event.get()
+
+            for event in events:
                 if event.type == pygame.QUIT:
+                    self.save_recording()
+                    self.save_profile()
+                    # Finish queued writes before the mixer they may use goes away
+                    self.io.close()
+                    if self.telemetry is not None:
+                        self.telemetry.close()
+                    if self.publisher is not None:
+                        self.publisher.close()
                     pygame.quit()
                     return
                 
@@ -529,54 +733,52 @@ class Tetris:
                     width = max(400, event.w)
                     height = max(500, event.h)
                     self.screen = pygame.display.set_mode((width, height), pygame.RESIZABLE)
+                    self.assets.invalidate_fonts()
                     self.update_display_size()
+                    self.redraw_idle()
 
-                if self.is_game_over and event.type == pygame.KEYDOWN:
+                if self.state == 'game_over' and event.type == pygame.KEYDOWN:
                     self.reset()
                     continue
 
-                # Handle single-press actions (rotation and hard drop)
-                if not self.is_game_over and event.type == pygame.KEYDOWN:
-                    now = pygame.time.get_ticks()
-                    if event.key == pygame.K_LEFT:
-                        self.move_piece(-1, 0)
-                        self.held_keys[pygame.K_LEFT] = (now, now)
-                    elif event.key == pygame.K_RIGHT:
-                        self.move_piece(1, 0)
-                        self.held_keys[pygame.K_RIGHT] = (now, now)
-                    elif event.key == pygame.K_DOWN:
-                        self.move_piece(0, 1)
-                        self.held_keys[pygame.K_DOWN] = (now, now)
-                    elif event.key == pygame.K_UP:
-                        self.rotate_piece()
-                    elif event.key == pygame.K_SPACE:
-                        self.drop_piece()
-                        self.lock_piece()
+                # The demo starts its next game on its own once the game over screen has been shown
+                if self.state == 'game_over' and self.demo is not None and event.type == pygame.NOEVENT:
+                    self.reset()
+                    continue
+
+                if event.type == pygame.KEYDOWN and event.key in (pygame.K_p, pygame.K_ESCAPE):
+                    self.toggle_pause()
+                    continue
+
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                    self.enable_profiler()
+                    self.show_hud = not self.show_hud
+                    self.needs_full_redraw = True
+                    continue
+
+                # Keys are queued as engine actions; the engine applies them, and DAS/ARR, on its next tick
+                if self.state == 'playing' and self.demo is None and event.type == pygame.KEYDOWN:
+                    action = self.key_actions.get(event.key)
+                    if action is not None:
+                        engine.press(action)
                 
                 if event.type == pygame.KEYUP:
-                    if event.key in self.held_keys:
-                        del self.held_keys[event.key]
-            
-            # Handle held keys for continuous movement
-            if not self.is_game_over and self.current_piece is not None:
-                current_time = pygame.time.get_ticks()
-                
-                for key, (first_press_time, last_move_time_key) in list(self.held_keys.items()):
-                    if current_time - first_press_time > self.repeat_delay:
-                        if current_time - last_move_time_key > self.move_delay:
-                            if key == pygame.K_LEFT and self.valid_move(-1, 0):
-                                self.current_piece.position = (self.current_piece.position[0] - 1, self.current_piece.position[1])
-                                self.held_keys[key] = (first_press_time, current_time)
-                            elif key == pygame.K_RIGHT and self.valid_move(1, 0):
-                                self.current_piece.position = (self.current_piece.position[0] + 1, self.current_piece.position[1])
-                                self.held_keys[key] = (first_press_time, current_time)
-                            elif key == pygame.K_DOWN and self.valid_move(0, 1):
-                                self.current_piece.position = (self.current_piece.position[0], self.current_piece.position[1] + 1)
-                                self.held_keys[key] = (first_press_time, current_time)
-
-            if self.is_game_over:
+                    action = self.key_actions.get(event.key)
+                    if action is not None:
+                        engine.release(action)
+
+            if self.state != 'playing':
+                # Keeps keyframes going for spectators who join while the game is paused or over
+                self.publish()
+                prev_frame_time = pygame.time.get_ticks()
+                self.tick_accumulator = 0
+                frame_end = None
                 continue
 
+            profiler = self.profiler
+            if profiler is not None:
+                profiler.add_time('events', time.perf_counter() - events_started)
+
             # compute shake offset for this frame
             current_time = pygame.time.get_ticks()
             if current_time < self.shake_end_time:
@@ -585,42 +787,80 @@ class Tetris:
             else:
                 self.shake_offset = (0, 0)
 
-            self.draw_background()
-            current_time = pygame.time.get_ticks()
-            if current_time - last_drop_time > self.game_speed:
-                last_drop_time = current_time
-                if not self.valid_move(0, 1):
-                    # If the piece can't move down, it has landed
-                    self.lock_piece()
-                elif self.current_piece is not None:
-                    # Move the piece down
-                    self.current_piece.position = (self.current_piece.position[0], self.current_piece.position[1] + 1)
-
-            self.update()
-            self.draw_grid()
-            self.draw_status()
+            # Run as many fixed logic ticks as the real time since the last frame covers
+            self.tick_accumulator = min(self.tick_accumulator + current_time - prev_frame_time, self.max_frame_time)
+            prev_frame_time = current_time
+            with self.phase('ticks'):
+                while self.tick_accumulator >= TICK_MS and not engine.is_game_over:
+                    if self.demo is not None:
+                        self.demo.drive()
+                    engine.tick()
+                    self.tick_accumulator -= TICK_MS
+
+            if engine.is_game_over:
+                self.enter_game_over()
+                continue
 
-            if self.is_game_over:
-                font = pygame.font.SysFont('Arial', 50)
-                game_over_text = font.render('Game Over', True, (255, 0, 0))
-                text_rect = game_over_text.get_rect(center=(self.screen.get_width() // 2, self.screen.get_height() // 2))
-                self.screen.blit(game_over_text, text_rect)
-                pygame.mixer.music.fadeout(1000)
-                pygame.mixer.Sound("assets/sounds/fail.wav").play()
-
-                # Save score board
-                try:
-                    with open("score_board.txt", "a") as f:
-                        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        f.write(f"{now} {self.score}\n")
-                except Exception as e:
-                    print(f"Error saving score board: {e}")
+            shaking = current_time < self.shake_end_time
+            if not self.dirty_rendering or shaking or self.needs_full_redraw:
+                self.draw_full()
+                if self.show_hud:
+                    self.draw_hud(force=True)
+                # Keep redrawing everything while shaking, plus one frame after to settle the screen
+                self.needs_full_redraw = shaking
+                self.present()
+            else:
+                dirty_rects = self.draw_dirty()
+                hud_rect = self.draw_hud() if self.show_hud else None
+                if hud_rect is not None:
+                    dirty_rects.append(hud_rect)
+                self.present(dirty_rects)
+            self.publish()
 
-            pygame.display.flip()
-            self.clock.tick(60)
+            if self.first_frame_ms is None:
+                self.on_first_frame()
+
+            self.clock.tick(self.fps)
+
+            if profiler is not None:
+                now = time.perf_counter()
+                if frame_end is not None:
+                    profiler.end_frame((now - frame_end) * 1000)
+                frame_end = now
 
 def main():
-    tetris = Tetris()
+    parser = argparse.ArgumentParser(description="Tetris")
+    parser.add_argument('--seed', type=int, default=None, help="seed for the piece sequence")
+    parser.add_argument('--randomizer', choices=STRATEGIES, default='random', help="piece randomizer")
+    parser.add_argument('--preview', type=int, default=1, help="number of upcoming pieces to show")
+    parser.add_argument('--record', type=Path, default=None, metavar='DIR', help="save a replay of every game into DIR")
+    parser.add_argument('--demo', action='store_true', help="let the built-in bot play")
+    parser.add_argument('--columns', type=int, default=10, help="board width in cells")
+    parser.add_argument('--rows', type=int, default=20, help="board height in cells")
+    parser.add_argument('--fps', type=int, default=60, help="render frame cap, 0 renders as fast as possible")
+    parser.add_argument('--hud', action='store_true', help="show the performance overlay (toggle with F3)")
+    parser.add_argument('--profile', type=Path, default=None, metavar='PATH', help="write a frame trace of every game, .csv or .json")
+    parser.add_argument('--player', default='player', help="name stored with your scores")
+    parser.add_argument('--scores', type=Path, default=Path('scores.db'), metavar='DB', help="high score database")
+    parser.add_argument('--telemetry', type=functools.partial(parse_address, default_port=TELEMETRY_PORT), default=None, metavar='HOST:PORT', help="send game events to a collector (see telemetry.py)")
+    parser.add_argument('--spectate', type=functools.partial(parse_address, default_port=SPECTATOR_PORT), default=None, metavar='[HOST]:PORT', help="stream the game to spectators (see spectator.py)")
+    parser.add_argument('--no-audio', action='store_true', help="never open the audio device")
+    parser.add_argument('--startup-time', action='store_true', help="print the time to the first frame and quit")
+    args = parser.parse_args()
+    if args.columns < MIN_BOARD_SIZE or args.rows < MIN_BOARD_SIZE:
+        parser.error(f"the board must be at least {MIN_BOARD_SIZE}x{MIN_BOARD_SIZE}")
+    if args.preview < 1:
+        parser.error("--preview must be at least 1")
+    if args.fps < 0:
+        parser.error("--fps must be 0 (uncapped) or more")
+    if args.record is not None:
+        try:
+            # Without --seed every game draws a fresh seed, which always fits
+            check_recordable(args.seed or 0, args.preview, args.columns, args.rows)
+        except ReplayError as e:
+            parser.error(f"--record: {e}")
+
+    tetris = Tetris(seed=args.seed, strategy=args.randomizer, preview=args.preview, replay_dir=args.record, demo=args.demo, columns=args.columns, rows=args.rows, profile_path=args.profile, show_hud=args.hud, fps=args.fps, score_path=args.scores, player=args.player, telemetry=args.telemetry, audio=not args.no_audio, exit_after_first_frame=args.startup_time, spectate=args.spectate)
     tetris.run()
 
 if __name__ == "__main__":
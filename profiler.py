@@ -0,0 +1,199 @@
+from collections import deque
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, NamedTuple
+import csv
+import functools
+import json
+import math
+import time
+
+
+class FrameSample(NamedTuple):
+    frame: int
+    frame_ms: float  # wall time from the end of the previous frame to the end of this one
+    phases: dict[str, float]  # milliseconds spent in each phase during the frame
+    counters: dict[str, int]  # calls of each counted function during the frame
+
+
+class FrameStats(NamedTuple):
+    frames: int  # frames in the rolling window
+    fps: float
+    p50_ms: float
+    p99_ms: float
+    dropped: int  # frame intervals missed since the last reset
+    phases: dict[str, float]  # mean milliseconds per frame over the window
+    counters: dict[str, float]  # mean calls per frame over the window
+
+
+FrameListener = Callable[[FrameSample], None]
+
+
+def nearest_rank(sorted_values: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted, non-empty list: the smallest value at or above `fraction` of them"""
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Profiler:
+    """Per-phase frame timings, hot call counters and rolling frame statistics
+
+    Phases are timed with `with profiler.phase(name):` or by wrapping a method
+    with instrument(). Call end_frame() once per rendered frame. With
+    record_trace, every sample is also kept in `trace` until export() or
+    reset(); without it only the rolling window is kept, so an overlay left on
+    for hours does not grow.
+    """
+    budget_ms: float  # target frame time; longer frames count as dropped intervals
+    window: deque[FrameSample]
+    trace: list[FrameSample]
+    phase_ms: dict[str, float]
+    counters: dict[str, int]
+    listeners: list[FrameListener]
+    record_trace: bool
+    frame: int = 0
+    dropped: int = 0
+
+    def __init__(self, fps: int = 60, window: int = 240, record_trace: bool = True) -> None:
+        self.budget_ms = 1000 / (fps or 60)
+        self.record_trace = record_trace
+        self.window = deque(maxlen=window)
+        self.trace = []
+        self.phase_ms = {}
+        self.counters = {}
+        self.listeners = []
+
+    def add_listener(self, listener: FrameListener) -> None:
+        """Receive every FrameSample as its frame ends"""
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener: FrameListener) -> None:
+        self.listeners.remove(listener)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        self.phase_ms[name] = self.phase_ms.get(name, 0.0) + seconds * 1000
+
+    def count(self, name: str, calls: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + calls
+
+    def instrument(self, owner: Any, method: str, phase: str | None = None, counter: str | None = None) -> None:
+        """Time and/or count every later call of owner.method by wrapping it on that instance"""
+        original = getattr(owner, method)
+
+        if phase is None:
+            if counter is None:
+                raise ValueError("instrument() needs a phase, a counter or both")
+            name = counter
+
+            @functools.wraps(original)
+            def counted(*args, **kwargs):
+                self.counters[name] = self.counters.get(name, 0) + 1
+                return original(*args, **kwargs)
+
+            setattr(owner, method, counted)
+            return
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            if counter is not None:
+                self.counters[counter] = self.counters.get(counter, 0) + 1
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.add_time(phase, time.perf_counter() - started)
+
+        setattr(owner, method, timed)
+
+    def end_frame(self, frame_ms: float) -> FrameSample:
+        sample = FrameSample(self.frame, frame_ms, self.phase_ms, self.counters)
+        self.phase_ms = {}
+        self.counters = {}
+        self.frame += 1
+        self.window.append(sample)
+        if self.record_trace:
+            self.trace.append(sample)
+        # A frame that took three budgets missed two display intervals
+        self.dropped += max(0, round(frame_ms / self.budget_ms) - 1)
+        for listener in self.listeners:
+            listener(sample)
+        return sample
+
+    def stats(self) -> FrameStats:
+        samples = list(self.window)
+        if not samples:
+            return FrameStats(0, 0.0, 0.0, 0.0, self.dropped, {}, {})
+
+        times = sorted(sample.frame_ms for sample in samples)
+        phases: dict[str, float] = {}
+        counters: dict[str, float] = {}
+        for sample in samples:
+            for name, ms in sample.phases.items():
+                phases[name] = phases.get(name, 0.0) + ms
+            for name, calls in sample.counters.items():
+                counters[name] = counters.get(name, 0) + calls
+        frames = len(samples)
+        mean_ms = sum(times) / frames
+        return FrameStats(
+            frames,
+            1000 / mean_ms if mean_ms else 0.0,
+            nearest_rank(times, 0.50),
+            nearest_rank(times, 0.99),
+            self.dropped,
+            {name: total / frames for name, total in phases.items()},
+            {name: total / frames for name, total in counters.items()},
+        )
+
+    def reset(self) -> None:
+        """Forget every frame so far, e.g. when a new game starts"""
+        self.window.clear()
+        self.trace = []
+        self.phase_ms = {}
+        self.counters = {}
+        self.frame = 0
+        self.dropped = 0
+
+    def export(self, path: Path) -> None:
+        """Write the trace as CSV (for a .csv path) or JSON with a summary (anything else)"""
+        write_trace(path, self.trace, self.dropped)
+
+
+def write_trace(path: Path, trace: list[FrameSample], dropped: int) -> None:
+    """Profiler.export() for a trace taken out of its profiler, e.g. to write it on another thread"""
+    phase_names = sorted({name for sample in trace for name in sample.phases})
+    counter_names = sorted({name for sample in trace for name in sample.counters})
+    rows = [
+        {
+            'frame': sample.frame,
+            'frame_ms': round(sample.frame_ms, 3),
+            **{f'{name}_ms': round(sample.phases.get(name, 0.0), 3) for name in phase_names},
+            **{name: sample.counters.get(name, 0) for name in counter_names},
+        }
+        for sample in trace
+    ]
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == '.csv':
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, ['frame', 'frame_ms', *(f'{name}_ms' for name in phase_names), *counter_names])
+            writer.writeheader()
+            writer.writerows(rows)
+        return
+
+    times = sorted(sample.frame_ms for sample in trace)
+    summary = {
+        'frames': len(times),
+        'dropped': dropped,
+        'p50_ms': round(nearest_rank(times, 0.50), 3) if times else 0.0,
+        'p99_ms': round(nearest_rank(times, 0.99), 3) if times else 0.0,
+    }
+    path.write_text(json.dumps({'summary': summary, 'frames': rows}))
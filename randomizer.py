@@ -0,0 +1,64 @@
+from collections import deque
+import random
+
+from tetromino import TETROMINO_INFO
+
+STRATEGIES = ('random', 'bag7')
+
+# (strategy, rng state, lookahead queue, remaining bag)
+GeneratorState = tuple[str, tuple, tuple[int, ...], tuple[int, ...]]
+
+
+class PieceGenerator:
+    """Seeded source of piece kinds with a lookahead queue
+
+    'random' draws every piece independently, like the original game;
+    'bag7' deals each kind once per shuffled bag of seven.
+    """
+    seed: int
+    strategy: str
+    lookahead: int
+    rng: random.Random
+    queue: deque[int]
+    bag: list[int]
+
+    def __init__(self, seed: int | None = None, strategy: str = 'random', lookahead: int = 1) -> None:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown piece strategy {strategy!r}, expected one of {STRATEGIES}")
+        if lookahead < 1:
+            raise ValueError("Lookahead must be at least 1")
+
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.strategy = strategy
+        self.lookahead = lookahead
+        self.rng = random.Random(self.seed)
+        self.bag = []
+        self.queue = deque(self.draw() for _ in range(lookahead))
+
+    def draw(self) -> int:
+        if self.strategy == 'random':
+            return self.rng.randrange(len(TETROMINO_INFO))
+
+        if not self.bag:
+            self.bag = list(range(len(TETROMINO_INFO)))
+            self.rng.shuffle(self.bag)
+        return self.bag.pop()
+
+    def next(self) -> int:
+        """Take the next piece kind off the queue and top the queue back up"""
+        self.queue.append(self.draw())
+        return self.queue.popleft()
+
+    def preview(self) -> tuple[int, ...]:
+        return tuple(self.queue)
+
+    def snapshot(self) -> GeneratorState:
+        return (self.strategy, self.rng.getstate(), tuple(self.queue), tuple(self.bag))
+
+    def restore(self, state: GeneratorState) -> None:
+        strategy, rng_state, queue, bag = state
+        self.strategy = strategy
+        self.rng.setstate(rng_state)
+        self.queue = deque(queue)
+        self.lookahead = len(queue)
+        self.bag = list(bag)
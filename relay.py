@@ -0,0 +1,217 @@
+import argparse
+import asyncio
+import random
+
+from engine import MIN_BOARD_SIZE
+from versus import (
+    CHECK,
+    DEFAULT_PORT,
+    DESYNC,
+    END,
+    FINISHED,
+    INPUT,
+    INPUT_DELAY,
+    JOIN,
+    OPPONENT_LEFT,
+    PROTOCOL_VERSION,
+    REFUSED,
+    START,
+    TURN_TICKS,
+    ProtocolError,
+    decode_varints,
+    encode_message,
+    encode_start,
+    read_message,
+)
+
+
+class RelayStats:
+    matches_started: int = 0
+    matches_finished: int = 0  # both players finished with the same result
+    matches_abandoned: int = 0  # a player disconnected or the match desynced
+    desyncs: int = 0
+    messages: int = 0
+    bytes_relayed: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"matches started={self.matches_started} finished={self.matches_finished} "
+            f"abandoned={self.matches_abandoned} desyncs={self.desyncs} "
+            f"messages={self.messages} bytes={self.bytes_relayed}"
+        )
+
+
+class RelayMatch:
+    seed: int
+    writers: list[asyncio.StreamWriter]
+    checks: dict[int, bytes]  # the first digest reported for each turn, until the other player's arrives
+    results: list[bytes | None]  # each player's FINISHED END: turns played and final digest
+    closed: bool = False
+
+    def __init__(self, seed: int, writers: list[asyncio.StreamWriter]) -> None:
+        self.seed = seed
+        self.writers = writers
+        self.checks = {}
+        self.results = [None, None]
+
+
+class Relay:
+    """Pairs players into matches and forwards their inputs; it never simulates a match itself
+
+    The relay only sees inputs and digests, so one process can host thousands of
+    matches. Digests for the same turn are compared to catch clients that have
+    drifted apart; such a match is ended with DESYNC.
+    """
+    rng: random.Random
+    stats: RelayStats
+    waiting: dict[tuple[int, int], tuple[asyncio.StreamReader, asyncio.StreamWriter, asyncio.Future[RelayMatch]]]  # by board size
+    turn_ticks: int
+    delay: int
+
+    def __init__(self, seed: int | None = None, turn_ticks: int = TURN_TICKS, delay: int = INPUT_DELAY) -> None:
+        self.rng = random.Random(seed)
+        self.stats = RelayStats()
+        self.waiting = {}
+        self.turn_ticks = turn_ticks
+        self.delay = delay
+
+    async def serve(self, host: str, port: int) -> asyncio.Server:
+        return await asyncio.start_server(self.handle, host, port, backlog=1024)
+
+    async def pair(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, size: tuple[int, int]) -> tuple[RelayMatch, int]:
+        """Wait for an opponent with the same board size, then send both players START; first come, first paired
+
+        Raises ConnectionError if the player hangs up before an opponent arrives.
+        """
+        waiting = self.waiting.pop(size, None)
+        # A player who has hung up may not have been noticed yet, so never pair with one
+        if waiting is not None and not waiting[0].at_eof() and not waiting[1].is_closing():
+            _, opponent, future = waiting
+            match = RelayMatch(self.rng.getrandbits(32), [opponent, writer])
+            # Both STARTs go out now, ahead of any input forwarded to either player
+            for player, player_writer in enumerate(match.writers):
+                player_writer.write(encode_message(START, encode_start(match.seed, player, self.turn_ticks, self.delay)))
+            future.set_result(match)
+            self.stats.matches_started += 1
+            return match, 1
+
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[size] = (reader, writer, future)
+        # Clients send nothing between JOIN and START, so a read that completes means they have gone
+        hangup = asyncio.ensure_future(reader.read(1))
+        try:
+            await asyncio.wait((future, hangup), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # The read must be over before the match reads from the same stream
+            hangup.cancel()
+            await asyncio.wait((hangup,))
+            if not future.done() and self.waiting.get(size, (None, None, None))[2] is future:
+                del self.waiting[size]
+        if not future.done():
+            future.cancel()
+            raise ConnectionError("Player left before an opponent joined")
+        return future.result(), 0
+
+    def end(self, match: RelayMatch, reason: int) -> None:
+        if match.closed:
+            return
+        match.closed = True
+        if reason == FINISHED:
+            self.stats.matches_finished += 1
+        else:
+            self.stats.matches_abandoned += 1
+        for writer in match.writers:
+            if not writer.is_closing():
+                writer.write(encode_message(END, bytes((reason,))))
+
+    def check(self, match: RelayMatch, body: bytes) -> None:
+        (turn,), offset = decode_varints(body, 1)
+        digest = body[offset:]
+        other = match.checks.pop(turn, None)
+        if other is None:
+            match.checks[turn] = digest
+        elif other != digest:
+            self.desync(match)
+
+    def desync(self, match: RelayMatch) -> None:
+        if not match.closed:
+            self.stats.desyncs += 1
+            self.end(match, DESYNC)
+
+    def finish(self, match: RelayMatch, player: int, body: bytes) -> None:
+        match.results[player] = body[1:]
+        other = match.results[1 - player]
+        if other is None:
+            # Tell the opponent how far this player got, so it stops waiting for inputs past that
+            writer = match.writers[1 - player]
+            if not match.closed and not writer.is_closing():
+                writer.write(encode_message(END, body))
+        elif other == body[1:]:
+            self.end(match, FINISHED)
+        else:
+            self.desync(match)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        match = None
+        player = 0
+        try:
+            kind, body = await read_message(reader)
+            if kind != JOIN or decode_varints(body, 1)[0][0] != PROTOCOL_VERSION:
+                writer.write(encode_message(END, bytes((REFUSED,))))
+                return
+            (_, columns, rows), _ = decode_varints(body, 3)
+            if columns < MIN_BOARD_SIZE or rows < MIN_BOARD_SIZE:
+                writer.write(encode_message(END, bytes((REFUSED,))))
+                return
+            match, player = await self.pair(reader, writer, (columns, rows))
+
+            opponent = match.writers[1 - player]
+            while True:
+                kind, body = await read_message(reader)
+                self.stats.messages += 1
+                if kind == INPUT:
+                    if not match.closed and not opponent.is_closing():
+                        message = encode_message(INPUT, body)
+                        self.stats.bytes_relayed += len(message)
+                        opponent.write(message)
+                elif kind == CHECK:
+                    self.check(match, body)
+                elif kind == END:
+                    if body and body[0] == FINISHED:
+                        self.finish(match, player, body)
+                    return
+                if opponent.transport.get_write_buffer_size() > 1 << 16:
+                    # Let a slow opponent catch up rather than buffering without limit
+                    await opponent.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ProtocolError, IndexError):
+            pass
+        finally:
+            if match is not None and match.results[player] is None:
+                self.end(match, OPPONENT_LEFT)
+            writer.close()
+
+
+async def run(host: str, port: int, interval: float) -> None:
+    relay = Relay()
+    server = await relay.serve(host, port)
+    print(f"Relay listening on {host}:{port}")
+    async with server:
+        while True:
+            await asyncio.sleep(interval)
+            print(relay.stats.summary())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pair versus players and relay their lockstep inputs")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--stats-interval', type=float, default=10.0, help="seconds between stats lines")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.host, args.port, args.stats_interval))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
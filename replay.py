@@ -0,0 +1,190 @@
+from pathlib import Path
+from typing import NamedTuple
+import argparse
+import struct
+import sys
+
+from engine import TetrisEngine
+from randomizer import STRATEGIES
+
+# File layout:
+#   header  magic, version, strategy index, lookahead, columns, rows, seed
+#   inputs  varint((tick delta << CODE_BITS) | action * 2 + pressed), one per applied input
+#   footer  varint((tick delta << CODE_BITS) | END), varint(score), varint(lines), 8-byte board digest
+MAGIC = b'TTRP'
+VERSION = 2  # 2: SRS rotation with wall kicks and two more rotate actions; older games no longer replay the same
+HEADER = struct.Struct('<4sBBBHHQ')
+CODE_BITS = 5
+END = (1 << CODE_BITS) - 1
+
+
+class ReplayError(Exception):
+    pass
+
+
+class ReplayResult(NamedTuple):
+    ticks: int
+    score: int
+    lines: int
+    digest: bytes
+    expected_score: int
+    expected_lines: int
+    expected_digest: bytes
+
+    @property
+    def matches(self) -> bool:
+        return (self.score, self.lines, self.digest) == (self.expected_score, self.expected_lines, self.expected_digest)
+
+
+def write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data: bytes, offset: int) -> tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(data):
+            raise ReplayError("Truncated replay")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def check_recordable(seed: int, lookahead: int, columns: int, rows: int) -> None:
+    """Raise ReplayError if a game with these settings does not fit the replay header"""
+    if not 0 <= seed < 1 << 64:
+        raise ReplayError(f"Cannot record seed {seed}: replays store seeds from 0 to 2**64 - 1")
+    if not 0 <= lookahead <= 0xFF:
+        raise ReplayError(f"Cannot record a preview of {lookahead} pieces: replays store at most 255")
+    if not (0 <= columns <= 0xFFFF and 0 <= rows <= 0xFFFF):
+        raise ReplayError(f"Cannot record a {columns}x{rows} board: replays store sizes up to 65535")
+
+
+class ReplayRecorder:
+    """Records the inputs an engine applies, from the start of a game until finish()"""
+    engine: TetrisEngine
+    data: bytearray
+    last_tick: int
+
+    def __init__(self, engine: TetrisEngine) -> None:
+        check_recordable(engine.seed, engine.generator.lookahead, engine.grid_columns, engine.grid_rows)
+        self.engine = engine
+        self.data = bytearray(HEADER.pack(
+            MAGIC,
+            VERSION,
+            STRATEGIES.index(engine.generator.strategy),
+            engine.generator.lookahead,
+            engine.grid_columns,
+            engine.grid_rows,
+            engine.seed,
+        ))
+        self.last_tick = 0
+        engine.add_listener(self.on_engine_event)
+
+    def on_engine_event(self, event: str, value: int) -> None:
+        if event == 'input':
+            self.append(value)
+
+    def append(self, code: int) -> None:
+        tick = self.engine.tick_count
+        write_varint(self.data, ((tick - self.last_tick) << CODE_BITS) | code)
+        self.last_tick = tick
+
+    def finish(self) -> bytes:
+        """Stop recording and return the complete replay, footer included"""
+        self.engine.remove_listener(self.on_engine_event)
+        self.append(END)
+        write_varint(self.data, self.engine.score)
+        write_varint(self.data, self.engine.lines_cleared)
+        self.data += self.engine.board.digest()
+        return bytes(self.data)
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(self.finish())
+
+
+def play(data: bytes) -> ReplayResult:
+    """Re-simulate a recorded game as fast as possible and compare it with its footer"""
+    if len(data) < HEADER.size:
+        raise ReplayError("Truncated replay header")
+    magic, version, strategy, lookahead, columns, rows, seed = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ReplayError("Not a replay file")
+    if version != VERSION:
+        raise ReplayError(f"Unsupported replay version {version}")
+
+    try:
+        engine = TetrisEngine(seed, STRATEGIES[strategy], lookahead, columns, rows)
+    except (IndexError, ValueError) as e:
+        raise ReplayError(f"Bad replay header: {e}") from e
+
+    offset = HEADER.size
+    tick = 0
+    while True:
+        value, offset = read_varint(data, offset)
+        tick += value >> CODE_BITS
+        code = value & END
+
+        # Inputs are applied on the tick they were recorded, so queue them one tick earlier
+        while engine.tick_count < tick - 1 and not engine.is_game_over:
+            engine.tick()
+        if code == END:
+            if engine.tick_count < tick and not engine.is_game_over:
+                engine.tick()
+            break
+        action, pressed = divmod(code, 2)
+        if pressed:
+            engine.press(action)
+        else:
+            engine.release(action)
+
+    expected_score, offset = read_varint(data, offset)
+    expected_lines, offset = read_varint(data, offset)
+    expected_digest = data[offset:offset + 8]
+    return ReplayResult(
+        engine.tick_count,
+        engine.score,
+        engine.lines_cleared,
+        engine.board.digest(),
+        expected_score,
+        expected_lines,
+        expected_digest,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-simulate recorded Tetris games and check their results")
+    parser.add_argument('paths', nargs='+', type=Path, help="replay files or directories of .ttr files")
+    args = parser.parse_args()
+
+    paths: list[Path] = []
+    for path in args.paths:
+        paths.extend(sorted(path.glob('*.ttr')) if path.is_dir() else [path])
+
+    failures = 0
+    for path in paths:
+        try:
+            result = play(path.read_bytes())
+        except ReplayError as e:
+            print(f"{path}: error: {e}")
+            failures += 1
+            continue
+        status = 'ok' if result.matches else 'MISMATCH'
+        print(f"{path}: {status} score={result.score} lines={result.lines} ticks={result.ticks}")
+        if not result.matches:
+            failures += 1
+
+    print(f"{len(paths) - failures}/{len(paths)} replays match")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
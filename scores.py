@@ -0,0 +1,159 @@
+from datetime import date, datetime
+from pathlib import Path
+from typing import NamedTuple
+import argparse
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY,
+    played_at TEXT NOT NULL,  -- local time, 'YYYY-MM-DD HH:MM:SS'
+    day TEXT NOT NULL,  -- 'YYYY-MM-DD' of played_at
+    player TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    lines INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    seed INTEGER
+);
+CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score DESC);
+CREATE INDEX IF NOT EXISTS scores_by_day ON scores (day, score DESC);
+CREATE INDEX IF NOT EXISTS scores_by_player ON scores (player, score DESC);
+"""
+INSERT = "INSERT INTO scores (played_at, day, player, score, lines, level, seed) VALUES (?, ?, ?, ?, ?, ?, ?)"
+COLUMNS = "played_at, player, score, lines, level, seed"
+LEGACY_PLAYER = 'legacy'  # player name given to scores imported from score_board.txt
+
+
+class ScoreEntry(NamedTuple):
+    played_at: str
+    player: str
+    score: int
+    lines: int = 0
+    level: int = 1
+    seed: int | None = None
+
+
+def parse_legacy(path: Path) -> list[ScoreEntry]:
+    """Read the 'YYYY-MM-DD HH:MM:SS score' lines the game used to append to score_board.txt"""
+    entries = []
+    for line in path.read_text().splitlines():
+        parts = line.split()
+        if len(parts) != 3:
+            continue
+        played_at = f"{parts[0]} {parts[1]}"
+        try:
+            datetime.strptime(played_at, "%Y-%m-%d %H:%M:%S")
+            score = int(parts[2])
+        except ValueError:
+            continue
+        entries.append(ScoreEntry(played_at, LEGACY_PLAYER, score))
+    return entries
+
+
+class ScoreStore:
+    """High scores in an indexed SQLite database
+
+    Every call opens its own connection, so a store can be used from any
+    thread. Writes are synchronous; the game makes them on its I/O worker so
+    it never waits on the disk. The database runs in WAL mode, so queries are
+    not blocked by a write in progress.
+    """
+    path: Path
+    error: Exception | None = None  # the last write failure, if any
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        db = self.connect()
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+        finally:
+            db.close()
+
+    def connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def add(self, player: str, score: int, lines: int = 0, level: int = 1, seed: int | None = None) -> None:
+        """Store a finished game"""
+        played_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.add_many([ScoreEntry(played_at, player, score, lines, level, seed)])
+
+    def add_many(self, entries: list[ScoreEntry]) -> None:
+        """Store several games in one transaction"""
+        if not entries:
+            return
+        db = self.connect()
+        try:
+            with db:
+                db.executemany(INSERT, [(e.played_at, e.played_at[:10], e.player, e.score, e.lines, e.level, e.seed) for e in entries])
+        except sqlite3.Error as e:
+            self.error = e
+            print(f"Error saving scores: {e}")
+        finally:
+            db.close()
+
+    def import_legacy(self, path: Path) -> int:
+        """Store every score in an old score_board.txt and return how many were found"""
+        entries = parse_legacy(path)
+        self.add_many(entries)
+        return len(entries)
+
+    def query(self, sql: str, params: tuple = ()) -> list[ScoreEntry]:
+        db = self.connect()
+        try:
+            return [ScoreEntry(*row) for row in db.execute(sql, params)]
+        finally:
+            db.close()
+
+    def top(self, limit: int = 10) -> list[ScoreEntry]:
+        return self.query(f"SELECT {COLUMNS} FROM scores ORDER BY score DESC LIMIT ?", (limit,))
+
+    def best_of_day(self, day: date | None = None, limit: int = 1) -> list[ScoreEntry]:
+        """Highest scores played on a day, today by default"""
+        day = day or date.today()
+        return self.query(f"SELECT {COLUMNS} FROM scores WHERE day = ? ORDER BY score DESC LIMIT ?", (day.isoformat(), limit))
+
+    def player_best(self, player: str, limit: int = 10) -> list[ScoreEntry]:
+        return self.query(f"SELECT {COLUMNS} FROM scores WHERE player = ? ORDER BY score DESC LIMIT ?", (player, limit))
+
+    def count(self) -> int:
+        db = self.connect()
+        try:
+            return db.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+        finally:
+            db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Query and maintain the Tetris high score database")
+    parser.add_argument('--db', type=Path, default=Path('scores.db'), help="score database")
+    commands = parser.add_subparsers(dest='command', required=True)
+    top = commands.add_parser('top', help="best scores of all time")
+    top.add_argument('--limit', type=int, default=10)
+    today = commands.add_parser('today', help="best scores played today")
+    today.add_argument('--limit', type=int, default=1)
+    player = commands.add_parser('player', help="best scores of one player")
+    player.add_argument('name')
+    player.add_argument('--limit', type=int, default=10)
+    legacy = commands.add_parser('import', help="add the scores from an old score_board.txt")
+    legacy.add_argument('path', type=Path, nargs='?', default=Path('score_board.txt'))
+    args = parser.parse_args()
+
+    store = ScoreStore(args.db)
+    if args.command == 'import':
+        count = store.import_legacy(args.path)
+        print(f"Imported {count} scores from {args.path}")
+        return
+
+    if args.command == 'top':
+        entries = store.top(args.limit)
+    elif args.command == 'today':
+        entries = store.best_of_day(limit=args.limit)
+    else:
+        entries = store.player_best(args.name, args.limit)
+    for rank, entry in enumerate(entries, 1):
+        print(f"{rank:>3}. {entry.score:>8} {entry.player:<16} {entry.played_at}  lines={entry.lines} level={entry.level}")
+
+
+if __name__ == "__main__":
+    main()
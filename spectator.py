@@ -0,0 +1,371 @@
+from typing import NamedTuple
+import argparse
+import asyncio
+import threading
+import time
+
+from address import parse_address
+from board import BitBoard, ColorRow
+from engine import TetrisEngine
+from tetromino import COLORS, GARBAGE_COLOR, Tetromino
+from versus import ProtocolError, decode_varints, encode_message, encode_varints, read_message
+
+DEFAULT_PORT = 47901
+
+# Messages use the versus framing (u16 length, type byte, body) and carry a sequence number,
+# one higher for every message sent, so a viewer can tell when it missed one:
+#   KEYFRAME  varint(seq), u8 new game, varint(columns), varint(rows), status, then every row
+#   DELTA     varint(seq), status, varint(count), then varint(y) and the row for each changed row
+# status: varint(score), varint(level), varint(lines), u8 game over, piece, varint(count), upcoming kinds
+# piece:  varint(kind + 1, 0 for none), varint(rotation), zigzag varint(x), zigzag varint(y)
+# row:    varint(occupied cell bits), then one PALETTE index byte per occupied cell, lowest x first
+KEYFRAME, DELTA = range(1, 3)
+
+# Locked cell colours; a cell is sent as its index here, 0 being empty
+PALETTE = (0, *COLORS, GARBAGE_COLOR)
+PALETTE_INDEX = {color: index for index, color in enumerate(PALETTE)}
+
+PieceState = tuple[int, int, int, int]  # (kind + 1, rotation, x, y), all 0 when there is no piece
+
+
+class Status(NamedTuple):
+    score: int
+    level: int
+    lines: int
+    game_over: bool
+    piece: PieceState
+    upcoming: tuple[int, ...]
+
+
+def zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+
+def piece_state(piece: Tetromino | None) -> PieceState:
+    if piece is None:
+        return (0, 0, 0, 0)
+    x, y = piece.position
+    return (piece.kind + 1, piece.rotation, x, y)
+
+
+def engine_status(engine: TetrisEngine) -> Status:
+    return Status(
+        engine.score,
+        engine.level,
+        engine.lines_cleared,
+        engine.is_game_over,
+        piece_state(engine.current_piece),
+        engine.preview(),
+    )
+
+
+def encode_status(out: bytearray, status: Status) -> None:
+    kind, rotation, x, y = status.piece
+    out += encode_varints(status.score, status.level, status.lines)
+    out.append(status.game_over)
+    out += encode_varints(kind, rotation, zigzag(x), zigzag(y), len(status.upcoming), *status.upcoming)
+
+
+def decode_status(body: bytes, offset: int) -> tuple[Status, int]:
+    (score, level, lines), offset = decode_varints(body, 3, offset)
+    if offset >= len(body):
+        raise ProtocolError("Truncated status")
+    game_over = bool(body[offset])
+    (kind, rotation, x, y, count), offset = decode_varints(body, 5, offset + 1)
+    upcoming, offset = decode_varints(body, count, offset)
+    return Status(score, level, lines, game_over, (kind, rotation, unzigzag(x), unzigzag(y)), tuple(upcoming)), offset
+
+
+def encode_row(out: bytearray, bits: int, colors: ColorRow) -> None:
+    out += encode_varints(bits)
+    while bits:
+        low = bits & -bits
+        out.append(PALETTE_INDEX.get(colors[low.bit_length() - 1], len(PALETTE) - 1))
+        bits ^= low
+
+
+def decode_row(body: bytes, offset: int, columns: int) -> tuple[list[int], int]:
+    (bits,), offset = decode_varints(body, 1, offset)
+    cells = [0] * columns
+    while bits:
+        low = bits & -bits
+        x = low.bit_length() - 1
+        if x >= columns or offset >= len(body):
+            raise ProtocolError("Malformed row")
+        cells[x] = body[offset]
+        offset += 1
+        bits ^= low
+    return cells, offset
+
+
+class SpectatorPublisher:
+    """Streams a game to any number of spectators over TCP, from a background thread
+
+    publish() runs on the game thread: it compares the board rows, piece and
+    score with what was last sent and hands the encoded difference to the
+    publisher's own event loop, which writes it to every subscriber. A subscriber
+    that joins, or falls so far behind that its send buffer fills, gets nothing
+    more until the next keyframe, which is then sent early.
+    """
+    keyframe_interval: float = 2.0  # seconds between keyframes
+    max_buffer: int = 1 << 16  # bytes queued for one subscriber before it is skipped until the next keyframe
+    address: tuple[str, int]
+    loop: asyncio.AbstractEventLoop
+    thread: threading.Thread
+    server: asyncio.Server | None = None
+    subscribers: dict[asyncio.StreamWriter, bool]  # True once the subscriber has had a keyframe
+    keyframe_requested: bool = False  # set from the publisher thread, read by the game thread
+    seq: int = 0
+    board: BitBoard | None = None  # the board the last keyframe was taken from
+    rows: list[ColorRow]  # colour rows as last sent, compared by identity
+    status: Status | None = None
+    next_keyframe: float = 0.0
+    messages: int = 0
+    bytes_sent: int = 0
+
+    def __init__(self, address: tuple[str, int] = ('127.0.0.1', DEFAULT_PORT)) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.subscribers = {}
+        self.rows = []
+        started = threading.Event()
+        error: list[OSError] = []
+
+        def run() -> None:
+            try:
+                self.server = self.loop.run_until_complete(asyncio.start_server(self.subscribe, *address))
+            except OSError as e:
+                error.append(e)
+                return
+            finally:
+                started.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, name='spectator-publisher', daemon=True)
+        self.thread.start()
+        started.wait()
+        if error:
+            self.loop.close()
+            raise error[0]
+        server = self.server
+        assert server is not None
+        self.address = server.sockets[0].getsockname()[:2]
+
+    async def subscribe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.subscribers[writer] = False
+        self.keyframe_requested = True
+        try:
+            # Spectators only listen; this just notices when one leaves
+            await reader.read()
+        except ConnectionError:
+            pass
+        finally:
+            self.subscribers.pop(writer, None)
+            writer.close()
+
+    def broadcast(self, kind: int, message: bytes) -> None:
+        """Runs on the publisher thread"""
+        for writer, synced in list(self.subscribers.items()):
+            if writer.is_closing():
+                continue
+            full = writer.transport.get_write_buffer_size() > self.max_buffer
+            if kind == KEYFRAME and not full:
+                self.subscribers[writer] = True
+            elif not synced or full:
+                # Skip it: the deltas it missed would be wasted without the keyframe before them
+                if synced:
+                    self.subscribers[writer] = False
+                elif not full:
+                    self.keyframe_requested = True
+                continue
+            writer.write(message)
+            self.bytes_sent += len(message)
+
+    def send(self, kind: int, body: bytes) -> None:
+        self.seq += 1
+        self.messages += 1
+        self.loop.call_soon_threadsafe(self.broadcast, kind, encode_message(kind, body))
+
+    def publish(self, engine: TetrisEngine) -> None:
+        """Send whatever changed since the last call; cheap when nothing did"""
+        if not self.subscribers:
+            # Nobody is watching; whoever subscribes next asks for a keyframe
+            self.board = None
+            return
+        if engine.board is not self.board:
+            self.publish_keyframe(engine, True)
+            return
+        self.publish_delta(engine)
+        # A keyframe always repeats the state of the message before it, so viewers can check themselves
+        if self.keyframe_requested or time.monotonic() >= self.next_keyframe:
+            self.publish_keyframe(engine, False)
+
+    def publish_delta(self, engine: TetrisEngine) -> None:
+        board = engine.board
+        colors = board.colors
+        sent = self.rows
+        changed = [y for y in range(board.height) if colors[y] is not sent[y]]
+        status = engine_status(engine)
+        if not changed and status == self.status:
+            return
+        body = bytearray(encode_varints(self.seq + 1))
+        encode_status(body, status)
+        body += encode_varints(len(changed))
+        for y in changed:
+            body += encode_varints(y)
+            encode_row(body, board.rows[y], colors[y])
+        self.rows = list(colors)
+        self.status = status
+        self.send(DELTA, bytes(body))
+
+    def publish_keyframe(self, engine: TetrisEngine, new_game: bool) -> None:
+        board = engine.board
+        status = engine_status(engine)
+        self.keyframe_requested = False
+        body = bytearray(encode_varints(self.seq + 1))
+        body.append(new_game)
+        body += encode_varints(board.columns, board.height)
+        encode_status(body, status)
+        for bits, colors in zip(board.rows, board.colors):
+            encode_row(body, bits, colors)
+        self.board = board
+        self.rows = list(board.colors)
+        self.status = status
+        self.next_keyframe = time.monotonic() + self.keyframe_interval
+        self.send(KEYFRAME, bytes(body))
+
+    def close(self) -> None:
+        async def shutdown() -> None:
+            if self.server is not None:
+                self.server.close()
+            for writer in list(self.subscribers):
+                writer.close()
+
+        if self.thread.is_alive():
+            asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+
+
+class SpectatorView:
+    """A game rebuilt from a spectator stream: palette indices per cell, plus the status
+
+    Each keyframe is also checked against the board rebuilt from the deltas
+    before it; `mismatches` counts keyframes that disagreed.
+    """
+    columns: int = 0
+    rows: int = 0
+    cells: list[list[int]]
+    status: Status | None = None
+    seq: int | None = None  # last message applied; None until the first keyframe
+    keyframes: int = 0
+    deltas: int = 0
+    skipped: int = 0  # deltas ignored while waiting for a keyframe
+    mismatches: int = 0
+
+    def __init__(self) -> None:
+        self.cells = []
+
+    @property
+    def synced(self) -> bool:
+        return self.seq is not None
+
+    def apply(self, kind: int, body: bytes) -> None:
+        (seq,), offset = decode_varints(body, 1)
+        if kind == KEYFRAME:
+            if offset >= len(body):
+                raise ProtocolError("Truncated keyframe")
+            new_game = body[offset]
+            (columns, rows), offset = decode_varints(body, 2, offset + 1)
+            status, offset = decode_status(body, offset)
+            cells = []
+            for _ in range(rows):
+                row, offset = decode_row(body, offset, columns)
+                cells.append(row)
+            if not new_game and self.seq is not None and seq == self.seq + 1 and (cells, status) != (self.cells, self.status):
+                self.mismatches += 1
+            self.columns, self.rows, self.cells, self.status = columns, rows, cells, status
+            self.keyframes += 1
+        elif kind == DELTA:
+            if self.seq is None or seq != self.seq + 1:
+                # Missed something: wait for the next keyframe
+                self.seq = None
+                self.skipped += 1
+                return
+            self.status, offset = decode_status(body, offset)
+            (count,), offset = decode_varints(body, 1, offset)
+            for _ in range(count):
+                (y,), offset = decode_varints(body, 1, offset)
+                if y >= self.rows:
+                    raise ProtocolError(f"Row {y} outside the board")
+                self.cells[y], offset = decode_row(body, offset, self.columns)
+            self.deltas += 1
+        else:
+            return
+        self.seq = seq
+
+    def render(self) -> str:
+        """The board as text, '#' for locked cells and '@' for the falling piece"""
+        lines = [['#' if cell else '.' for cell in row] for row in self.cells]
+        if self.status is not None and self.status.piece[0]:
+            kind, rotation, x, y = self.status.piece
+            piece = Tetromino(kind - 1)
+            piece.rotation = rotation
+            for cx, cy in piece.table.cells:
+                if 0 <= y + cy < self.rows and 0 <= x + cx < self.columns:
+                    lines[y + cy][x + cx] = '@'
+        text = '\n'.join(''.join(line) for line in lines)
+        if self.status is not None:
+            status = self.status
+            text += f"\nscore {status.score}  level {status.level}  lines {status.lines}"
+            if status.game_over:
+                text += "  GAME OVER"
+        return text
+
+
+async def watch(host: str, port: int, view: SpectatorView, on_update=None) -> None:
+    """Apply a stream to `view` until the publisher goes away, calling on_update(view) after each message"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            kind, body = await read_message(reader)
+            view.apply(kind, body)
+            if on_update is not None and view.synced:
+                on_update(view)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    except ProtocolError as e:
+        # A malformed stream ends the watch like a dropped connection, with the totals so far
+        print(f"Error in spectator stream: {e}")
+    finally:
+        writer.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Headless spectator: rebuild a game from its stream (see main.py --spectate)")
+    parser.add_argument('address', nargs='?', default=f'127.0.0.1:{DEFAULT_PORT}', help="publisher host:port")
+    parser.add_argument('--quiet', action='store_true', help="print only the totals when the stream ends")
+    args = parser.parse_args()
+
+    view = SpectatorView()
+
+    def show(view: SpectatorView) -> None:
+        # Clear the terminal and redraw
+        print('\x1b[H\x1b[2J' + view.render(), flush=True)
+
+    host, port = parse_address(args.address, DEFAULT_PORT)
+    try:
+        asyncio.run(watch(host, port, view, None if args.quiet else show))
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Error connecting to {host}:{port}: {e}")
+        return
+    print(f"keyframes={view.keyframes} deltas={view.deltas} skipped={view.skipped} mismatches={view.mismatches}")
+
+
+if __name__ == "__main__":
+    main()
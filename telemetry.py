@@ -0,0 +1,55 @@
+import argparse
+import json
+import socket
+import time
+
+from address import parse_address
+
+DEFAULT_PORT = 47800
+
+
+class TelemetryClient:
+    """Sends game events as JSON datagrams to a collector; meant to run on the I/O worker
+
+    UDP keeps the sender from ever waiting on the collector, which may not be running.
+    """
+    address: tuple[str, int]
+    sock: socket.socket
+
+    def __init__(self, address: tuple[str, int]) -> None:
+        self.address = address
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def send(self, event: str, **fields: object) -> None:
+        payload = json.dumps({'event': event, 'time': time.time(), **fields}).encode()
+        try:
+            self.sock.sendto(payload, self.address)
+        except OSError:
+            # Nobody listening is not an error for telemetry
+            pass
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local telemetry collector stub: print every event the game sends")
+    parser.add_argument('address', nargs='?', default=f'127.0.0.1:{DEFAULT_PORT}', help="host:port to listen on")
+    args = parser.parse_args()
+
+    address = parse_address(args.address, DEFAULT_PORT)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(address)
+    print(f"Collecting on {address[0]}:{address[1]}")
+    try:
+        while True:
+            payload, sender = sock.recvfrom(65536)
+            print(payload.decode(errors='replace'))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+from collections import deque
+import random
+
+from ai import Bot, MoveGenerator, State
+from engine import TetrisEngine
+from tetromino import GARBAGE_COLOR, SHAPE_TABLES, Tetromino
+
+I = 1
+PLAN_BUDGET = 0.016  # one frame at 60 fps; plans run inside the tick loop
+
+
+def tower_and_well() -> TetrisEngine:
+    """A 10x20 engine with the last column filled up to the second row and a 4-row stack with a well in column 4"""
+    engine = TetrisEngine(0)
+    board = engine.board
+    for y in range(board.height):
+        bits = 1 << 9 if y >= 1 else 0
+        if y >= 16:
+            bits |= board.full_row & ~(1 << 4)
+        board.rows[y] = bits
+        board.colors[y] = tuple(GARBAGE_COLOR if bits >> x & 1 else 0 for x in range(board.columns))
+    board.repack()
+    return engine
+
+
+def test_plan_fits_a_frame_with_a_tall_column() -> None:
+    # The tall column must not widen the surface search for pieces over the rest of the board
+    for kind in range(len(SHAPE_TABLES)):
+        times = []
+        for _ in range(3):
+            engine = tower_and_well()
+            engine.current_piece = Tetromino(kind)
+            bot = Bot()
+            bot.plan(engine)
+            times.append(bot.last_plan_time)
+        assert min(times) < PLAN_BUDGET, (kind, min(times))
+
+
+def test_i_reaches_the_bottom_of_the_well() -> None:
+    engine = tower_and_well()
+    placements = Bot().generator.placements(engine.board.packed, I)
+    cells = {
+        frozenset((placement.x + cx, placement.y + cy) for cx, cy in SHAPE_TABLES[I][placement.rotation].cells)
+        for placement in placements
+    }
+    assert frozenset((4, y) for y in range(16, 20)) in cells
+
+
+def resting_cells(generator: MoveGenerator, kind: int, rotation: int, x: int, y: int) -> int:
+    table = SHAPE_TABLES[kind][rotation]
+    return generator.masks[kind][rotation] << ((y + table.top) * generator.columns + x + table.left)
+
+
+def reachable_cells(generator: MoveGenerator, packed: int, kind: int) -> set[int]:
+    """Every resting position a piece can reach from the spawn, by breadth-first search over all moves"""
+    spawn: State = (0, generator.spawn_x, 0)
+    if not generator.fits(packed, kind, *spawn):
+        return set()
+    seen: set[State] = {spawn}
+    queue: deque[State] = deque([spawn])
+    cells = set()
+    while queue:
+        rotation, x, y = queue.popleft()
+        if not generator.fits(packed, kind, rotation, x, y + 1):
+            cells.add(resting_cells(generator, kind, rotation, x, y))
+        for state in (
+            (rotation, x - 1, y),
+            (rotation, x + 1, y),
+            (rotation, x, y + 1),
+            generator.rotate(packed, kind, rotation, x, y),
+            generator.rotate(packed, kind, rotation, x, y, 3),
+            generator.rotate(packed, kind, rotation, x, y, 2),
+        ):
+            if state not in seen and generator.fits(packed, kind, *state):
+                seen.add(state)
+                queue.append(state)
+    return cells
+
+
+def ragged_board(rng: random.Random, columns: int, rows: int) -> int:
+    """A packed board with columns of random height, overhangs and ledges"""
+    packed = 0
+    for x in range(columns):
+        height = rng.randrange(rows * 3 // 4)
+        for y in range(rows - height, rows):
+            if rng.random() < 0.8:
+                packed |= 1 << (y * columns + x)
+    return packed
+
+
+def test_placements_match_an_exhaustive_search() -> None:
+    # Includes tucks from mid-height, e.g. sliding under an overhang onto a ledge in the next column
+    rng = random.Random(13)
+    generator = MoveGenerator()
+    for _ in range(200):
+        packed = ragged_board(rng, generator.columns, generator.rows)
+        for kind in range(len(SHAPE_TABLES)):
+            found = {resting_cells(generator, kind, p.rotation, p.x, p.y) for p in generator.placements(packed, kind)}
+            assert found == reachable_cells(generator, packed, kind), (packed, kind)
@@ -0,0 +1,18 @@
+from farm import GameStats, summarize
+from profiler import nearest_rank
+
+
+def test_nearest_rank() -> None:
+    assert nearest_rank([1, 2, 3, 4, 5], 0.50) == 3
+    assert nearest_rank(list(range(1, 10)), 0.50) == 5
+    assert nearest_rank([1, 2, 3, 4, 5], 0.90) == 5
+    assert nearest_rank(list(range(1, 101)), 0.99) == 99
+    assert nearest_rank(list(range(1, 11)), 0.25) == 3
+    assert nearest_rank([7], 0.99) == 7
+
+
+def test_summarize() -> None:
+    results = [GameStats(seed, score, 0, 1, 10, 100) for seed, score in enumerate([500, 100, 300, 200, 400])]
+    scores = summarize(results)['score']
+    assert (scores['min'], scores['p50'], scores['p90'], scores['max'], scores['mean']) == (100, 300, 500, 500, 300)
+    assert summarize([]) == {}
@@ -0,0 +1,190 @@
+import random
+
+import pytest
+
+from engine import TetrisEngine
+from kick_check import batch_results, engine_results, expected, generator_results, kick_cases, random_cases
+from tetromino import GARBAGE_COLOR, ROTATION_KICKS, SHAPE_TABLES, Tetromino
+
+O, I, T = 0, 1, 2
+Cells = set[tuple[int, int]]
+
+
+def engine_with(free: Cells | None = None) -> TetrisEngine:
+    """A 10x20 engine whose board is empty, or full except for the `free` cells"""
+    engine = TetrisEngine(0)
+    if free is not None:
+        board = engine.board
+        for y in range(board.height):
+            board.rows[y] = sum(1 << x for x in range(board.columns) if (x, y) not in free)
+            board.colors[y] = tuple(GARBAGE_COLOR if board.rows[y] >> x & 1 else 0 for x in range(board.columns))
+        board.repack()
+    return engine
+
+
+def place(engine: TetrisEngine, kind: int, rotation: int, cells: Cells) -> Tetromino:
+    """Make the current piece the given state, positioned so that it covers exactly `cells`"""
+    shape = SHAPE_TABLES[kind][rotation].cells
+    x = min(cx for cx, _ in cells) - min(cx for cx, _ in shape)
+    y = min(cy for _, cy in cells) - min(cy for _, cy in shape)
+    piece = engine.current_piece = Tetromino(kind)
+    piece.rotation, piece.position = rotation, (x, y)
+    assert covered(piece) == cells
+    return piece
+
+
+def covered(piece: Tetromino) -> Cells:
+    x, y = piece.position
+    return {(x + cx, y + cy) for cx, cy in piece.table.cells}
+
+
+def rotated(kind: int, rotation: int, cells: Cells, turns: int, free: Cells | None = None) -> tuple[int, Cells]:
+    engine = engine_with(None if free is None else free | cells)
+    piece = place(engine, kind, rotation, cells)
+    engine.rotate_piece(turns)
+    return piece.rotation, covered(piece)
+
+
+def column(x: int, top: int) -> Cells:
+    return {(x, y) for y in range(top, top + 4)}
+
+
+def row(left: int, y: int) -> Cells:
+    return {(x, y) for x in range(left, left + 4)}
+
+
+# The published SRS tables, in their own y-up notation: (from, to) -> kicks
+SRS_JLSTZ = {
+    (0, 1): [(0, 0), (-1, 0), (-1, 1), (0, -2), (-1, -2)],
+    (1, 0): [(0, 0), (1, 0), (1, -1), (0, 2), (1, 2)],
+    (1, 2): [(0, 0), (1, 0), (1, -1), (0, 2), (1, 2)],
+    (2, 1): [(0, 0), (-1, 0), (-1, 1), (0, -2), (-1, -2)],
+    (2, 3): [(0, 0), (1, 0), (1, 1), (0, -2), (1, -2)],
+    (3, 2): [(0, 0), (-1, 0), (-1, -1), (0, 2), (-1, 2)],
+    (3, 0): [(0, 0), (-1, 0), (-1, -1), (0, 2), (-1, 2)],
+    (0, 3): [(0, 0), (1, 0), (1, 1), (0, -2), (1, -2)],
+}
+SRS_I = {
+    (0, 1): [(0, 0), (-2, 0), (1, 0), (-2, -1), (1, 2)],
+    (1, 0): [(0, 0), (2, 0), (-1, 0), (2, 1), (-1, -2)],
+    (1, 2): [(0, 0), (-1, 0), (2, 0), (-1, 2), (2, -1)],
+    (2, 1): [(0, 0), (1, 0), (-2, 0), (1, -2), (-2, 1)],
+    (2, 3): [(0, 0), (2, 0), (-1, 0), (2, 1), (-1, -2)],
+    (3, 2): [(0, 0), (-2, 0), (1, 0), (-2, -1), (1, 2)],
+    (3, 0): [(0, 0), (1, 0), (-2, 0), (1, -2), (-2, 1)],
+    (0, 3): [(0, 0), (-1, 0), (2, 0), (-1, 2), (2, -1)],
+}
+SRS_PLUS_HALF = {
+    (0, 2): [(0, 0), (0, 1), (1, 1), (-1, 1), (1, 0), (-1, 0)],
+    (1, 3): [(0, 0), (1, 0), (1, 2), (1, 1), (0, 2), (0, 1)],
+    (2, 0): [(0, 0), (0, -1), (-1, -1), (1, -1), (-1, 0), (1, 0)],
+    (3, 1): [(0, 0), (-1, 0), (-1, 2), (-1, 1), (0, 2), (0, 1)],
+}
+
+
+def test_kick_tables_match_srs() -> None:
+    for kind, kicks in enumerate(ROTATION_KICKS):
+        if kind == O:
+            assert kicks == ((((0, 0, 0),),) * 4,)
+            continue
+        quarter = SRS_I if kind == I else SRS_JLSTZ
+        for (start, end), published in (quarter | SRS_PLUS_HALF).items():
+            turns = (end - start) % 4
+            # Board rows grow downwards, so every y is flipped
+            assert kicks[start][turns] == tuple((end, dx, -dy) for dx, dy in published), (kind, start, end)
+
+
+def test_i_kicks_pair_up() -> None:
+    # In SRS the I kicks come in equal pairs: 0 -> R = L -> 2, R -> 2 = 0 -> L, 2 -> L = R -> 0, L -> 0 = 2 -> R
+    kicks = ROTATION_KICKS[I]
+    for (start, turns), (other, other_turns) in (((0, 1), (3, 3)), ((1, 1), (0, 3)), ((2, 1), (1, 3)), ((3, 1), (2, 3))):
+        assert [kick[1:] for kick in kicks[start][turns]] == [kick[1:] for kick in kicks[other][other_turns]]
+
+
+def test_four_distinct_states() -> None:
+    for kind, tables in enumerate(SHAPE_TABLES):
+        assert len({table.cells for table in tables}) == (1 if kind == O else 4)
+
+
+def test_i_turns_about_its_box_centre() -> None:
+    # SRS: flat I in the second row of its 4x4 box turns into the third column
+    assert rotated(I, 0, row(3, 11), 1) == (1, column(5, 10))
+    assert rotated(I, 0, row(3, 11), 3) == (3, column(4, 10))
+    assert rotated(I, 0, row(3, 11), 2) == (2, row(3, 12))
+
+
+def test_i_kicks_off_the_left_wall() -> None:
+    # L -> 0 tries (0, 0) first, which sticks out of the wall, then one to the right
+    assert rotated(I, 3, column(0, 10), 1) == (0, row(0, 11))
+    # R -> 0 sits two columns further left in the box, so it takes the two-column kick
+    assert rotated(I, 1, column(0, 10), 3) == (0, row(0, 11))
+
+
+def test_i_kicks_off_the_right_wall() -> None:
+    # R -> 2 tries (0, 0), then one to the left
+    assert rotated(I, 1, column(9, 10), 1) == (2, row(6, 12))
+    # L -> 2 tries (0, 0), then two to the left, which the wall allows
+    assert rotated(I, 3, column(9, 10), 3) == (2, row(6, 12))
+
+
+def test_i_kicks_are_tried_in_order() -> None:
+    # L -> 0 blocked in place takes the first of the remaining SRS tests that fits:
+    # one right, two left, then one right and two down before two left and one up
+    everything = {(x, y) for x in range(10) for y in range(20)}
+    assert rotated(I, 3, column(4, 10), 1, free=everything - {(3, 11)}) == (0, row(4, 11))
+    assert rotated(I, 3, column(4, 10), 1, free=everything - {(6, 11)}) == (0, row(1, 11))
+    assert rotated(I, 3, column(4, 10), 1, free=everything - {(3, 11), (7, 11)}) == (0, row(4, 13))
+    assert rotated(I, 3, column(4, 10), 1, free=everything - {(3, 11), (7, 11), (7, 13)}) == (0, row(1, 10))
+
+
+def test_t_spin_triple_kick() -> None:
+    # The fifth test of 0 -> L moves the T one right and two down into a slot under an
+    # overhang; every earlier test is blocked, and the lock completes three rows
+    start = {(4, 8), (3, 9), (4, 9), (5, 9)}
+    slot = {(5, 10), (4, 11), (5, 11), (5, 12)}
+    assert rotated(T, 0, start, 3, free=slot) == (3, slot)
+
+    engine = engine_with(start | slot)
+    place(engine, T, 0, start)
+    engine.rotate_piece(3)
+    engine.lock_piece()
+    assert engine.full_lines == [10, 11, 12]
+
+
+def test_t_blocked_everywhere_stays_put() -> None:
+    start = {(4, 8), (3, 9), (4, 9), (5, 9)}
+    for turns in (1, 2, 3):
+        assert rotated(T, 0, start, turns, free=set()) == (0, start)
+
+
+def test_half_turn_kicks() -> None:
+    # SRS+ 0 -> 2 on the floor: in place would go through it, so the T moves up one
+    on_floor = {(4, 18), (3, 19), (4, 19), (5, 19)}
+    assert rotated(T, 0, on_floor, 2) == (2, {(3, 18), (4, 18), (5, 18), (4, 19)})
+    # SRS+ R -> L against the left wall moves one to the right
+    assert rotated(T, 1, {(0, 10), (0, 11), (1, 11), (0, 12)}, 2) == (3, {(1, 10), (0, 11), (1, 11), (1, 12)})
+    # Out in the open a half turn spins in place, and a second one comes back
+    centre = {(4, 10), (3, 11), (4, 11), (5, 11)}
+    assert rotated(T, 0, centre, 2) == (2, {(3, 11), (4, 11), (5, 11), (4, 12)})
+    assert rotated(T, 2, {(3, 11), (4, 11), (5, 11), (4, 12)}, 2) == (0, centre)
+
+
+def test_o_never_moves() -> None:
+    square = {(4, 0), (5, 0), (4, 1), (5, 1)}
+    for turns in (1, 2, 3):
+        assert rotated(O, 0, square, turns) == (0, square)
+
+
+@pytest.mark.parametrize('columns, rows', [(10, 20), (8, 12), (13, 30)])
+def test_engine_bot_and_batch_agree_on_every_kick(columns: int, rows: int) -> None:
+    kicked, _ = kick_cases(columns, rows)
+    for case, index in kicked:
+        kind, rotation, x, y, turns, _ = case
+        new_rotation, dx, dy = ROTATION_KICKS[kind][rotation][turns][index]
+        assert expected(case, columns, rows) == (new_rotation, x + dx, y + dy)
+
+    cases = [case for case, _ in kicked] + random_cases(600, columns, rows, random.Random(columns * rows))
+    want = [expected(case, columns, rows) for case in cases]
+    assert engine_results(cases, columns, rows) == want
+    assert generator_results(cases, columns, rows) == want
+    assert batch_results(cases, columns, rows) == want
@@ -0,0 +1,331 @@
+from typing import NamedTuple
+
+# fmt: off
+TETROMINO_INFO = [
+    # O
+    {
+        'shapes': [
+            [
+                '00',
+                '00',
+            ]
+        ],
+        'color': (0xfb, 0xe7, 0xa1)
+    },
+    # I
+    {
+        'shapes': [
+            [
+                '....',
+                '....',
+                '....',
+                '0000',
+                '....',
+                '....',
+            ],
+            [
+                '....',
+                '....',
+                '..0.',
+                '..0.',
+                '..0.',
+                '..0.',
+            ],
+            [
+                '....',
+                '....',
+                '....',
+                '....',
+                '0000',
+                '....',
+            ],
+            [
+                '....',
+                '....',
+                '.0..',
+                '.0..',
+                '.0..',
+                '.0..',
+            ],
+        ],
+        'color': (0x7f, 0xd8, 0xbe)
+    },
+    # T
+    {
+        'shapes': [
+            [
+                '.0.',
+                '000',
+                '...',
+            ],
+            [
+                '.0.',
+                '.00',
+                '.0.',
+            ],
+            [
+                '...',
+                '000',
+                '.0.',
+            ],
+            [
+                '.0.',
+                '00.',
+                '.0.',
+            ],
+        ],
+        'color': (0xbf, 0xa2, 0xdb)
+    },
+    # S
+    {
+        'shapes': [
+            [
+                '.....',
+                '..00.',
+                '.00..',
+                '.....',
+            ],
+            [
+                '.....',
+                '..0..',
+                '..00.',
+                '...0.',
+            ],
+            [
+                '.....',
+                '.....',
+                '..00.',
+                '.00..',
+            ],
+            [
+                '.....',
+                '.0...',
+                '.00..',
+                '..0..',
+            ],
+        ],
+        'color': (0x81, 0xd4, 0xfa)
+    },
+    # Z
+    {
+        'shapes': [
+            [
+                '.....',
+                '.00..',
+                '..00.',
+                '.....',
+            ],
+            [
+                '.....',
+                '...0.',
+                '..00.',
+                '..0..',
+            ],
+            [
+                '.....',
+                '.....',
+                '.00..',
+                '..00.',
+            ],
+            [
+                '.....',
+                '..0..',
+                '.00..',
+                '.0...',
+            ],
+        ],
+        'color': (0xf0, 0xcd, 0xd2)
+    },
+    # L
+    {
+        'shapes': [
+            [
+                '.....',
+                '...0.',
+                '.000.',
+                '.....',
+                '.....',
+            ],
+            [
+                '.....',
+                '..0..',
+                '..0..',
+                '..00.',
+                '.....',
+            ],
+            [
+                '.....',
+                '.....',
+                '.000.',
+                '.0...',
+                '.....',
+            ],
+            [
+                '.....',
+                '.00..',
+                '..0..',
+                '..0..',
+                '.....',
+            ],
+        ],
+        'color': (0xff, 0xbb, 0xd0)
+    },
+    # J
+    {
+        'shapes': [
+            [
+                '.....',
+                '.0...',
+                '.000.',
+                '.....',
+                '.....',
+            ],
+            [
+                '.....',
+                '..00.',
+                '..0..',
+                '..0..',
+                '.....',
+            ],
+            [
+                '.....',
+                '.....',
+                '.000.',
+                '...0.',
+                '.....',
+            ],
+            [
+                '.....',
+                '..0..',
+                '..0..',
+                '.00..',
+                '.....',
+            ],
+        ],
+        'color': (0x90, 0xca, 0xf9)
+    },
+]
+# fmt: on
+
+Color = tuple[int, int, int]
+
+# The shape strings are laid out for the classic 10-column board, where pieces spawn at x = 0
+CLASSIC_COLUMNS = 10
+
+
+class ShapeTable(NamedTuple):
+    """One rotation of a piece, compiled from its TETROMINO_INFO strings"""
+    cells: tuple[tuple[int, int], ...]  # (x, y) offsets of occupied cells from the piece origin
+    left: int  # bounding box, relative to the piece origin
+    top: int
+    width: int
+    height: int
+    bottom: tuple[int, ...]  # lowest occupied y offset for each bounding box column
+    row_bits: tuple[int, ...]  # bit j set when column left + j of that bounding box row is occupied
+
+
+def compile_shape(shape: list[str]) -> ShapeTable:
+    cells = tuple((j, i) for i, row in enumerate(shape) for j, cell in enumerate(row) if cell == '0')
+    left = min(x for x, _ in cells)
+    top = min(y for _, y in cells)
+    width = max(x for x, _ in cells) - left + 1
+    height = max(y for _, y in cells) - top + 1
+    bottom = tuple(max(y for x, y in cells if x == left + j) for j in range(width))
+    row_bits = [0] * height
+    for x, y in cells:
+        row_bits[y - top] |= 1 << (x - left)
+    return ShapeTable(cells, left, top, width, height, bottom, tuple(row_bits))
+
+
+# SHAPE_TABLES[kind][rotation] and COLORS[kind], built once at import
+SHAPE_TABLES: tuple[tuple[ShapeTable, ...], ...] = tuple(
+    tuple(compile_shape(shape) for shape in info['shapes']) for info in TETROMINO_INFO
+)
+COLORS: tuple[Color, ...] = tuple(info['color'] for info in TETROMINO_INFO)
+GARBAGE_COLOR: Color = (128, 128, 128)  # rows sent by an opponent in versus play
+
+# SRS wall kicks, as (dx, dy) with y pointing down, tried in order for a quarter turn clockwise
+# out of rotation 0, 1 (R), 2 and 3 (L). Turning back counter-clockwise tries the same offsets negated.
+JLSTZ_KICKS = (
+    ((0, 0), (-1, 0), (-1, -1), (0, 2), (-1, 2)),
+    ((0, 0), (1, 0), (1, 1), (0, -2), (1, -2)),
+    ((0, 0), (1, 0), (1, -1), (0, 2), (1, 2)),
+    ((0, 0), (-1, 0), (-1, 1), (0, -2), (-1, -2)),
+)
+I_KICKS = (
+    ((0, 0), (-2, 0), (1, 0), (-2, 1), (1, -2)),
+    ((0, 0), (-1, 0), (2, 0), (-1, -2), (2, 1)),
+    ((0, 0), (2, 0), (-1, 0), (2, -1), (-1, 2)),
+    ((0, 0), (1, 0), (-2, 0), (1, 2), (-2, -1)),
+)
+# Half turns out of each rotation, which SRS leaves open; these are the common SRS+ ones
+HALF_TURN_KICKS = (
+    ((0, 0), (0, -1), (1, -1), (-1, -1), (1, 0), (-1, 0)),
+    ((0, 0), (1, 0), (1, -2), (1, -1), (0, -2), (0, -1)),
+    ((0, 0), (0, 1), (-1, 1), (1, 1), (-1, 0), (1, 0)),
+    ((0, 0), (-1, 0), (-1, -2), (-1, -1), (0, -2), (0, -1)),
+)
+I_KIND = 1
+
+# (rotation after the turn, dx, dy), one per kick in the order they are tried
+Kick = tuple[int, int, int]
+
+
+def compile_kicks(kind: int) -> tuple[tuple[tuple[Kick, ...], ...], ...]:
+    """Kicks of one piece indexed [rotation][quarter turns clockwise], 3 being counter-clockwise"""
+    states = len(SHAPE_TABLES[kind])
+    if states == 1:
+        # The O piece looks the same every way round
+        return ((((0, 0, 0),),) * 4,)
+    clockwise = I_KICKS if kind == I_KIND else JLSTZ_KICKS
+    table = []
+    for rotation in range(states):
+        previous = (rotation - 1) % states
+        table.append((
+            ((rotation, 0, 0),),
+            tuple(((rotation + 1) % states, dx, dy) for dx, dy in clockwise[rotation]),
+            tuple(((rotation + 2) % states, dx, dy) for dx, dy in HALF_TURN_KICKS[rotation]),
+            tuple((previous, -dx, -dy) for dx, dy in clockwise[previous]),
+        ))
+    return tuple(table)
+
+
+# ROTATION_KICKS[kind][rotation][turns], built once at import
+ROTATION_KICKS = tuple(compile_kicks(kind) for kind in range(len(SHAPE_TABLES)))
+MAX_KICKS = max(len(kicks) for table in ROTATION_KICKS for turns in table for kicks in turns)
+
+
+def spawn_column(columns: int) -> int:
+    """Spawn x for a board `columns` wide: 0 on the classic board, centred on wider ones"""
+    return max(0, (columns - CLASSIC_COLUMNS) // 2)
+
+
+class Tetromino:
+    __slots__ = ('kind', 'rotation', 'position')
+    kind: int  # index into TETROMINO_INFO
+    rotation: int
+    position: tuple[int, int]
+
+    def __init__(self, kind: int) -> None:
+        self.kind = kind
+        self.rotation = 0
+        self.position = (0, 0)
+
+    @property
+    def color(self) -> Color:
+        return COLORS[self.kind]
+
+    @property
+    def table(self) -> ShapeTable:
+        return SHAPE_TABLES[self.kind][self.rotation]
+
+    @property
+    def cells(self) -> tuple[tuple[int, int], ...]:
+        return SHAPE_TABLES[self.kind][self.rotation].cells
+
+    def rotate(self, turns: int = 1) -> None:
+        """Turn in place by quarter turns clockwise, without kicks; TetrisEngine.rotate_piece() applies those"""
+        self.rotation = (self.rotation + turns) % len(SHAPE_TABLES[self.kind])
+
+    def get_shape(self) -> list[str]:
+        return TETROMINO_INFO[self.kind]['shapes'][self.rotation]
@@ -0,0 +1,385 @@
+from collections.abc import Callable
+from typing import NamedTuple
+import argparse
+import asyncio
+import functools
+import hashlib
+import random
+import struct
+import time
+
+from address import parse_address
+from engine import DOWN, HARD_DROP, LEFT, MIN_BOARD_SIZE, RIGHT, ROTATE, ROTATE_180, ROTATE_CCW, TICK_MS, TetrisEngine
+from replay import CODE_BITS, ReplayError, read_varint, write_varint
+
+# Garbage rows sent for clearing 2, 3 or 4 rows with one piece
+GARBAGE_LINES = {2: 1, 3: 2, 4: 4}
+DRAW = -1  # VersusMatch.winner when both players top out on the same tick
+
+DEFAULT_PORT = 47900
+PROTOCOL_VERSION = 3  # 2: SRS rotation, as in replay version 2; 3: board size in JOIN
+TURN_TICKS = 5  # engine ticks per lockstep turn
+INPUT_DELAY = 2  # turns between choosing inputs and applying them, so the round trip is hidden
+CHECK_INTERVAL = 20  # turns between match digests, which the relay compares to detect desyncs
+
+# Every message is a u16 length (of what follows), a type byte and its body:
+#   JOIN   varint(protocol version), varint(columns), varint(rows); only players with the same board size are paired
+#   START  varint(seed), u8 player index, varint(turn ticks), varint(input delay)
+#   INPUT  varint(turn), then varint((tick within the turn << CODE_BITS) | input code) per input
+#   CHECK  varint(turn), 8-byte VersusMatch.digest()
+#   END    u8 reason; FINISHED adds varint(turns played) and the final 8-byte digest
+# Input codes are the replay ones, action * 2 + pressed. A turn without input is a 4-byte INPUT.
+# A player's FINISHED END is passed on to the opponent; the relay compares both to confirm the result.
+JOIN, START, INPUT, CHECK, END = range(1, 6)
+FINISHED, OPPONENT_LEFT, DESYNC, REFUSED = range(4)  # END reasons
+LENGTH = struct.Struct('>H')
+
+# (tick within the turn, input code)
+Input = tuple[int, int]
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def encode_message(kind: int, body: bytes = b'') -> bytes:
+    return LENGTH.pack(len(body) + 1) + bytes((kind,)) + body
+
+
+async def read_message(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    """Next (type, body); raises asyncio.IncompleteReadError when the peer has gone"""
+    (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+    if not length:
+        raise ProtocolError("Empty message")
+    data = await reader.readexactly(length)
+    return data[0], data[1:]
+
+
+def encode_varints(*values: int) -> bytes:
+    out = bytearray()
+    for value in values:
+        write_varint(out, value)
+    return bytes(out)
+
+
+def decode_varints(body: bytes, count: int, offset: int = 0) -> tuple[list[int], int]:
+    values = []
+    try:
+        for _ in range(count):
+            value, offset = read_varint(body, offset)
+            values.append(value)
+    except ReplayError as e:
+        raise ProtocolError(str(e)) from e
+    return values, offset
+
+
+def encode_start(seed: int, player: int, turn_ticks: int, delay: int) -> bytes:
+    return encode_varints(seed) + bytes((player,)) + encode_varints(turn_ticks, delay)
+
+
+def decode_start(body: bytes) -> tuple[int, int, int, int]:
+    (seed,), offset = decode_varints(body, 1)
+    if offset >= len(body):
+        raise ProtocolError("Truncated START")
+    player = body[offset]
+    (turn_ticks, delay), _ = decode_varints(body, 2, offset + 1)
+    return seed, player, turn_ticks, delay
+
+
+def encode_inputs(turn: int, inputs: list[Input]) -> bytes:
+    out = bytearray()
+    write_varint(out, turn)
+    for tick, code in inputs:
+        write_varint(out, (tick << CODE_BITS) | code)
+    return bytes(out)
+
+
+def decode_inputs(body: bytes) -> tuple[int, list[Input]]:
+    (turn,), offset = decode_varints(body, 1)
+    inputs = []
+    while offset < len(body):
+        (value,), offset = decode_varints(body, 1, offset)
+        inputs.append((value >> CODE_BITS, value & ((1 << CODE_BITS) - 1)))
+    return turn, inputs
+
+
+class VersusMatch:
+    """Two engines dealt the same pieces; clearing 2 or more rows at once sends garbage to the opponent
+
+    Everything, garbage hole columns included, follows from the seed and the
+    inputs, so every client that applies the same inputs sees the same match.
+    """
+    engines: list[TetrisEngine]
+    rng: random.Random  # garbage hole columns
+    sent: list[int]  # garbage rows each player has sent
+    ticks: int = 0
+    winner: int | None = None  # player index, or DRAW
+
+    def __init__(self, seed: int, strategy: str = 'random', columns: int = 10, rows: int = 20) -> None:
+        self.engines = [TetrisEngine(seed, strategy, 1, columns, rows) for _ in range(2)]
+        self.rng = random.Random(seed)
+        self.sent = [0, 0]
+        for player, engine in enumerate(self.engines):
+            engine.add_listener(functools.partial(self.on_engine_event, player))
+
+    def on_engine_event(self, player: int, event: str, value: int) -> None:
+        if event != 'lines_cleared':
+            return
+        attack = GARBAGE_LINES.get(value, 0)
+        # Rows on their way to this player are cancelled first
+        attack -= self.engines[player].cancel_garbage(attack)
+        if attack:
+            opponent = self.engines[1 - player]
+            opponent.add_garbage(attack, self.rng.randrange(opponent.grid_columns))
+            self.sent[player] += attack
+
+    def apply(self, player: int, code: int) -> None:
+        action, pressed = divmod(code, 2)
+        if pressed:
+            self.engines[player].press(action)
+        else:
+            self.engines[player].release(action)
+
+    def tick(self) -> None:
+        for engine in self.engines:
+            if not engine.is_game_over:
+                engine.tick()
+        self.ticks += 1
+        over = [engine.is_game_over for engine in self.engines]
+        if all(over):
+            self.winner = DRAW
+        elif any(over):
+            self.winner = over.index(False)
+
+    @property
+    def finished(self) -> bool:
+        return self.winner is not None
+
+    def digest(self) -> bytes:
+        """8-byte hash of both boards and scores, equal on every client that is in sync"""
+        h = hashlib.blake2b(digest_size=8)
+        for engine in self.engines:
+            h.update(engine.board.digest())
+            h.update(engine.score.to_bytes(8, 'little'))
+        return h.digest()
+
+
+# Chooses one player's inputs for a turn that will be applied INPUT_DELAY turns from now
+Policy = Callable[[VersusMatch, int, random.Random, int], list[Input]]
+
+
+def random_inputs(match: VersusMatch, player: int, rng: random.Random, turn_ticks: int) -> list[Input]:
+    """Tap a random action on about one tick in five"""
+    inputs = []
+    for tick in range(turn_ticks - 1):
+        if rng.random() < 0.2:
+            action = rng.choice((LEFT, RIGHT, DOWN, ROTATE, ROTATE_CCW, ROTATE_180, HARD_DROP))
+            inputs.append((tick, action * 2 + 1))
+            inputs.append((tick + 1, action * 2))
+    return inputs
+
+
+class MatchResult(NamedTuple):
+    seed: int
+    player: int
+    winner: int | None  # None when the match did not finish
+    reason: int  # END reason
+    turns: int
+    ticks: int
+    score: int
+    garbage_sent: int
+    digest: bytes
+    bytes_sent: int
+    bytes_received: int
+    stall_ms: float  # time spent waiting for the opponent's inputs
+
+
+class LockstepClient:
+    """One player's connection to a relay
+
+    Each turn the client sends its inputs for a later turn, waits until the
+    opponent's inputs for the current turn have arrived and then simulates both
+    engines, so the only traffic is inputs and the occasional digest.
+    """
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+    remote: dict[int, list[Input]]  # the opponent's inputs by turn
+    arrived: asyncio.Event
+    end_reason: int | None = None  # set when the relay ends the match
+    opponent_turns: int | None = None  # turns the opponent played before finishing
+    finished: bool = False  # this client sent its FINISHED END
+    delay: int = INPUT_DELAY
+    bytes_sent: int = 0
+    bytes_received: int = 0
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.remote = {}
+        self.arrived = asyncio.Event()
+
+    @classmethod
+    async def connect(cls, host: str, port: int) -> 'LockstepClient':
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    def send(self, kind: int, body: bytes = b'') -> None:
+        message = encode_message(kind, body)
+        self.bytes_sent += len(message)
+        self.writer.write(message)
+
+    async def receive(self) -> tuple[int, bytes]:
+        kind, body = await read_message(self.reader)
+        self.bytes_received += LENGTH.size + 1 + len(body)
+        return kind, body
+
+    async def listen(self) -> None:
+        try:
+            while True:
+                kind, body = await self.receive()
+                if kind == INPUT:
+                    turn, inputs = decode_inputs(body)
+                    self.remote[turn] = inputs
+                    self.arrived.set()
+                elif kind == END and body and body[0] == FINISHED and not self.finished:
+                    # The opponent's own END: none of its inputs will follow
+                    (self.opponent_turns,), _ = decode_varints(body, 1, 1)
+                    self.arrived.set()
+                elif kind == END:
+                    self.end_reason = body[0] if body else OPPONENT_LEFT
+                    self.arrived.set()
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError, ProtocolError):
+            # The relay hangs up after this client's END; before that it means the opponent is gone
+            if not self.finished:
+                self.end_reason = OPPONENT_LEFT
+            self.arrived.set()
+
+    def waiting_for(self, turn: int) -> bool:
+        if turn in self.remote or self.end_reason is not None:
+            return False
+        return self.opponent_turns is None or turn < self.opponent_turns + self.delay
+
+    async def play(
+        self,
+        policy: Policy = random_inputs,
+        rng: random.Random | None = None,
+        max_turns: int = 2400,
+        realtime: bool = True,
+        columns: int = 10,
+        rows: int = 20,
+    ) -> MatchResult:
+        """Join a match on a columns x rows board, play it to the end (or max_turns) and close the connection"""
+        rng = rng or random.Random()
+        self.send(JOIN, encode_varints(PROTOCOL_VERSION, columns, rows))
+        kind, body = await self.receive()
+        if kind == END:
+            raise ProtocolError("Relay refused the connection")
+        if kind != START:
+            raise ProtocolError(f"Expected START, got message type {kind}")
+        seed, player, turn_ticks, self.delay = decode_start(body)
+        delay = self.delay
+        match = VersusMatch(seed, columns=columns, rows=rows)
+
+        listener = asyncio.create_task(self.listen())
+        local: dict[int, list[Input]] = {}
+        for turn in range(delay):
+            local[turn] = []
+            self.send(INPUT, encode_inputs(turn, []))
+
+        loop = asyncio.get_running_loop()
+        turn_seconds = turn_ticks * TICK_MS / 1000
+        deadline = loop.time()
+        stall = 0.0
+        turn = 0
+        while not match.finished and turn < max_turns:
+            inputs = policy(match, player, rng, turn_ticks)
+            local[turn + delay] = inputs
+            self.send(INPUT, encode_inputs(turn + delay, inputs))
+            await self.writer.drain()
+
+            waited = time.perf_counter()
+            while self.waiting_for(turn):
+                self.arrived.clear()
+                await self.arrived.wait()
+            stall += time.perf_counter() - waited
+            if turn not in self.remote:
+                break
+
+            # Both clients apply player 0's inputs first, so both simulate the same match
+            by_player = [local.pop(turn), self.remote.pop(turn)]
+            if player == 1:
+                by_player.reverse()
+            for tick in range(turn_ticks):
+                for index, player_inputs in enumerate(by_player):
+                    for input_tick, code in player_inputs:
+                        if input_tick == tick:
+                            match.apply(index, code)
+                match.tick()
+                if match.finished:
+                    break
+            turn += 1
+
+            if turn % CHECK_INTERVAL == 0:
+                self.send(CHECK, encode_varints(turn) + match.digest())
+            if realtime:
+                deadline += turn_seconds
+                await asyncio.sleep(max(0.0, deadline - loop.time()))
+
+        try:
+            if self.end_reason is None:
+                self.finished = True
+                self.send(END, bytes((FINISHED,)) + encode_varints(turn) + match.digest())
+                await self.writer.drain()
+                # Read on until the relay hangs up: closing with its inputs unread would reset the connection
+                await asyncio.wait_for(listener, 5)
+        except (ConnectionError, TimeoutError):
+            pass
+        listener.cancel()
+        self.writer.close()
+        reason = self.end_reason if self.end_reason is not None else FINISHED
+
+        engine = match.engines[player]
+        return MatchResult(
+            seed,
+            player,
+            match.winner,
+            reason,
+            turn,
+            match.ticks,
+            engine.score,
+            match.sent[player],
+            match.digest(),
+            self.bytes_sent,
+            self.bytes_received,
+            stall * 1000,
+        )
+
+
+async def play_one(host: str, port: int, max_turns: int, realtime: bool, columns: int, rows: int) -> MatchResult:
+    client = await LockstepClient.connect(host, port)
+    return await client.play(max_turns=max_turns, realtime=realtime, columns=columns, rows=rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Play one headless versus match with random inputs through a relay")
+    parser.add_argument('relay', nargs='?', default=f'127.0.0.1:{DEFAULT_PORT}', help="relay host:port")
+    parser.add_argument('--max-turns', type=int, default=2400, help=f"stop after this many {TURN_TICKS}-tick turns")
+    parser.add_argument('--fast', action='store_true', help="do not pace turns to real time")
+    parser.add_argument('--columns', type=int, default=10, help="board width in cells; the opponent must use the same")
+    parser.add_argument('--rows', type=int, default=20, help="board height in cells; the opponent must use the same")
+    args = parser.parse_args()
+    if args.columns < MIN_BOARD_SIZE or args.rows < MIN_BOARD_SIZE:
+        parser.error(f"the board must be at least {MIN_BOARD_SIZE}x{MIN_BOARD_SIZE}")
+
+    host, port = parse_address(args.relay, DEFAULT_PORT)
+    result = asyncio.run(play_one(host, port, args.max_turns, not args.fast, args.columns, args.rows))
+    outcome = 'draw' if result.winner == DRAW else 'unfinished' if result.winner is None else 'won' if result.winner == result.player else 'lost'
+    print(
+        f"player {result.player} {outcome} after {result.turns} turns: score={result.score} "
+        f"garbage sent={result.garbage_sent} bytes out/in={result.bytes_sent}/{result.bytes_received}"
+    )
+
+
+if __name__ == "__main__":
+    main()
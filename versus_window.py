@@ -0,0 +1,184 @@
+import argparse
+import asyncio
+import random
+import time
+
+import pygame
+
+from address import parse_address
+from assets import AssetCache
+from engine import MIN_BOARD_SIZE, TICK_MS, TetrisEngine
+from main import Tetris
+from versus import DEFAULT_PORT, DESYNC, DRAW, OPPONENT_LEFT, Input, LockstepClient, MatchResult, ProtocolError, VersusMatch
+
+GARBAGE_WARNING_COLOR = (220, 40, 40)
+
+
+class VersusWindow:
+    """Play a versus match in a window: the keyboard drives this player's engine through a LockstepClient
+
+    Both engines are simulated by the client; this class only turns key events
+    into the lockstep inputs for the next turn and draws the two boards.
+    """
+    screen: pygame.Surface
+    bg_color: tuple[int, int, int] = (0, 0, 0)
+    grid_color: tuple[int, int, int] = (33, 33, 33)
+    key_actions: dict[int, int] = Tetris.key_actions
+    fps: int = 60  # render frame cap, 0 renders as fast as possible
+    assets: AssetCache
+    match: VersusMatch | None = None  # set when the first turn is chosen
+    player: int = 0
+    keys: list[tuple[float, int]]  # (perf_counter() time, input code) since the last turn was chosen
+    turn_started: float = 0.0  # perf_counter() when the last turn was chosen
+    closed: bool = False  # the window was closed
+    message: str = 'Waiting for an opponent...'
+
+    def __init__(self, width: int = 900, height: int = 700, fps: int = 60) -> None:
+        pygame.display.init()
+        self.screen = pygame.display.set_mode((width, height), pygame.RESIZABLE)
+        pygame.display.set_caption("Tetris Versus")
+        self.assets = AssetCache()
+        self.fps = fps
+        self.keys = []
+
+    def keyboard_inputs(self, match: VersusMatch, player: int, rng: random.Random, turn_ticks: int) -> list[Input]:
+        """Policy for LockstepClient.play(): the keys pressed since the last turn, at the tick each came in on"""
+        self.match = match
+        self.player = player
+        self.message = ''
+        now = time.perf_counter()
+        inputs = []
+        for at, code in self.keys:
+            tick = int((at - self.turn_started) * 1000) // TICK_MS
+            inputs.append((max(0, min(tick, turn_ticks - 1)), code))
+        self.keys.clear()
+        self.turn_started = now
+        return inputs
+
+    def handle_events(self) -> None:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE):
+                self.closed = True
+            elif event.type == pygame.VIDEORESIZE:
+                self.screen = pygame.display.set_mode((max(400, event.w), max(300, event.h)), pygame.RESIZABLE)
+                self.assets.invalidate_fonts()
+            elif event.type in (pygame.KEYDOWN, pygame.KEYUP) and self.message == '':
+                action = self.key_actions.get(event.key)
+                if action is not None:
+                    self.keys.append((time.perf_counter(), action * 2 + (event.type == pygame.KEYDOWN)))
+
+    def draw_board(self, engine: TetrisEngine, left: int, top: int, size: int, title: str, slot: str) -> None:
+        """One player's board with their title and score above it and incoming garbage as a bar beside it"""
+        columns, rows = engine.grid_columns, engine.grid_rows
+        font_size = max(12, size)
+        label = self.assets.text(slot, f"{title}: {engine.score}", font_size)
+        self.screen.blit(label, (left, top - label.get_height() - 4))
+        pygame.draw.rect(self.screen, self.grid_color, (left, top, columns * size, rows * size))
+
+        grid = engine.grid
+        for y, bits in enumerate(engine.board.rows):
+            # Visit only the occupied cells, as Tetris.draw_board_rows() does
+            while bits:
+                bit = bits & -bits
+                x = bit.bit_length() - 1
+                pygame.draw.rect(self.screen, grid[y][x], (left + x * size, top + y * size, size - 1, size - 1))
+                bits ^= bit
+
+        piece = engine.current_piece
+        if piece is not None:
+            x, y = piece.position
+            ghost_y = y + engine.drop_distance()
+            for cx, cy in piece.cells:
+                pygame.draw.rect(self.screen, piece.color, (left + (x + cx) * size, top + (ghost_y + cy) * size, size - 1, size - 1), 1)
+                pygame.draw.rect(self.screen, piece.color, (left + (x + cx) * size, top + (y + cy) * size, size - 1, size - 1))
+
+        incoming = min(len(engine.pending_garbage), rows)
+        if incoming:
+            bar = max(2, size // 3)
+            pygame.draw.rect(self.screen, GARBAGE_WARNING_COLOR, (left - bar - 2, top + (rows - incoming) * size, bar, incoming * size))
+
+    def draw(self) -> None:
+        self.screen.fill(self.bg_color)
+        width, height = self.screen.get_size()
+        match = self.match
+        if match is not None:
+            engines = match.engines
+            columns, rows = engines[0].grid_columns, engines[0].grid_rows
+            # Two boards side by side, with room for a title above each and a margin around them
+            size = max(2, min((width // 2 - 40) // columns, (height - 80) // rows))
+            top = (height - rows * size) // 2 + 20
+            for index, (player, title) in enumerate(((self.player, 'You'), (1 - self.player, 'Opponent'))):
+                left = width // 4 * (1 + 2 * index) - columns * size // 2
+                self.draw_board(engines[player], left, top, size, title, f'title{index}')
+        if self.message:
+            text = self.assets.text('message', self.message, 36)
+            self.screen.blit(text, text.get_rect(center=(width // 2, height // 2)))
+        pygame.display.flip()
+
+    async def render(self) -> None:
+        """Draw frames until the window is closed; the match is only advanced between them"""
+        while not self.closed:
+            self.handle_events()
+            self.draw()
+            await asyncio.sleep(1 / self.fps if self.fps else 0)
+
+    async def play(self, host: str, port: int, columns: int, rows: int) -> MatchResult | None:
+        """Play one match; returns None if the window was closed before it ended"""
+        renderer = asyncio.create_task(self.render())
+        client = await LockstepClient.connect(host, port)
+        self.turn_started = time.perf_counter()
+        game = asyncio.create_task(client.play(self.keyboard_inputs, columns=columns, rows=rows))
+        await asyncio.wait((game, renderer), return_when=asyncio.FIRST_COMPLETED)
+        if not game.done():
+            # Closing the connection tells the relay, which ends the match for the opponent
+            game.cancel()
+            client.writer.close()
+            return None
+        result = game.result()
+        self.message = outcome(result) + ' - close the window to quit'
+        await renderer
+        return result
+
+
+def outcome(result: MatchResult) -> str:
+    if result.reason == OPPONENT_LEFT:
+        return 'Opponent left'
+    if result.reason == DESYNC:
+        return 'Match desynced'
+    if result.winner is None:
+        return 'Unfinished'
+    if result.winner == DRAW:
+        return 'Draw'
+    return 'You win' if result.winner == result.player else 'You lose'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Play a versus match against whoever the relay pairs you with (see relay.py)")
+    parser.add_argument('relay', nargs='?', default=f'127.0.0.1:{DEFAULT_PORT}', help="relay host:port")
+    parser.add_argument('--columns', type=int, default=10, help="board width in cells; the opponent must use the same")
+    parser.add_argument('--rows', type=int, default=20, help="board height in cells; the opponent must use the same")
+    parser.add_argument('--fps', type=int, default=60, help="render frame cap, 0 renders as fast as possible")
+    args = parser.parse_args()
+    if args.columns < MIN_BOARD_SIZE or args.rows < MIN_BOARD_SIZE:
+        parser.error(f"the board must be at least {MIN_BOARD_SIZE}x{MIN_BOARD_SIZE}")
+    if args.fps < 0:
+        parser.error("--fps must be 0 (uncapped) or more")
+
+    host, port = parse_address(args.relay, DEFAULT_PORT)
+    window = VersusWindow(fps=args.fps)
+    try:
+        result = asyncio.run(window.play(host, port, args.columns, args.rows))
+    except OSError as e:
+        print(f"Error connecting to {host}:{port}: {e}")
+        return
+    except ProtocolError as e:
+        print(f"Error: {e}")
+        return
+    finally:
+        pygame.quit()
+    if result is not None:
+        print(f"{outcome(result)} after {result.turns} turns: score={result.score} garbage sent={result.garbage_sent}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+from collections import deque
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+import threading
+
+Job = tuple[Callable[..., Any], tuple[Any, ...], dict[str, Any]]
+
+
+def write_file(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+class IOWorker:
+    """Runs audio commands, file writes and uploads on a background thread, in submission order
+
+    Neither submit() nor persist() ever blocks. submit() is bounded: a job
+    that would take the queue past max_jobs is dropped and counted instead.
+    That suits sounds and telemetry; jobs that must not be lost, such as file
+    writes, go through persist(), which always queues. A job that raises is
+    reported and counted; the worker keeps going.
+    """
+    jobs: deque[Job | None]
+    max_jobs: int
+    ready: threading.Condition  # guards jobs and unfinished
+    unfinished: int = 0  # jobs queued or running
+    thread: threading.Thread
+    dropped: int = 0  # jobs refused because the queue was full
+    failed: int = 0  # jobs that raised
+
+    def __init__(self, max_jobs: int = 256) -> None:
+        self.jobs = deque()
+        self.max_jobs = max_jobs
+        self.ready = threading.Condition()
+        self.thread = threading.Thread(target=self.run, name='io-worker', daemon=True)
+        self.thread.start()
+
+    def run(self) -> None:
+        while True:
+            with self.ready:
+                while not self.jobs:
+                    self.ready.wait()
+                job = self.jobs.popleft()
+            try:
+                if job is None:
+                    return
+                function, args, kwargs = job
+                try:
+                    function(*args, **kwargs)
+                except Exception as e:
+                    self.failed += 1
+                    print(f"Error in background job {getattr(function, '__name__', function)}: {e}")
+            finally:
+                with self.ready:
+                    self.unfinished -= 1
+                    self.ready.notify_all()
+
+    def put(self, job: Job | None) -> None:
+        with self.ready:
+            self.jobs.append(job)
+            self.unfinished += 1
+            self.ready.notify_all()
+
+    def submit(self, function: Callable[..., Any], *args: Any, **kwargs: Any) -> bool:
+        """Queue function(*args, **kwargs) to run on the worker; returns False if the queue was full"""
+        with self.ready:
+            if len(self.jobs) >= self.max_jobs:
+                self.dropped += 1
+                return False
+            self.jobs.append((function, args, kwargs))
+            self.unfinished += 1
+            self.ready.notify_all()
+        return True
+
+    def persist(self, function: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        """Queue a job that must not be lost, such as a file write, even past max_jobs"""
+        self.put((function, args, kwargs))
+
+    def flush(self) -> None:
+        """Wait until every job submitted so far has run"""
+        with self.ready:
+            while self.unfinished:
+                self.ready.wait()
+
+    def close(self) -> None:
+        """Run the jobs still queued, then stop the thread"""
+        if self.thread.is_alive():
+            self.put(None)
+            self.thread.join()